@@ -1,6 +1,15 @@
 from flask import Flask, redirect, url_for, request
 from config import Config
 from .models import db, Usuario
+from .pool_stats import PoolMedido, instrumentar_pool
+from .limiter import init_limiter
+from .fragmentos import init_fragmentos
+from .perfilador import init_perfilador
+from .sedes import init_sedes
+from .compresion import init_compresion
+from .auditoria import init_auditoria
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_talisman import Talisman 
@@ -18,9 +27,47 @@ def create_app():
 
     os.environ['TZ'] = 'America/Caracas'
 
+    # IP y esquema reales del cliente detrás del proxy (límite de intentos, auditoría)
+    saltos = app.config.get('PROXY_SALTOS', 0)
+    if saltos:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=saltos, x_proto=saltos)
+
+    # Plantillas compiladas en disco: los workers nuevos no recompilan
+    directorio_bytecode = app.config.get('JINJA_BYTECODE_DIR')
+    if directorio_bytecode:
+        os.makedirs(directorio_bytecode, exist_ok=True)
+        app.jinja_options = {**app.jinja_options,
+                             'bytecode_cache': FileSystemBytecodeCache(directorio_bytecode)}
+
+    # Pool medido salvo que se use PgBouncer (NullPool) u otra clase explícita,
+    # en la base principal y en el bind de cada sede
+    opciones = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if not (app.config.get('SQLALCHEMY_DATABASE_URI') or '').startswith('sqlite'):
+        opciones.setdefault('poolclass', PoolMedido)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones
+
+    binds = {}
+    for clave, bind in (app.config.get('SQLALCHEMY_BINDS') or {}).items():
+        bind = dict(bind) if isinstance(bind, dict) else {'url': bind}
+        if not str(bind.get('url') or '').startswith('sqlite'):
+            bind.setdefault('poolclass', PoolMedido)
+        binds[clave] = bind
+    app.config['SQLALCHEMY_BINDS'] = binds
+
     db.init_app(app)
+    with app.app_context():
+        for motor in db.engines.values():
+            instrumentar_pool(motor)
+        init_sedes(app, db)
     migrate = Migrate(app, db)
     csrf.init_app(app)
+    init_limiter(app)
+    init_fragmentos(app)
+    init_perfilador(app)
+    init_auditoria(app)
+    # Antes que Talisman y las cabeceras: los after_request corren en orden
+    # inverso, así la compresión es lo último que toca la respuesta
+    init_compresion(app)
 
     # --- CSP BLINDADO: SE ELIMINA 'unsafe-inline' ---
     csp = {
@@ -66,7 +113,11 @@ def create_app():
     @app.after_request
     def add_security_headers(response):
         # Elimina "Directivas de Control de Caché" (Bandera Azul ZAP)
-        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+        cache = "no-store, no-cache, must-revalidate, max-age=0"
+        # Una vista que pide no-transform lo conserva: la compresión corre después
+        if 'no-transform' in response.headers.get("Cache-Control", ''):
+            cache += ", no-transform"
+        response.headers["Cache-Control"] = cache
         response.headers["Pragma"] = "no-cache"
         # Elimina "Divulgación de Información"
         response.headers["Server"] = "SIGAU-PRO"
@@ -90,6 +141,9 @@ def create_app():
     app.register_blueprint(admin_bp)
     app.register_blueprint(student_bp)
 
+    from .commands import registrar_comandos
+    registrar_comandos(app)
+
     @app.route('/')
     def index():
         return redirect(url_for('auth.login'))
@@ -0,0 +1,136 @@
+import atexit
+import json
+import os
+import threading
+from collections import deque
+from flask import current_app, has_request_context, request
+from flask_login import current_user
+from app.models import db, EventoAuditoria, obtener_hora_vzla
+from app.sedes import sede_actual
+
+# --- BITÁCORA DE AUDITORÍA (Solo inserción, escritura por lotes) ---
+# Las rutas llaman a auditar() después de su commit: el evento queda en una
+# cola en memoria y un hilo del worker lo inserta junto con los demás cada
+# AUDITORIA_INTERVALO segundos (o antes si se junta un lote completo). Así el
+# request no espera ningún INSERT ni commit extra.
+#
+# Si la base no responde los eventos vuelven a la cola y se reintentan; por
+# encima de AUDITORIA_MAXIMO se descartan los más viejos y se avisa en el log.
+# Con AUDITORIA_ARCHIVO los eventos se escriben como JSON por línea en ese
+# archivo en vez de la tabla (desarrollo, o para enviarlos a otro sistema).
+
+# Acciones registradas (filtro de la vista de auditoría)
+ACCIONES = (
+    'asistencia_qr', 'eliminar_asistencia', 'pasar_lista', 'iniciar_clase', 'cerrar_clase',
+    'aprobar_docente', 'rechazar_docente', 'aprobar_clave', 'rechazar_clave', 'toggle_edicion',
+)
+
+class Bitacora:
+    def __init__(self, app):
+        self.app = app
+        self._cola = deque()
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._pid = None
+        self.escritos = 0
+        self.descartados = 0
+        self._avisados = 0
+
+    def registrar(self, evento):
+        config = self.app.config
+        with self._lock:
+            self._cola.append(evento)
+            sobrantes = len(self._cola) - config.get('AUDITORIA_MAXIMO', 50000)
+            for _ in range(max(0, sobrantes)):
+                self._cola.popleft()
+                self.descartados += 1
+            lleno = len(self._cola) >= config.get('AUDITORIA_LOTE', 500)
+        self._arrancar()
+        if lleno:
+            self._despertar.set()
+
+    def _arrancar(self):
+        # Tras el fork de gunicorn el hilo del proceso padre no existe en el hijo
+        if self._pid == os.getpid() and self._hilo is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._hilo is None:
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._bucle, name='auditoria', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        intervalo = self.app.config.get('AUDITORIA_INTERVALO', 2)
+        while True:
+            self._despertar.wait(intervalo)
+            self._despertar.clear()
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe todo lo pendiente. Devuelve la cantidad de eventos escritos."""
+        lote_maximo = self.app.config.get('AUDITORIA_LOTE', 500)
+        total = 0
+        while True:
+            with self._lock:
+                lote = [self._cola.popleft() for _ in range(min(lote_maximo, len(self._cola)))]
+            if not lote:
+                return total
+            try:
+                self._escribir(lote)
+            except Exception:
+                self.app.logger.exception('No se pudo escribir la bitácora de auditoría')
+                with self._lock:
+                    # Vuelven al frente de la cola, en su orden, para el próximo intento
+                    self._cola.extendleft(reversed(lote))
+                return total
+            total += len(lote)
+            self.escritos += len(lote)
+            if self.descartados > self._avisados:
+                self._avisados = self.descartados
+                self.app.logger.warning('Bitácora de auditoría: %s eventos descartados por cola llena',
+                                        self.descartados)
+
+    def _escribir(self, lote):
+        archivo = self.app.config.get('AUDITORIA_ARCHIVO')
+        if archivo:
+            with open(archivo, 'a', encoding='utf-8') as salida:
+                for evento in lote:
+                    salida.write(json.dumps({**evento, 'fecha': evento['fecha'].isoformat()},
+                                            ensure_ascii=False) + '\n')
+            return
+
+        with self.app.app_context():
+            # Conexión propia, fuera de la sesión de cualquier request
+            with db.engine.begin() as conexion:
+                conexion.execute(db.insert(EventoAuditoria), lote)
+
+    def pendientes(self):
+        return len(self._cola)
+
+def auditar(accion, objetivo_tipo=None, objetivo_id=None, **detalle):
+    """Encola un evento de auditoría del usuario actual. Llamar después del commit."""
+    bitacora = current_app.extensions.get('auditoria')
+    if bitacora is None:
+        return
+
+    actor = current_user if has_request_context() and current_user.is_authenticated else None
+    bitacora.registrar({
+        'fecha': obtener_hora_vzla(),
+        'actor_id': actor.id if actor else None,
+        'actor_rol': actor.rol if actor else None,
+        'accion': accion,
+        'objetivo_tipo': objetivo_tipo,
+        'objetivo_id': objetivo_id,
+        'sede': sede_actual(),
+        'ip': request.remote_addr if has_request_context() else None,
+        'detalle': json.dumps(detalle, ensure_ascii=False, default=str) if detalle else None,
+    })
+
+def init_auditoria(app):
+    if not app.config.get('AUDITORIA_ENABLED', True):
+        return
+    bitacora = Bitacora(app)
+    app.extensions['auditoria'] = bitacora
+    # Al apagar el worker se escribe lo que quedó en la cola
+    atexit.register(bitacora.vaciar)
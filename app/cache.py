@@ -0,0 +1,45 @@
+import threading
+import time
+from collections import OrderedDict
+
+# --- CACHÉ EN MEMORIA (Por proceso) ---
+# LRU acotado con expiración. Cada worker de gunicorn tiene su propia copia,
+# por eso todo lo que se guarda aquí debe tolerar unos segundos de atraso.
+
+class CacheTTL:
+    def __init__(self, maximo=1024, ttl=60):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is None:
+                return None
+            valor, expira = item
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def borrar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
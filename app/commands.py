@@ -0,0 +1,426 @@
+import csv
+import io
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+import click
+from types import SimpleNamespace
+from flask import current_app
+from flask.cli import with_appcontext
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.exc import DBAPIError
+from werkzeug.security import generate_password_hash
+from app.models import db, Usuario, Materia, Asistencia, ClaseSesion, obtener_hora_vzla, normalizar_busqueda
+from app.consultas import (sesion_abierta_por_token, asistencia_en_sesion, asistencias_de_sesion,
+                           asistencias_del_dia, estudiantes_de_seccion, consulta_historial)
+from app.resumen import recalcular_contadores
+from app.riesgo import calcular_riesgo
+from app.sincronizacion import exportar_cambios
+from app.sedes import TABLAS_SEDE, clave_bind, esquema_sede, todas_las_sedes
+
+# --- COMANDOS DE CONSOLA (flask <comando>) ---
+
+ASIGNATURAS = [
+    'Matemática', 'Física', 'Química', 'Programación', 'Base de Datos', 'Redes',
+    'Estadística', 'Inglés Técnico', 'Sistemas Operativos', 'Ciberseguridad',
+    'Cálculo Numérico', 'Investigación de Operaciones', 'Ética Profesional',
+]
+
+LOTE_COPY = 50000
+
+def _copiar(tabla, columnas, filas):
+    """Inserta filas en bloque: COPY en Postgres, executemany en otros motores."""
+    conexion = db.session.connection()
+    if conexion.dialect.name == 'postgresql':
+        cursor = conexion.connection.cursor()
+        sql = f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)"
+        lote = io.StringIO()
+        escritor = csv.writer(lote)
+        pendientes = 0
+        for fila in filas:
+            escritor.writerow(fila)
+            pendientes += 1
+            if pendientes == LOTE_COPY:
+                lote.seek(0)
+                cursor.copy_expert(sql, lote)
+                lote = io.StringIO()
+                escritor = csv.writer(lote)
+                pendientes = 0
+        if pendientes:
+            lote.seek(0)
+            cursor.copy_expert(sql, lote)
+        return
+
+    tabla_sa = db.metadata.tables[tabla]
+    lote = []
+    for fila in filas:
+        lote.append(dict(zip(columnas, fila)))
+        if len(lote) == LOTE_COPY:
+            conexion.execute(tabla_sa.insert(), lote)
+            lote = []
+    if lote:
+        conexion.execute(tabla_sa.insert(), lote)
+
+def _dias_de_clase(semestres, hoy, rng):
+    # 16 semanas por semestre, dos días fijos por semana
+    dias_semana = sorted(rng.sample(range(5), 2))
+    inicio = hoy - timedelta(weeks=26 * semestres)
+    inicio -= timedelta(days=inicio.weekday())
+    dias = []
+    for s in range(semestres):
+        lunes = inicio + timedelta(weeks=26 * s)
+        for semana in range(16):
+            for d in dias_semana:
+                dia = lunes + timedelta(weeks=semana, days=d)
+                if dia < hoy:
+                    dias.append(dia)
+    return dias
+
+# --- 1. GENERAR DATOS SINTÉTICOS ---
+@click.command('generar-datos')
+@click.option('--estudiantes', default=20000, show_default=True)
+@click.option('--materias', default=1000, show_default=True)
+@click.option('--asistencias', default=5000000, show_default=True)
+@click.option('--semestres', default=2, show_default=True)
+@click.option('--semilla', default=2026, show_default=True)
+@with_appcontext
+def generar_datos(estudiantes, materias, asistencias, semestres, semilla):
+    """Carga un conjunto de datos del tamaño de varios semestres."""
+    from faker import Faker
+
+    fake = Faker('es_ES')
+    fake.seed_instance(semilla)
+    rng = random.Random(semilla)
+
+    base_docentes, base_estudiantes = 10000000, 40000000
+    if Usuario.query.filter(Usuario.cedula == str(base_estudiantes)).first():
+        raise click.ClickException('Ya existen datos generados. Usa una base de datos vacía.')
+
+    # Un solo hash para todos: PBKDF2 por usuario tardaría minutos
+    clave = generate_password_hash('sigau2026')
+    docentes = max(1, materias // 5)
+    secciones = [str(n) for n in range(1, max(1, materias // 8) + 1)]
+
+    click.echo(f'Usuarios: {docentes} docentes y {estudiantes} estudiantes...')
+    columnas_usuario = ['cedula', 'nombre', 'nombre_busqueda', 'password_hash', 'rol', 'telefono',
+                        'aprobado', 'ciudad', 'semestre', 'seccion_estudiante']
+
+    def fila_usuario(cedula, rol, telefono, semestre, seccion):
+        nombre = fake.name()
+        return [cedula, nombre, normalizar_busqueda(nombre), clave, rol, telefono,
+                True, fake.city(), semestre, seccion]
+
+    _copiar('usuarios', columnas_usuario, (
+        fila_usuario(str(base_docentes + i), 'docente', '0414' + str(1000000 + i), None, None)
+        for i in range(docentes)
+    ))
+    _copiar('usuarios', columnas_usuario, (
+        fila_usuario(str(base_estudiantes + i), 'estudiante', '0424' + str(1000000 + i),
+                     str(rng.randint(1, 8)), secciones[i % len(secciones)])
+        for i in range(estudiantes)
+    ))
+
+    ids_docentes = [d for (d,) in db.session.query(Usuario.id).filter(
+        Usuario.cedula.in_([str(base_docentes + i) for i in range(docentes)]))]
+
+    click.echo(f'Materias: {materias} en {len(secciones)} secciones...')
+    _copiar('materias', ['nombre', 'codigo_seccion', 'docente_id', 'clases_dictadas'], (
+        [f'{ASIGNATURAS[i % len(ASIGNATURAS)]} {i // len(ASIGNATURAS) + 1}',
+         secciones[i % len(secciones)], rng.choice(ids_docentes), 0]
+        for i in range(materias)
+    ))
+
+    por_seccion = {}
+    for estudiante_id, seccion in db.session.query(Usuario.id, Usuario.seccion_estudiante)\
+            .filter(Usuario.rol == 'estudiante', db.func.length(Usuario.cedula) == 8,
+                    Usuario.cedula.between(str(base_estudiantes), str(base_estudiantes + estudiantes - 1))):
+        por_seccion.setdefault(seccion, []).append(estudiante_id)
+    lista_materias = db.session.query(Materia.id, Materia.codigo_seccion)\
+            .order_by(Materia.id.desc()).limit(materias).all()
+
+    hoy = obtener_hora_vzla().date()
+    calendario = {m: _dias_de_clase(semestres, hoy, rng) for m, _ in lista_materias}
+    horas = {m: rng.randint(7, 17) for m, _ in lista_materias}
+    posibles = sum(len(por_seccion.get(sec, [])) * len(calendario[m]) for m, sec in lista_materias)
+    probabilidad = min(1.0, asistencias / posibles) if posibles else 0
+
+    def inicio_clase(materia_id, dia):
+        return datetime.combine(dia, datetime.min.time()) + timedelta(hours=horas[materia_id])
+
+    # Una sesión por día de clase; la última de una materia de cada diez sigue
+    # abierta para que la búsqueda por token tenga filas en el índice parcial
+    def filas_sesion():
+        for n, (materia_id, _) in enumerate(lista_materias):
+            dias = calendario[materia_id]
+            for i, dia in enumerate(dias):
+                abierta_en = inicio_clase(materia_id, dia)
+                abierta = n % 10 == 0 and i == len(dias) - 1
+                yield [materia_id, f'{rng.randrange(16 ** 8):08X}', abierta_en,
+                       None if abierta else abierta_en + timedelta(minutes=90)]
+
+    total_sesiones = sum(len(dias) for dias in calendario.values())
+    click.echo(f'Sesiones de clase: {total_sesiones}...')
+    _copiar('clase_sesiones', ['materia_id', 'token', 'abierta_en', 'cerrada_en'], filas_sesion())
+    sesiones = {(materia_id, abierta_en.date()): sesion_id for sesion_id, materia_id, abierta_en in
+                db.session.query(ClaseSesion.id, ClaseSesion.materia_id, ClaseSesion.abierta_en)
+                .filter(ClaseSesion.materia_id.in_(list(calendario)))}
+
+    def filas_asistencia():
+        generadas = 0
+        for materia_id, seccion in lista_materias:
+            for dia in calendario[materia_id]:
+                sesion_id = sesiones[(materia_id, dia)]
+                for estudiante_id in por_seccion.get(seccion, []):
+                    if generadas >= asistencias:
+                        return
+                    if rng.random() < probabilidad:
+                        fecha = inicio_clase(materia_id, dia) + timedelta(
+                            minutes=rng.randint(0, 20), seconds=rng.randint(0, 59))
+                        yield [fecha, dia, estudiante_id, materia_id, 'Presente', 'qr', sesion_id]
+                        generadas += 1
+
+    click.echo(f'Asistencias: hasta {asistencias} (p={probabilidad:.2f})...')
+    _copiar('asistencias', ['fecha', 'fecha_solo_dia', 'estudiante_id', 'materia_id', 'estado', 'metodo',
+                            'sesion_id'],
+            filas_asistencia())
+    db.session.commit()
+
+    click.echo('Recalculando contadores y estadísticas...')
+    recalcular_contadores()
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.connect() as conexion:
+            conexion.execution_options(isolation_level='AUTOCOMMIT').exec_driver_sql('ANALYZE')
+    click.echo('✅ Datos generados.')
+
+# --- 2. VERIFICAR PLANES DE CONSULTA ---
+# Tablas que crecen con el semestre: un Seq Scan sobre ellas es una regresión
+TABLAS_GRANDES = {'asistencias', 'usuarios', 'resumen_asistencias', 'clase_sesiones'}
+
+def _consultas_calientes():
+    materia = Materia.query.order_by(Materia.id).first()
+    estudiante = Usuario.query.filter_by(rol='estudiante').order_by(Usuario.id).first()
+    if not materia or not estudiante:
+        raise click.ClickException('No hay datos. Ejecuta primero: flask generar-datos')
+
+    docente = db.session.get(Usuario, materia.docente_id)
+    admin = SimpleNamespace(id=0, rol='admin')
+    ultima = db.session.query(db.func.max(Asistencia.fecha))\
+                .filter(Asistencia.materia_id == materia.id).scalar()
+    dia = (ultima or obtener_hora_vzla()).date()
+    # Sin sesiones, las consultas de duplicados, lista y token recorrerían
+    # tablas vacías y cualquier plan pasaría la verificación
+    sesion_id = db.session.query(db.func.max(ClaseSesion.id))\
+                .filter(ClaseSesion.materia_id == materia.id).scalar()
+    abierta = db.session.query(ClaseSesion.token).filter(ClaseSesion.cerrada_en.is_(None)).limit(1).scalar()
+    if sesion_id is None or abierta is None:
+        raise click.ClickException('No hay sesiones de clase (abiertas y cerradas). '
+                                   'Ejecuta flask generar-datos sobre una base vacía.')
+
+    # (nombre, consulta, costo máximo)
+    return [
+        ('token', sesion_abierta_por_token(abierta).limit(1), 50),
+        ('duplicado', asistencia_en_sesion(sesion_id, estudiante.id).limit(1), 50),
+        ('lista_sesion', asistencias_de_sesion(sesion_id), 500),
+        ('lista_del_dia', asistencias_del_dia(materia.id, dia), 500),
+        ('nomina_seccion', estudiantes_de_seccion(materia.codigo_seccion), 2000),
+        ('historial_admin', consulta_historial(admin).limit(50), 500),
+        ('historial_docente', consulta_historial(docente).limit(50), 5000),
+        ('historial_materia', consulta_historial(docente, materia_id=materia.id).limit(50), 500),
+        ('historial_fecha', consulta_historial(admin, fecha=dia.isoformat()).limit(50), 500),
+        ('historial_seccion', consulta_historial(admin, seccion=materia.codigo_seccion).limit(50), 5000),
+        ('busqueda_nombre', consulta_historial(admin, busqueda=estudiante.nombre.split()[0]).limit(50), 5000),
+        ('busqueda_cedula', consulta_historial(admin, busqueda=estudiante.cedula[:5]).limit(50), 5000),
+    ]
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get('Plans', []):
+        yield from _nodos(hijo)
+
+def _explicar(conexion, consulta):
+    compilada = consulta.statement.compile(dialect=conexion.dialect)
+    resultado = conexion.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + str(compilada), compilada.params)
+    plan = resultado.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+def _escaneos_secuenciales(plan):
+    return [nodo['Relation Name'] for nodo in _nodos(plan)
+            if nodo['Node Type'] == 'Seq Scan' and nodo.get('Relation Name') in TABLAS_GRANDES]
+
+@click.command('verificar-planes')
+@click.option('--factor', default=1.0, show_default=True, help='Multiplica los presupuestos de costo.')
+@with_appcontext
+def verificar_planes(factor):
+    """Falla si una consulta caliente hace Seq Scan o excede su costo."""
+    if db.engine.dialect.name != 'postgresql':
+        raise click.ClickException('La verificación de planes requiere PostgreSQL.')
+
+    fallas = 0
+    conexion = db.session.connection()
+    for nombre, consulta, presupuesto in _consultas_calientes():
+        plan = _explicar(conexion, consulta)
+        problemas = [f'Seq Scan sobre {tabla}' for tabla in _escaneos_secuenciales(plan)]
+        costo = plan['Total Cost']
+        if costo > presupuesto * factor:
+            problemas.append(f'costo {costo:.0f} > {presupuesto * factor:.0f}')
+
+        estado = 'OK ' if not problemas else 'FALLA'
+        click.echo(f'[{estado}] {nombre:<18} costo={costo:>10.1f}  {"; ".join(problemas)}')
+        fallas += bool(problemas)
+
+    if fallas:
+        click.echo(f'❌ {fallas} consulta(s) con regresión de plan.')
+        sys.exit(1)
+    click.echo('✅ Todos los planes usan índices y están dentro del presupuesto.')
+
+# --- 3. CREAR TABLAS DE LAS SEDES ---
+def _revision_principal(script):
+    with db.engine.connect() as conexion:
+        actuales = set(MigrationContext.configure(conexion).get_current_heads())
+    if actuales != set(script.get_heads()):
+        raise click.ClickException('La base principal no está en la última migración: ejecuta flask db upgrade.')
+
+def _verificar_misma_base(sede, conexion):
+    # Las tablas comunes solo existen en la base principal
+    if conexion.dialect.name == 'postgresql':
+        with db.engine.connect() as principal:
+            base = principal.exec_driver_sql('SELECT current_database()').scalar()
+        if conexion.exec_driver_sql('SELECT current_database()').scalar() != base:
+            raise click.ClickException(f'La sede {sede} apunta a otra base: SEDE_{sede.upper()}_URL '
+                                       f'debe llegar a la base principal ({base}).')
+    try:
+        conexion.execute(db.select(Usuario.id).limit(1))
+    except DBAPIError:
+        raise click.ClickException(f'La sede {sede} no ve la tabla usuarios: revisa su search_path.')
+
+@click.command('crear-sedes')
+@with_appcontext
+def crear_sedes():
+    """Crea el esquema de cada sede configurada en SEDES y lo marca en la revisión actual."""
+    app = current_app._get_current_object()
+    sedes = [s for s in todas_las_sedes(app) if s is not None]
+    if not sedes:
+        raise click.ClickException('No hay sedes configuradas (variable SEDES).')
+
+    script = ScriptDirectory(app.extensions['migrate'].directory)
+    _revision_principal(script)
+
+    tablas = [db.metadata.tables[t] for t in TABLAS_SEDE]
+    for sede in sedes:
+        motor = db.engines[clave_bind(sede)]
+        esquema = esquema_sede(sede, motor)
+        with motor.begin() as conexion:
+            _verificar_misma_base(sede, conexion)
+            if motor.dialect.name == 'postgresql':
+                conexion.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{esquema}"')
+
+            contexto = MigrationContext.configure(conexion, opts={'version_table_schema': esquema})
+            revision = contexto.get_current_revision()
+            if revision is not None:
+                # Desde que existe, la sede se actualiza con flask db upgrade
+                click.echo(f'Sede {sede}: {esquema} ya existe (revisión {revision}).')
+                continue
+
+            existentes = set(inspect(conexion).get_table_names(schema=esquema))
+            # Con el search_path de la sede, CREATE TABLE sin esquema cae en el de la sede
+            # y las claves foráneas a 'usuarios' apuntan a la tabla de public
+            for tabla in tablas:
+                if tabla.name not in existentes:
+                    tabla.create(conexion, checkfirst=False)
+            contexto.stamp(script, 'heads')
+        click.echo(f'✅ Sede {sede}: {esquema}')
+
+# --- 4. PARTICIONES DE LA BITÁCORA DE AUDITORÍA ---
+def _particion_mensual(conexion, anio, mes):
+    inicio = date(anio, mes, 1)
+    fin = date(anio + mes // 12, mes % 12 + 1, 1)
+    nombre = f'eventos_auditoria_{inicio:%Y_%m}'
+    conexion.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {nombre} "
+        f"PARTITION OF eventos_auditoria FOR VALUES FROM ('{inicio}') TO ('{fin}')"
+    )
+    return nombre
+
+def _proteger_particiones(conexion):
+    # El trigger de sentencia de eventos_auditoria no corre con un UPDATE,
+    # DELETE o TRUNCATE hecho directo sobre una partición: cada una lleva el suyo
+    sin_trigger = conexion.exec_driver_sql("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'eventos_auditoria'::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_trigger t
+                          WHERE t.tgrelid = c.oid AND t.tgname = 'trg_auditoria_solo_insercion')
+    """).scalars().all()
+    for nombre in sin_trigger:
+        conexion.exec_driver_sql(
+            f'CREATE TRIGGER trg_auditoria_solo_insercion '
+            f'BEFORE UPDATE OR DELETE OR TRUNCATE ON "{nombre}" '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION auditoria_solo_insercion()'
+        )
+    return sin_trigger
+
+@click.command('auditoria-particiones')
+@click.option('--meses', default=3, show_default=True, help='Meses a crear desde el actual.')
+@with_appcontext
+def auditoria_particiones(meses):
+    """Crea por adelantado las particiones mensuales de eventos_auditoria (Postgres)."""
+    if db.engine.dialect.name != 'postgresql':
+        raise click.ClickException('Las particiones de la bitácora requieren PostgreSQL.')
+
+    hoy = obtener_hora_vzla().date()
+    for desplazamiento in range(meses):
+        mes = hoy.month - 1 + desplazamiento
+        try:
+            with db.engine.begin() as conexion:
+                nombre = _particion_mensual(conexion, hoy.year + mes // 12, mes % 12 + 1)
+        except Exception as e:
+            # Falla si la partición por defecto ya tiene eventos de ese mes
+            raise click.ClickException(f'No se pudo crear la partición: {e}')
+        click.echo(f'✅ {nombre}')
+
+    # También las particiones creadas a mano o antes de existir este paso
+    with db.engine.begin() as conexion:
+        for nombre in _proteger_particiones(conexion):
+            click.echo(f'🔒 {nombre}: solo inserción')
+
+# --- 5. ESTUDIANTES EN RIESGO ---
+@click.command('calcular-riesgo')
+@click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Inicio del período (por defecto RIESGO_DIAS atrás).')
+@click.option('--umbral', type=float, default=None, help='Porcentaje de inasistencia (RIESGO_UMBRAL).')
+@click.option('--racha', type=int, default=None, help='Faltas seguidas (RIESGO_RACHA).')
+@with_appcontext
+def calcular_riesgo_cmd(desde, umbral, racha):
+    """Recalcula la tabla de estudiantes en riesgo (pensado para cron, de noche)."""
+    inicio = time.perf_counter()
+    for sede, total in calcular_riesgo(desde, umbral, racha).items():
+        click.echo(f'Sede {sede or "principal"}: {total} estudiante(s) en riesgo')
+    click.echo(f'✅ Cálculo terminado en {time.perf_counter() - inicio:.1f} s')
+
+# --- 6. SINCRONIZACIÓN INCREMENTAL CON TEPUY ---
+@click.command('sincronizar-tepuy')
+@click.option('--destino', default='control_estudios', show_default=True,
+              help='Nombre del destino; cada uno lleva su propia marca.')
+@click.option('--salida', default='exportaciones', show_default=True, help='Directorio de los archivos.')
+@click.option('--reiniciar', is_flag=True, help='Vuelve a exportar todas las asistencias actuales.')
+@with_appcontext
+def sincronizar_tepuy(destino, salida, reiniciar):
+    """Exporta solo las altas y bajas de asistencias desde la corrida anterior."""
+    for sede, ruta, filas in exportar_cambios(destino, salida, reiniciar):
+        if ruta:
+            click.echo(f'Sede {sede or "principal"}: {filas} fila(s) -> {ruta}')
+        else:
+            click.echo(f'Sede {sede or "principal"}: sin cambios')
+    click.echo('✅ Sincronización terminada.')
+
+def registrar_comandos(app):
+    app.cli.add_command(generar_datos)
+    app.cli.add_command(verificar_planes)
+    app.cli.add_command(crear_sedes)
+    app.cli.add_command(auditoria_particiones)
+    app.cli.add_command(calcular_riesgo_cmd)
+    app.cli.add_command(sincronizar_tepuy)
@@ -0,0 +1,106 @@
+import zlib
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- COMPRESIÓN DE RESPUESTAS ---
+# gzip (o brotli si está instalado) según Accept-Encoding, solo para tipos de
+# texto y por encima de un tamaño mínimo. Las respuestas en streaming se
+# comprimen trozo a trozo con un flush por trozo, así el cliente sigue
+# recibiendo datos mientras se genera el CSV.
+#
+# BREACH: una página que lleva el token CSRF no se comprime. Si el token
+# viaja comprimido junto a texto que el atacante controla (por ejemplo un
+# filtro reflejado en la URL), el tamaño de la respuesta filtra el token.
+
+TIPOS_POR_DEFECTO = (
+    'text/html', 'text/csv', 'text/plain', 'text/css',
+    'application/json', 'application/javascript', 'image/svg+xml',
+)
+
+class _Gzip:
+    def __init__(self, nivel):
+        self._z = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def trozo(self, datos):
+        return self._z.compress(datos) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def fin(self):
+        return self._z.flush(zlib.Z_FINISH)
+
+    def todo(self, datos):
+        return self._z.compress(datos) + self.fin()
+
+class _Brotli:
+    def __init__(self, nivel):
+        # Se usa el mismo nivel que gzip; brotli acepta de 0 a 11
+        self._b = brotli.Compressor(quality=min(11, nivel))
+
+    def trozo(self, datos):
+        return self._b.process(datos) + self._b.flush()
+
+    def fin(self):
+        return self._b.finish()
+
+    def todo(self, datos):
+        return self._b.process(datos) + self.fin()
+
+def _codificacion():
+    ofrecidas = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(ofrecidas)
+
+def _comprimir_stream(iterable, compresor):
+    try:
+        for parte in iterable:
+            if isinstance(parte, str):
+                parte = parte.encode('utf-8')
+            if parte:
+                yield compresor.trozo(parte)
+        yield compresor.fin()
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+def init_compresion(app):
+    if not app.config.get('COMPRESION_ENABLED', True):
+        return
+
+    minimo = app.config.get('COMPRESION_MINIMO', 1024)
+    nivel = app.config.get('COMPRESION_NIVEL', 6)
+    tipos = set(app.config.get('COMPRESION_TIPOS') or TIPOS_POR_DEFECTO)
+    campo_csrf = app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')
+
+    @app.after_request
+    def comprimir(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in tipos
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        # La página generó un token CSRF en este request (ver nota BREACH)
+        if campo_csrf in g:
+            return response
+
+        codificacion = _codificacion()
+        if not codificacion:
+            return response
+        compresor = _Brotli(nivel) if codificacion == 'br' else _Gzip(nivel)
+
+        if response.is_streamed:
+            response.response = _comprimir_stream(response.response, compresor)
+            response.headers.pop('Content-Length', None)
+        else:
+            datos = response.get_data()
+            if len(datos) < minimo:
+                return response
+            response.set_data(compresor.todo(datos))
+
+        response.headers['Content-Encoding'] = codificacion
+        return response
@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import aliased
+from app.models import (db, Materia, Asistencia, Usuario, ClaseSesion, SolicitudClave, EventoAuditoria,
+                        RiesgoAsistencia, normalizar_busqueda)
+
+# --- CONSULTAS CALIENTES ---
+# Las consultas que corren en cada marcaje o en cada carga de las vistas en
+# vivo viven aquí, para que las rutas y 'flask verificar-planes' ejecuten
+# exactamente el mismo SQL.
+
+def rango_dia(dia):
+    """Devuelve (inicio, fin) del día para filtrar 'fecha' con el índice.
+
+    Comparar to_char(fecha) contra un texto obliga a Postgres a recorrer la
+    tabla; un rango [inicio, fin) sí usa los índices sobre 'fecha'.
+    """
+    if isinstance(dia, str):
+        dia = datetime.strptime(dia, '%Y-%m-%d').date()
+    elif isinstance(dia, datetime):
+        dia = dia.date()
+    inicio = datetime.combine(dia, datetime.min.time())
+    return inicio, inicio + timedelta(days=1)
+
+def materia_por_token(token):
+    return Materia.query.filter_by(token_activo=token)
+
+def sesion_abierta_por_token(token):
+    return ClaseSesion.query.filter(ClaseSesion.token == token, ClaseSesion.cerrada_en.is_(None))
+
+def sesion_abierta(materia_id):
+    return ClaseSesion.query.filter(ClaseSesion.materia_id == materia_id, ClaseSesion.cerrada_en.is_(None))
+
+def ultima_sesion(materia_id):
+    return ClaseSesion.query.filter_by(materia_id=materia_id).order_by(ClaseSesion.abierta_en.desc())
+
+def asistencia_en_sesion(sesion_id, estudiante_id):
+    return Asistencia.query.filter_by(sesion_id=sesion_id, estudiante_id=estudiante_id)
+
+def asistencias_de_sesion(sesion_id):
+    return Asistencia.query.filter_by(sesion_id=sesion_id).order_by(Asistencia.fecha.desc())
+
+def asistencia_del_dia(estudiante_id, materia_id, dia):
+    inicio, fin = rango_dia(dia)
+    return Asistencia.query.filter(
+        Asistencia.estudiante_id == estudiante_id,
+        Asistencia.materia_id == materia_id,
+        Asistencia.fecha >= inicio,
+        Asistencia.fecha < fin
+    )
+
+def asistencias_del_dia(materia_id, dia):
+    inicio, fin = rango_dia(dia)
+    return Asistencia.query.filter(
+        Asistencia.materia_id == materia_id,
+        Asistencia.fecha >= inicio,
+        Asistencia.fecha < fin
+    ).order_by(Asistencia.fecha.desc())
+
+def estudiantes_de_seccion(seccion):
+    return Usuario.query.filter_by(rol='estudiante', seccion_estudiante=seccion)
+
+def _escapar_like(texto):
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def filtro_estudiante(busqueda):
+    """Condición sobre Usuario: prefijo de cédula si son dígitos, si no cada palabra del nombre."""
+    texto = busqueda.strip()
+    cedula = texto.upper().removeprefix('V-').removeprefix('V').strip()
+    if cedula.isdigit():
+        return Usuario.cedula.like(cedula + '%')
+
+    palabras = normalizar_busqueda(texto).split()
+    if not palabras:
+        return db.false()
+    return db.and_(*(
+        Usuario.nombre_busqueda.like('%' + _escapar_like(p) + '%', escape='\\')
+        for p in palabras
+    ))
+
+# --- PROYECCIONES DE SOLO LECTURA ---
+# Los listados y los CSV solo imprimen unas pocas columnas: seleccionarlas
+# con sus joins devuelve filas inmutables (Row, una tupla con nombres) en
+# vez de objetos del ORM con identity map, seguimiento de cambios y
+# relaciones que se cargan una por una.
+
+Docente = aliased(Usuario, name='docente')
+
+def proyeccion_asistencias():
+    """Asistencias con los datos del estudiante, la materia y el docente ya resueltos."""
+    return db.session.query(
+        Asistencia.id, Asistencia.fecha, Asistencia.estado,
+        Usuario.nombre.label('estudiante'), Usuario.cedula, Usuario.seccion_estudiante,
+        Materia.nombre.label('materia'), Materia.codigo_seccion,
+        Docente.nombre.label('docente')
+    ).join(Materia, Materia.id == Asistencia.materia_id)\
+     .join(Usuario, Usuario.id == Asistencia.estudiante_id)\
+     .join(Docente, Docente.id == Materia.docente_id)
+
+def docentes_pendientes():
+    return db.session.query(Usuario.id, Usuario.nombre, Usuario.cedula, Usuario.telefono)\
+             .filter_by(rol='docente', aprobado=False)\
+             .order_by(Usuario.id)
+
+def solicitudes_de_clave():
+    return db.session.query(
+        SolicitudClave.id, SolicitudClave.fecha_solicitud, Usuario.nombre, Usuario.cedula
+    ).join(Usuario, Usuario.id == SolicitudClave.usuario_id)\
+     .order_by(SolicitudClave.fecha_solicitud.desc())
+
+def consulta_historial(usuario, materia_id=None, fecha=None, seccion=None, busqueda=None):
+    query = proyeccion_asistencias()
+
+    if usuario.rol != 'admin':
+        query = query.filter(Materia.docente_id == usuario.id)
+
+    if materia_id:
+        query = query.filter(Asistencia.materia_id == materia_id)
+
+    if fecha:
+        try:
+            inicio, fin = rango_dia(fecha)
+            query = query.filter(Asistencia.fecha >= inicio, Asistencia.fecha < fin)
+        except ValueError:
+            # Fecha mal escrita en la URL: no coincide con ningún registro
+            query = query.filter(db.false())
+
+    if seccion:
+        query = query.filter(Materia.codigo_seccion == seccion)
+
+    if busqueda and busqueda.strip():
+        query = query.filter(filtro_estudiante(busqueda))
+
+    return query.order_by(Asistencia.fecha.desc())
+
+def consulta_auditoria(accion=None, actor=None, fecha=None, antes=None):
+    """Eventos de la bitácora, del más nuevo al más viejo.
+
+    Se pagina por id ('antes' = último id de la página anterior) y no con
+    OFFSET, que en una tabla que solo crece recorre cada vez más filas.
+    """
+    query = EventoAuditoria.query
+
+    if accion:
+        query = query.filter(EventoAuditoria.accion == accion)
+
+    if actor:
+        # Cédula del usuario que hizo la acción
+        query = query.filter(EventoAuditoria.actor_id.in_(
+            db.select(Usuario.id).where(Usuario.cedula == actor.strip())))
+
+    if fecha:
+        try:
+            # El rango sobre 'fecha' también descarta las particiones de otros meses
+            inicio, fin = rango_dia(fecha)
+            query = query.filter(EventoAuditoria.fecha >= inicio, EventoAuditoria.fecha < fin)
+        except ValueError:
+            query = query.filter(db.false())
+
+    if antes:
+        query = query.filter(EventoAuditoria.id < antes)
+
+    return query.order_by(EventoAuditoria.id.desc())
+
+def consulta_riesgo(usuario, materia_id=None):
+    """Estudiantes en riesgo del último cálculo, de mayor a menor inasistencia."""
+    query = db.session.query(
+        RiesgoAsistencia.porcentaje_inasistencia, RiesgoAsistencia.inasistencias,
+        RiesgoAsistencia.clases, RiesgoAsistencia.racha_actual, RiesgoAsistencia.racha_maxima,
+        RiesgoAsistencia.ultima_asistencia, RiesgoAsistencia.materia_id,
+        Usuario.cedula, Usuario.nombre, Materia.nombre.label('materia'), Materia.codigo_seccion
+    ).join(Usuario, Usuario.id == RiesgoAsistencia.estudiante_id)\
+     .join(Materia, Materia.id == RiesgoAsistencia.materia_id)\
+     .filter(RiesgoAsistencia.en_riesgo.is_(True))
+
+    if usuario.rol != 'admin':
+        query = query.filter(Materia.docente_id == usuario.id)
+
+    if materia_id:
+        query = query.filter(RiesgoAsistencia.materia_id == materia_id)
+
+    return query.order_by(RiesgoAsistencia.porcentaje_inasistencia.desc(),
+                          RiesgoAsistencia.racha_actual.desc(), Usuario.nombre)
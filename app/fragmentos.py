@@ -0,0 +1,108 @@
+import hashlib
+from flask import current_app, session
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+from sqlalchemy.dialects import postgresql, sqlite
+from app.cache import CacheTTL
+from app.models import db, VersionFragmentos
+from app.sedes import sede_actual
+
+# --- CACHÉ DE FRAGMENTOS DE PLANTILLA ---
+# Guarda el HTML ya renderizado de partes pesadas de una plantilla:
+#
+#   {% call cache_fragmento('historial', current_user.id, ultimo_id) %}
+#       ... filas ...
+#   {% endcall %}
+#
+# La clave la decide quien llama y debe cambiar cuando cambia el contenido
+# (por ejemplo el id de la última asistencia). Dentro de un fragmento no se
+# debe usar csp_nonce(): cambia en cada request. csrf_token() solo se puede
+# usar con sesion=True, que agrega el token de la sesión a la clave.
+#
+# Las versiones de grupo (version_fragmentos / invalidar_fragmentos) viven
+# en la base, no en el almacén: el contador sube dentro de la transacción
+# que borra o cambia los datos, así ningún worker sigue sirviendo el
+# fragmento viejo después del commit, con o sin Redis.
+
+class MemoriaFragmentos:
+    """Almacén local (por proceso), acotado con LRU."""
+
+    def __init__(self, maximo, ttl):
+        self._cache = CacheTTL(maximo=maximo, ttl=ttl)
+
+    def obtener(self, clave):
+        return self._cache.obtener(clave)
+
+    def guardar(self, clave, html, ttl):
+        self._cache.guardar(clave, html, ttl)
+
+class RedisFragmentos:
+    """Almacén compartido entre workers. Requiere el paquete 'redis'."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("FRAGMENTOS_CACHE_URL requiere instalar el paquete 'redis'") from e
+        self.cliente = redis.Redis.from_url(url)
+
+    def obtener(self, clave):
+        valor = self.cliente.get(f'frag:{clave}')
+        return valor.decode('utf-8') if valor is not None else None
+
+    def guardar(self, clave, html, ttl):
+        self.cliente.set(f'frag:{clave}', html.encode('utf-8'), ex=ttl)
+
+def _almacen():
+    return current_app.extensions['fragmentos']
+
+def _grupo_de_sede(grupo):
+    # Los datos de cada sede cambian por separado
+    return f"{grupo}:{sede_actual() or 'principal'}"
+
+def version_fragmentos(grupo):
+    return db.session.query(VersionFragmentos.version)\
+        .filter_by(grupo=_grupo_de_sede(grupo)).scalar() or 0
+
+def invalidar_fragmentos(grupo):
+    """Vuelve obsoletos los fragmentos cuya clave incluye version_fragmentos(grupo).
+
+    Trabaja dentro de la transacción del llamador (no hace commit): llamar
+    antes del commit que cambia los datos.
+    """
+    dialecto = db.session.get_bind(mapper=VersionFragmentos).dialect.name
+    modulo = postgresql if dialecto == 'postgresql' else sqlite
+    db.session.execute(
+        modulo.insert(VersionFragmentos)
+        .values(grupo=_grupo_de_sede(grupo), version=1)
+        .on_conflict_do_update(index_elements=['grupo'],
+                               set_={'version': VersionFragmentos.version + 1})
+    )
+
+def cache_fragmento(*partes, ttl=None, sesion=False, caller=None):
+    if not current_app.config.get('FRAGMENTOS_ENABLED', True):
+        return caller()
+
+    if sesion:
+        # El HTML lleva el token CSRF: solo sirve para la misma sesión
+        generate_csrf()
+        partes += (session.get('csrf_token'),)
+
+    clave = hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()
+    almacen = _almacen()
+    html = almacen.obtener(clave)
+    if html is None:
+        html = str(caller())
+        almacen.guardar(clave, html, ttl or current_app.config.get('FRAGMENTOS_TTL', 300))
+    return Markup(html)
+
+def init_fragmentos(app):
+    url = app.config.get('FRAGMENTOS_CACHE_URL')
+    app.extensions['fragmentos'] = RedisFragmentos(url) if url else MemoriaFragmentos(
+        maximo=app.config.get('FRAGMENTOS_MAXIMO', 2000),
+        ttl=app.config.get('FRAGMENTOS_TTL', 300)
+    )
+    app.jinja_env.globals.update(
+        cache_fragmento=cache_fragmento,
+        version_fragmentos=version_fragmentos,
+    )
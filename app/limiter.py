@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, render_template, make_response, session
+
+# --- LIMITADOR DE PETICIONES (Ventana deslizante) ---
+# Cada clave guarda solo dos contadores: la ventana actual y la anterior.
+# La cuenta estimada es  previa * (fracción que aún se solapa) + actual,
+# así que la memoria por clave es O(1) sin importar el tráfico.
+
+def _estimar(previo, actual, inicio, ventana, ahora):
+    transcurrido = ahora - inicio
+    return previo * max(0.0, 1 - transcurrido / ventana) + actual
+
+class MemoriaLimiter:
+    """Almacén local (por proceso). Sirve para desarrollo, pruebas y un solo worker."""
+
+    def __init__(self, max_claves=100000):
+        self.max_claves = max_claves
+        self._claves = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave, limite, ventana):
+        ahora = time.time()
+        inicio_actual = ahora - (ahora % ventana)
+        with self._lock:
+            inicio, previo, actual = self._claves.get(clave, (inicio_actual, 0, 0))
+            if inicio != inicio_actual:
+                # Si saltamos más de una ventana, la anterior quedó vacía
+                previo = actual if inicio_actual - inicio == ventana else 0
+                actual = 0
+                inicio = inicio_actual
+
+            if _estimar(previo, actual, inicio, ventana, ahora) >= limite:
+                self._claves[clave] = (inicio, previo, actual)
+                self._claves.move_to_end(clave)
+                return False, int(inicio + ventana - ahora) + 1
+
+            self._claves[clave] = (inicio, previo, actual + 1)
+            self._claves.move_to_end(clave)
+            # Desalojo LRU: las claves más viejas ya no cuentan para ningún límite
+            while len(self._claves) > self.max_claves:
+                self._claves.popitem(last=False)
+            return True, 0
+
+SCRIPT_CONSUMIR = """
+local previo = tonumber(redis.call('GET', KEYS[1]) or '0')
+local actual = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previo * tonumber(ARGV[1]) + actual >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+
+class RedisLimiter:
+    """Almacén compartido entre workers. Requiere el paquete 'redis'."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RATELIMIT_STORAGE_URL requiere instalar el paquete 'redis'") from e
+        self.cliente = redis.Redis.from_url(url)
+        # Leer, comparar e incrementar en un solo paso dentro de Redis: con
+        # GET + INCR separados, dos workers podían pasar el límite a la vez
+        self._consumir = self.cliente.register_script(SCRIPT_CONSUMIR)
+
+    def consumir(self, clave, limite, ventana):
+        ahora = time.time()
+        inicio = int(ahora - (ahora % ventana))
+        peso_previo = max(0.0, 1 - (ahora - inicio) / ventana)
+        permitido = self._consumir(
+            keys=[f'rl:{clave}:{inicio - ventana}', f'rl:{clave}:{inicio}'],
+            args=[peso_previo, limite, ventana * 2],
+        )
+        if not permitido:
+            return False, int(inicio + ventana - ahora) + 1
+        return True, 0
+
+def init_limiter(app):
+    url = app.config.get('RATELIMIT_STORAGE_URL')
+    app.extensions['limiter'] = RedisLimiter(url) if url else MemoriaLimiter()
+
+# --- CLAVES DE IDENTIFICACIÓN ---
+def _clave_ip():
+    # Detrás de un proxy es la IP del cliente solo si PROXY_SALTOS está bien configurado
+    return request.remote_addr or 'desconocida'
+
+def _clave_cedula():
+    cedula = (request.form.get('cedula') or '').strip()
+    return cedula or None
+
+def _clave_usuario():
+    # Se lee de la cookie de sesión firmada (Flask-Login guarda ahí el id),
+    # sin cargar el usuario de la base
+    return session.get('_user_id')
+
+CLAVES = {
+    'ip': _clave_ip,
+    'cedula': _clave_cedula,
+    'usuario': _clave_usuario,
+}
+
+def limitar(nombre, metodos=('POST',)):
+    """Aplica las reglas de app.config['RATELIMITS'][nombre] antes de la vista.
+
+    Corre antes de cualquier consulta o hash de contraseña: si alguna clave
+    excede su límite se responde 429 de inmediato. Debe ir antes (más arriba)
+    que @login_required, que consulta la base para cargar al usuario.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if request.method in metodos and current_app.config.get('RATELIMIT_ENABLED', True):
+                almacen = current_app.extensions['limiter']
+                for tipo, limite, ventana in current_app.config['RATELIMITS'].get(nombre, []):
+                    valor = CLAVES[tipo]()
+                    if valor is None:
+                        continue
+                    permitido, reintentar = almacen.consumir(f'{nombre}:{tipo}:{valor}', limite, ventana)
+                    if not permitido:
+                        respuesta = make_response(render_template('errores/429.html', reintentar=reintentar), 429)
+                        respuesta.headers['Retry-After'] = str(reintentar)
+                        return respuesta
+            return vista(*args, **kwargs)
+        return envoltura
+    return decorador
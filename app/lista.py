@@ -0,0 +1,87 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import db, Asistencia, obtener_hora_vzla
+from app.consultas import estudiantes_de_seccion
+from app.resumen import sumar_asistencias
+from app.sincronizacion import registrar_bajas
+
+# --- PASE DE LISTA MANUAL ---
+# Aplica la lista completa de una sesión con una sentencia de inserción y
+# una de borrado, dentro de la transacción del llamador (no hace commit).
+# Solo se quita a quien el docente vio presente y desmarcó: un estudiante
+# que marcó por QR mientras el formulario estaba abierto aparece sin marcar
+# en ese formulario, pero su asistencia no se toca.
+
+def _insertar_ignorando_duplicados():
+    # Un QR marcado mientras el docente pasaba lista no debe romper el lote
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto == 'postgresql':
+        return postgresql.insert(Asistencia).on_conflict_do_nothing(
+            index_elements=['sesion_id', 'estudiante_id'])
+    if dialecto == 'sqlite':
+        return sqlite.insert(Asistencia).on_conflict_do_nothing()
+    return db.insert(Asistencia)
+
+def aplicar_lista(sesion, materia, marcados, mostrados):
+    """Marca presentes a los 'marcados' y quita a los 'mostrados' que ya no lo están.
+
+    mostrados: estudiantes que el formulario mostró como presentes.
+    Devuelve {'agregados': [...], 'eliminados': [...], 'sin_cambios': n}
+    con los estudiantes que realmente cambiaron.
+    """
+    nomina = {e.id: e for e in estudiantes_de_seccion(materia.codigo_seccion)}
+    marcados = set(marcados) & set(nomina)
+    desmarcados = set(mostrados) - marcados
+
+    actuales = set(db.session.execute(
+        db.select(Asistencia.estudiante_id).where(Asistencia.sesion_id == sesion.id)
+    ).scalars())
+
+    # Solo se quitan estudiantes de la nómina; los de otra sección quedan intactos
+    por_agregar = marcados - actuales
+    por_quitar = actuales & set(nomina) & desmarcados
+
+    ahora = obtener_hora_vzla()
+    agregados = set()
+    if por_agregar:
+        agregados = set(db.session.execute(
+            _insertar_ignorando_duplicados().returning(Asistencia.estudiante_id),
+            [{
+                'estudiante_id': estudiante_id,
+                'materia_id': materia.id,
+                'sesion_id': sesion.id,
+                'fecha': ahora,
+                'fecha_solo_dia': ahora.date(),
+                'estado': 'Presente',
+                'metodo': 'manual',
+            } for estudiante_id in por_agregar]
+        ).scalars())
+
+    eliminados = set()
+    if por_quitar:
+        borradas = db.session.execute(
+            db.delete(Asistencia)
+            .where(Asistencia.sesion_id == sesion.id, Asistencia.estudiante_id.in_(por_quitar))
+            .returning(Asistencia.id, Asistencia.estudiante_id, Asistencia.fecha),
+            execution_options={'synchronize_session': False}
+        ).all()
+        eliminados = {estudiante_id for _, estudiante_id, _ in borradas}
+        registrar_bajas([{
+            'asistencia_id': asistencia_id,
+            'cedula': nomina[estudiante_id].cedula,
+            'materia': materia.nombre,
+            'seccion': materia.codigo_seccion,
+            'fecha': fecha,
+        } for asistencia_id, estudiante_id, fecha in borradas])
+
+    sumar_asistencias(materia.id, agregados, 1, ahora)
+    sumar_asistencias(materia.id, eliminados, -1)
+
+    def describir(ids):
+        return [{'id': i, 'cedula': nomina[i].cedula, 'nombre': nomina[i].nombre}
+                for i in sorted(ids, key=lambda i: nomina[i].nombre)]
+
+    return {
+        'agregados': describir(agregados),
+        'eliminados': describir(eliminados),
+        'sin_cambios': len(nomina) - len(agregados) - len(eliminados),
+    }
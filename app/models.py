@@ -1,10 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import validates
+from app.texto import normalizar_busqueda
+from app.sedes import SesionSedes
 from datetime import datetime
 import pytz
 
-db = SQLAlchemy()
+# La sesión elige la base de la sede del usuario (ver app/sedes.py)
+db = SQLAlchemy(session_options={'class_': SesionSedes})
 
 # --- FUNCIÓN AUXILIAR PARA HORA DE VENEZUELA ---
 def obtener_hora_vzla():
@@ -31,6 +35,27 @@ class Usuario(UserMixin, db.Model):
     ciudad = db.Column(db.String(50), nullable=True)
     semestre = db.Column(db.String(10), nullable=True) 
     seccion_estudiante = db.Column(db.String(5), nullable=True) 
+    # Copia normalizada de 'nombre' para la búsqueda del historial
+    nombre_busqueda = db.Column(db.String(100), nullable=True)
+    # Sube con cada cambio en sus contadores: es parte de la clave del resumen
+    # cacheado, así ningún worker sirve un resumen anterior al último marcaje
+    resumen_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # Nómina de una sección (exportación de inasistencias)
+        db.Index('idx_usuarios_seccion_rol', 'seccion_estudiante', 'rol'),
+        # Búsqueda por nombre: trigramas en Postgres (LIKE '%texto%'), índice normal en SQLite
+        db.Index('idx_usuarios_nombre_busqueda', 'nombre_busqueda',
+                 postgresql_using='gin', postgresql_ops={'nombre_busqueda': 'gin_trgm_ops'}),
+        # Búsqueda por prefijo de cédula (LIKE '123%') con cualquier collation
+        db.Index('idx_usuarios_cedula_prefijo', 'cedula',
+                 postgresql_ops={'cedula': 'varchar_pattern_ops'}),
+    )
+
+    @validates('nombre')
+    def _sincronizar_busqueda(self, key, valor):
+        self.nombre_busqueda = normalizar_busqueda(valor)
+        return valor
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -60,9 +85,12 @@ class Materia(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
     codigo_seccion = db.Column(db.String(50), nullable=False) 
-    docente_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
-    token_activo = db.Column(db.String(10), nullable=True)
+    docente_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True)
+    token_activo = db.Column(db.String(10), nullable=True, index=True)
     clase_iniciada = db.Column(db.Boolean, default=False)
+    # Denominador del resumen del estudiante: sesiones de clase abiertas
+    clases_dictadas = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    ultima_clase = db.Column(db.Date, nullable=True)
     
     docente = db.relationship('Usuario', backref='materias_asignadas')
 
@@ -91,14 +119,176 @@ class Asistencia(db.Model):
     
     estado = db.Column(db.String(20), nullable=False, default='Presente') 
     metodo = db.Column(db.String(20), default='qr') 
+    # Sesión de clase en la que se marcó (NULL en registros anteriores a las sesiones)
+    sesion_id = db.Column(db.Integer, db.ForeignKey('clase_sesiones.id', name='fk_asistencias_sesion_id'), nullable=True)
 
     estudiante = db.relationship('Usuario', backref='asistencias')
     materia = db.relationship('Materia', backref='asistencias_registradas')
+    sesion = db.relationship('ClaseSesion', backref='asistencias')
 
     __table_args__ = (
+        # Un estudiante marca una sola vez por sesión; también sirve para listar la sesión
+        db.UniqueConstraint('sesion_id', 'estudiante_id', name='uq_asistencia_sesion_estudiante'),
         db.Index('idx_asistencia_busqueda', 'estudiante_id', 'materia_id'),
+        # Lista del día de una materia y filtros por fecha del historial
+        db.Index('idx_asistencia_materia_fecha', 'materia_id', 'fecha'),
+        db.Index('idx_asistencia_fecha', 'fecha'),
+    )
+
+# --- TABLA 6: RESUMEN DE ASISTENCIAS (Contadores por estudiante y materia) ---
+# Se mantiene al registrar o eliminar asistencias para que el resumen del
+# estudiante no tenga que contar filas de 'asistencias'.
+class ResumenAsistencia(db.Model):
+    __tablename__ = 'resumen_asistencias'
+
+    id = db.Column(db.Integer, primary_key=True)
+    estudiante_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    materia_id = db.Column(db.Integer, db.ForeignKey('materias.id'), nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    ultima_fecha = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('estudiante_id', 'materia_id', name='uq_resumen_estudiante_materia'),
+    )
+
+# --- TABLA 7: TRABAJOS DE REPORTE (Generación en segundo plano) ---
+class TrabajoReporte(db.Model):
+    __tablename__ = 'trabajos_reporte'
+
+    id = db.Column(db.String(32), primary_key=True)
+    tipo = db.Column(db.String(30), nullable=False)
+    parametros = db.Column(db.Text, nullable=False, default='{}')
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')
+    progreso = db.Column(db.Integer, nullable=False, default=0)
+    mensaje = db.Column(db.String(255), nullable=True)
+    solicitado_por = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True)
+    creado = db.Column(db.DateTime, default=obtener_hora_vzla)
+    terminado = db.Column(db.DateTime, nullable=True)
+    # Lo renueva periódicamente el proceso que tiene el trabajo en su cola
+    latido = db.Column(db.DateTime, nullable=True)
+    expira = db.Column(db.DateTime, nullable=True, index=True)
+    nombre_archivo = db.Column(db.String(150), nullable=True)
+    # CSV comprimido con gzip
+    archivo = db.deferred(db.Column(db.LargeBinary, nullable=True))
+
+    usuario = db.relationship('Usuario', backref='trabajos_reporte')
+
+# --- TABLA 8: SESIONES DE CLASE ---
+# Cada apertura de clase (iniciar_clase) hasta su cierre (cerrar_clase).
+class ClaseSesion(db.Model):
+    __tablename__ = 'clase_sesiones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    materia_id = db.Column(db.Integer, db.ForeignKey('materias.id'), nullable=False)
+    token = db.Column(db.String(10), nullable=False)
+    abierta_en = db.Column(db.DateTime, default=obtener_hora_vzla, nullable=False)
+    cerrada_en = db.Column(db.DateTime, nullable=True)
+
+    materia = db.relationship('Materia', backref='sesiones')
+
+    __table_args__ = (
+        # Solo las sesiones abiertas aceptan marcajes
+        db.Index('idx_sesion_token_abierta', 'token',
+                 postgresql_where=db.text('cerrada_en IS NULL'),
+                 sqlite_where=db.text('cerrada_en IS NULL')),
+        db.Index('idx_sesion_materia_apertura', 'materia_id', 'abierta_en'),
     )
 
+# --- TABLA 9: BITÁCORA DE AUDITORÍA (Solo inserción) ---
+# Se escribe por lotes desde app/auditoria.py. En Postgres la migración la
+# crea particionada por mes (rango sobre 'fecha') y rechaza UPDATE y DELETE.
+class EventoAuditoria(db.Model):
+    __tablename__ = 'eventos_auditoria'
+
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.DateTime, nullable=False, default=obtener_hora_vzla)
+    # Sin clave foránea: el evento sobrevive al usuario (p. ej. un docente rechazado)
+    actor_id = db.Column(db.Integer, nullable=True)
+    actor_rol = db.Column(db.String(20), nullable=True)
+    accion = db.Column(db.String(40), nullable=False)
+    objetivo_tipo = db.Column(db.String(30), nullable=True)
+    objetivo_id = db.Column(db.Integer, nullable=True)
+    sede = db.Column(db.String(30), nullable=True)
+    ip = db.Column(db.String(45), nullable=True)
+    # JSON con los datos propios de cada acción
+    detalle = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        # La vista pagina por id descendente: (filtro, id) sirve filtro y orden a la vez
+        db.Index('idx_auditoria_fecha', 'fecha'),
+        db.Index('idx_auditoria_actor', 'actor_id', 'id'),
+        db.Index('idx_auditoria_accion', 'accion', 'id'),
+        db.Index('idx_auditoria_objetivo', 'objetivo_tipo', 'objetivo_id'),
+    )
+
+# --- TABLA 10: ESTUDIANTES EN RIESGO (Resultado de 'flask calcular-riesgo') ---
+# Se reemplaza completa en cada cálculo; ver app/riesgo.py.
+class RiesgoAsistencia(db.Model):
+    __tablename__ = 'riesgo_asistencia'
+
+    id = db.Column(db.Integer, primary_key=True)
+    estudiante_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    materia_id = db.Column(db.Integer, db.ForeignKey('materias.id'), nullable=False)
+    clases = db.Column(db.Integer, nullable=False)
+    asistencias = db.Column(db.Integer, nullable=False)
+    inasistencias = db.Column(db.Integer, nullable=False)
+    porcentaje_inasistencia = db.Column(db.Float, nullable=False)
+    # Faltas seguidas hasta la última clase, y la mayor del período
+    racha_actual = db.Column(db.Integer, nullable=False)
+    racha_maxima = db.Column(db.Integer, nullable=False)
+    ultima_asistencia = db.Column(db.DateTime, nullable=True)
+    en_riesgo = db.Column(db.Boolean, nullable=False)
+    calculado_en = db.Column(db.DateTime, nullable=False)
+
+    estudiante = db.relationship('Usuario')
+    materia = db.relationship('Materia')
+
+    __table_args__ = (
+        db.UniqueConstraint('estudiante_id', 'materia_id', name='uq_riesgo_estudiante_materia'),
+        # La vista lista solo los que están en riesgo, de peor a mejor
+        db.Index('idx_riesgo_lista', 'en_riesgo', 'porcentaje_inasistencia'),
+        db.Index('idx_riesgo_materia', 'materia_id'),
+    )
+
+# --- TABLA 11: ASISTENCIAS ELIMINADAS (Para la sincronización con Tepuy) ---
+# Cada borrado de una asistencia deja aquí su copia mínima, en la misma
+# transacción, para que la próxima exportación incremental informe la baja.
+class AsistenciaBaja(db.Model):
+    __tablename__ = 'asistencias_bajas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    asistencia_id = db.Column(db.Integer, nullable=False)
+    cedula = db.Column(db.String(20), nullable=False)
+    materia = db.Column(db.String(100), nullable=False)
+    seccion = db.Column(db.String(50), nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False)
+    eliminada_en = db.Column(db.DateTime, nullable=False, default=obtener_hora_vzla)
+
+# --- TABLA 12: MARCAS DE SINCRONIZACIÓN (Una por destino) ---
+# Hasta qué asistencia y qué baja ya se exportó a cada destino. 'pendiente_*'
+# guarda el rango de una exportación en curso: si falla, la siguiente repite
+# exactamente ese rango.
+class MarcaSincronizacion(db.Model):
+    __tablename__ = 'marcas_sincronizacion'
+
+    id = db.Column(db.Integer, primary_key=True)
+    destino = db.Column(db.String(50), unique=True, nullable=False)
+    ultimo_id = db.Column(db.Integer, nullable=False, default=0)
+    ultima_baja_id = db.Column(db.Integer, nullable=False, default=0)
+    pendiente_id = db.Column(db.Integer, nullable=True)
+    pendiente_baja_id = db.Column(db.Integer, nullable=True)
+    ultima_ejecucion = db.Column(db.DateTime, nullable=True)
+    ultimo_archivo = db.Column(db.String(255), nullable=True)
+
+# --- TABLA 13: VERSIONES DE FRAGMENTOS CACHEADOS ---
+# Sube en la misma transacción que cambia los datos del grupo: todos los
+# workers dejan de usar los fragmentos viejos en cuanto se hace el commit.
+class VersionFragmentos(db.Model):
+    __tablename__ = 'versiones_fragmentos'
+
+    grupo = db.Column(db.String(80), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
 class CatalogoMaterias(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), unique=True, nullable=False)
@@ -0,0 +1,154 @@
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import ClosingIterator
+
+# --- PERFILADOR POR MUESTREO (Bajo demanda, solo admin) ---
+# Mientras está apagado no hay ningún hook instalado: app.wsgi_app es el
+# original. Al activarlo se envuelve app.wsgi_app para marcar los hilos que
+# atienden los requests elegidos, y un hilo aparte lee sus pilas con
+# sys._current_frames() cada pocos milisegundos. Las pilas se acumulan en
+# formato "colapsado" (endpoint;modulo:funcion;... cantidad), el que leen
+# flamegraph.pl y speedscope.
+#
+# El perfil es del worker que recibió la orden. Con workers gevent no
+# arranca: los requests corren en greenlets dentro de un mismo hilo real y
+# sys._current_frames() solo ve la pila de ese hilo, no la de cada request.
+
+def _hilos_parcheados():
+    # Si gevent parcheó threading ya está importado; en modo sync no se importa
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+class Perfilador:
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._original = None
+        self._hilos = {}
+        self.pilas = Counter()
+        self.endpoint = None
+        self.fraccion = 1.0
+        self.inicio = None
+        self.hasta = 0.0
+        self.muestras = 0
+        self.descartadas = 0
+        self.requests = 0
+        self._ronda = 0
+
+    @property
+    def activo(self):
+        return self._original is not None
+
+    def iniciar(self, endpoint=None, fraccion=1.0, segundos=60):
+        if _hilos_parcheados():
+            raise RuntimeError('El perfilador no funciona con workers gevent: '
+                               'úsalo en un worker sync (SIGAU_WORKER_CLASS=sync).')
+        config = self.app.config
+        segundos = max(1, min(segundos, config.get('PERFILADOR_MAX_SEGUNDOS', 300)))
+        with self._lock:
+            if self.activo:
+                raise RuntimeError('El perfilador ya está activo.')
+            self.pilas = Counter()
+            self.endpoint = endpoint or None
+            self.fraccion = max(0.0, min(1.0, fraccion))
+            self.inicio = time.time()
+            self.hasta = time.monotonic() + segundos
+            self.muestras = self.descartadas = self.requests = 0
+            self._original = self.app.wsgi_app
+            self.app.wsgi_app = self._envolver(self._original)
+            self._ronda += 1
+            ronda = self._ronda
+
+        intervalo = config.get('PERFILADOR_INTERVALO_MS', 5) / 1000
+        threading.Thread(target=self._muestrear, args=(ronda, intervalo),
+                         name='perfilador', daemon=True).start()
+
+    def detener(self):
+        with self._lock:
+            self._restaurar()
+
+    def _restaurar(self):
+        if self._original is not None:
+            self.app.wsgi_app = self._original
+            self._original = None
+        self._hilos.clear()
+
+    def _elegir(self, environ):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            endpoint = 'sin_ruta'
+        if self.endpoint and endpoint != self.endpoint:
+            return None
+        if random.random() >= self.fraccion:
+            return None
+        return endpoint
+
+    def _envolver(self, wsgi_app):
+        def medido(environ, start_response):
+            endpoint = self._elegir(environ)
+            if endpoint is None:
+                return wsgi_app(environ, start_response)
+
+            ident = threading.get_ident()
+            self._hilos[ident] = endpoint
+            self.requests += 1
+            try:
+                respuesta = wsgi_app(environ, start_response)
+            except BaseException:
+                self._hilos.pop(ident, None)
+                raise
+            # Las respuestas en streaming (CSV) se siguen midiendo hasta cerrarse
+            return ClosingIterator(respuesta, lambda: self._hilos.pop(ident, None))
+        return medido
+
+    def _muestrear(self, ronda, intervalo):
+        maximo = self.app.config.get('PERFILADOR_MAX_PILAS', 20000)
+        # Si lo detienen y lo vuelven a iniciar, este hilo termina y sigue el nuevo
+        while self.activo and self._ronda == ronda and time.monotonic() < self.hasta:
+            marcos = sys._current_frames()
+            for ident, endpoint in list(self._hilos.items()):
+                marco = marcos.get(ident)
+                if marco is None:
+                    continue
+                pila = []
+                while marco is not None:
+                    codigo = marco.f_code
+                    nombre = getattr(codigo, 'co_qualname', codigo.co_name)
+                    pila.append(f"{marco.f_globals.get('__name__', '?')}:{nombre}")
+                    marco = marco.f_back
+                clave = ';'.join([endpoint] + pila[::-1])
+                if clave in self.pilas or len(self.pilas) < maximo:
+                    self.pilas[clave] += 1
+                else:
+                    self.descartadas += 1
+            self.muestras += 1
+            time.sleep(intervalo)
+
+        with self._lock:
+            if self._ronda == ronda:
+                self._restaurar()
+
+    def estado(self):
+        return {
+            'activo': self.activo,
+            'disponible': not _hilos_parcheados(),
+            'endpoint': self.endpoint,
+            'fraccion': self.fraccion,
+            'inicio': self.inicio,
+            'segundos_restantes': max(0, round(self.hasta - time.monotonic())) if self.activo else 0,
+            'requests_medidos': self.requests,
+            'muestras': self.muestras,
+            'pilas_distintas': len(self.pilas),
+            'pilas_descartadas': self.descartadas,
+        }
+
+    def colapsado(self):
+        return ''.join(f'{pila} {n}\n' for pila, n in self.pilas.most_common())
+
+def init_perfilador(app):
+    app.extensions['perfilador'] = Perfilador(app)
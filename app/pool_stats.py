@@ -0,0 +1,107 @@
+import threading
+import time
+import weakref
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# --- TELEMETRÍA DEL POOL DE CONEXIONES ---
+# Las cifras son por proceso: cada worker de gunicorn tiene su propio pool.
+
+class _Contadores:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.conexiones_nuevas = 0
+        self.timeouts = 0
+        self.errores_conexion = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar_espera(self, segundos):
+        with self.lock:
+            self.espera_total += segundos
+            if segundos > self.espera_max:
+                self.espera_max = segundos
+
+    def sumar(self, campo):
+        with self.lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def como_dict(self):
+        with self.lock:
+            promedio = self.espera_total / self.checkouts if self.checkouts else 0.0
+            return {
+                'checkouts': self.checkouts,
+                'conexiones_nuevas': self.conexiones_nuevas,
+                'timeouts': self.timeouts,
+                'errores_conexion': self.errores_conexion,
+                'espera_promedio_ms': round(promedio * 1000, 3),
+                'espera_max_ms': round(self.espera_max * 1000, 3),
+            }
+
+# Cada engine (la base principal y el bind de cada sede) lleva sus propios
+# contadores: sumarlos todos escondería cuál de los pools se está agotando
+_por_engine = weakref.WeakKeyDictionary()
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide cuánto espera cada petición por una conexión libre."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.contadores = _Contadores()
+
+    def recreate(self):
+        # engine.dispose() cambia el pool: las cifras siguen con el engine
+        nuevo = super().recreate()
+        nuevo.contadores = self.contadores
+        return nuevo
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.contadores.sumar('timeouts')
+            raise
+        except Exception:
+            # Fallas al abrir una conexión nueva (DNS, clave, max_connections):
+            # no son esperas agotadas en el pool
+            self.contadores.sumar('errores_conexion')
+            raise
+        finally:
+            self.contadores.registrar_espera(time.perf_counter() - inicio)
+
+def instrumentar_pool(engine):
+    # NullPool (PgBouncer) y los pools de SQLite también cuentan checkouts y conexiones
+    contadores = getattr(engine.pool, 'contadores', None) or _Contadores()
+    _por_engine[engine] = contadores
+
+    @event.listens_for(engine, 'checkout')
+    def _al_checkout(dbapi_conn, registro, proxy):
+        contadores.sumar('checkouts')
+
+    @event.listens_for(engine, 'connect')
+    def _al_conectar(dbapi_conn, registro):
+        contadores.sumar('conexiones_nuevas')
+
+def estadisticas_pool(engine):
+    pool = engine.pool
+    datos = {'clase': type(pool).__name__}
+    # NullPool (modo PgBouncer) no mantiene conexiones propias
+    if isinstance(pool, QueuePool):
+        datos.update({
+            'tamano': pool.size(),
+            'en_uso': pool.checkedout(),
+            'libres': pool.checkedin(),
+            'overflow': max(0, pool.overflow()),
+            'max_overflow': pool._max_overflow,
+        })
+    contadores = _por_engine.get(engine)
+    if contadores is not None:
+        datos.update(contadores.como_dict())
+    return datos
+
+def estadisticas_pools(engines):
+    """Estadísticas de cada engine de Flask-SQLAlchemy (db.engines), por bind."""
+    return {'principal' if clave is None else clave: estadisticas_pool(motor)
+            for clave, motor in engines.items()}
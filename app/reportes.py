@@ -0,0 +1,62 @@
+from flask import current_app
+from app.models import db, Asistencia, obtener_hora_vzla
+from app.consultas import estudiantes_de_seccion, rango_dia, proyeccion_asistencias
+from app.sedes import en_sede, todas_las_sedes, para_cada_sede
+
+# --- GENERADORES DE REPORTES ---
+# Cada generador devuelve (nombre_archivo, encabezado, total_estimado, filas).
+# 'filas' es un iterador perezoso para que el CSV se escriba por partes, tanto
+# en la descarga directa como en los trabajos en segundo plano.
+
+def reporte_general():
+    """Reporte de todas las sedes, una tras otra."""
+    encabezado = ['Fecha', 'Hora', 'Asignatura', 'Sección', 'Docente', 'Estudiante', 'Cédula', 'Sección Alumno', 'Estado']
+    consulta = proyeccion_asistencias().order_by(Asistencia.fecha.desc())
+    app = current_app._get_current_object()
+
+    # Las mismas filas que se van a escribir, con sus joins y sin el orden
+    total = 0
+    for sede in todas_las_sedes(app):
+        with en_sede(sede):
+            total += proyeccion_asistencias().order_by(None).count()
+
+    def filas_de_sede():
+        # Filas ya unidas con estudiante, materia y docente: sin consultas por registro
+        for reg in consulta.yield_per(1000):
+            yield [
+                reg.fecha.strftime('%d/%m/%Y'),
+                reg.fecha.strftime('%H:%M'),
+                reg.materia,
+                reg.codigo_seccion,
+                reg.docente,
+                reg.estudiante,
+                reg.cedula,
+                reg.seccion_estudiante or 'S/D',
+                reg.estado
+            ]
+
+    return 'reporte_asistencia.csv', encabezado, total, para_cada_sede(app, db.session, filas_de_sede)
+
+def reporte_inasistencias(materia, sesion=None):
+    """Inasistentes de una sesión; sin sesión (datos antiguos) se usa el día de hoy."""
+    encabezado = ['CEDULA', 'FECHA_FALTA', 'CODIGO_MATERIA', 'SECCION']
+    estudiantes = estudiantes_de_seccion(materia.codigo_seccion).all()
+
+    if sesion:
+        hoy_str = sesion.abierta_en.strftime('%Y-%m-%d')
+        presentes_q = db.session.query(Asistencia.estudiante_id).filter(Asistencia.sesion_id == sesion.id)
+    else:
+        hoy_str = obtener_hora_vzla().strftime('%Y-%m-%d')
+        inicio, fin = rango_dia(hoy_str)
+        presentes_q = db.session.query(Asistencia.estudiante_id).filter(
+            Asistencia.materia_id == materia.id, Asistencia.fecha >= inicio, Asistencia.fecha < fin)
+
+    presentes = {estudiante_id for (estudiante_id,) in presentes_q}
+    inasistentes = [e for e in estudiantes if e.id not in presentes]
+
+    def filas():
+        for alumno in inasistentes:
+            yield [alumno.cedula, hoy_str, materia.nombre, materia.codigo_seccion]
+
+    nombre = f"Inasistencias_{materia.nombre}_{hoy_str}.csv"
+    return nombre, encabezado, len(inasistentes), filas()
@@ -0,0 +1,140 @@
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import db, Materia, ResumenAsistencia, Usuario
+from app.cache import CacheTTL
+
+# --- RESUMEN DE ASISTENCIA DEL ESTUDIANTE ---
+# El resumen se arma con una sola consulta sobre las materias de la sección
+# y sus contadores, sin importar cuántas asistencias acumule el estudiante.
+# Se cachea por (usuario, resumen_version): cada cambio de contadores sube
+# la versión en la misma transacción, así que después del commit ningún
+# worker vuelve a usar la entrada vieja, y una lectura que ocurra antes del
+# commit queda guardada bajo la versión anterior. El TTL solo cubre lo que
+# no cambia la versión (clases nuevas de la materia).
+cache_resumen = CacheTTL(maximo=5000, ttl=300)
+
+def _nueva_version(estudiante_ids):
+    db.session.execute(
+        db.update(Usuario)
+        .where(Usuario.id.in_(estudiante_ids))
+        .values(resumen_version=Usuario.resumen_version + 1),
+        execution_options={'synchronize_session': False}
+    )
+
+def _upsert_contadores(filas):
+    # Inserta o suma en una sola sentencia: dos marcajes simultáneos del
+    # mismo estudiante y materia no chocan con la restricción única
+    dialecto = db.session.get_bind(mapper=ResumenAsistencia).dialect.name
+    modulo = postgresql if dialecto == 'postgresql' else sqlite
+    sentencia = modulo.insert(ResumenAsistencia)
+    db.session.execute(sentencia.on_conflict_do_update(
+        index_elements=['estudiante_id', 'materia_id'],
+        set_={
+            'total': ResumenAsistencia.total + sentencia.excluded.total,
+            'ultima_fecha': db.func.coalesce(sentencia.excluded.ultima_fecha, ResumenAsistencia.ultima_fecha),
+        }
+    ), filas)
+
+def sumar_asistencias(materia_id, estudiante_ids, delta, fecha=None):
+    """Ajusta los contadores de muchos estudiantes de una materia.
+
+    Trabaja dentro de la transacción del llamador (no hace commit).
+    """
+    estudiante_ids = set(estudiante_ids)
+    if not estudiante_ids:
+        return
+
+    if delta > 0:
+        _upsert_contadores([
+            {'estudiante_id': e, 'materia_id': materia_id, 'total': delta, 'ultima_fecha': fecha}
+            for e in estudiante_ids
+        ])
+    else:
+        valores = {'total': ResumenAsistencia.total + delta}
+        if fecha is not None:
+            valores['ultima_fecha'] = fecha
+        db.session.execute(
+            db.update(ResumenAsistencia)
+            .where(ResumenAsistencia.materia_id == materia_id,
+                   ResumenAsistencia.estudiante_id.in_(estudiante_ids))
+            .values(valores),
+            execution_options={'synchronize_session': False}
+        )
+
+    _nueva_version(estudiante_ids)
+
+def sumar_asistencia(estudiante_id, materia_id, delta=1, fecha=None):
+    """Ajusta el contador dentro de la transacción del llamador (no hace commit)."""
+    sumar_asistencias(materia_id, [estudiante_id], delta, fecha)
+
+def registrar_clase_dictada(materia, hoy):
+    # Se llama al abrir una sesión nueva; renovar el token de una sesión abierta no cuenta
+    materia.clases_dictadas = (materia.clases_dictadas or 0) + 1
+    materia.ultima_clase = hoy
+
+def resumen_estudiante(usuario):
+    clave = (usuario.id, usuario.resumen_version or 0)
+    resumen = cache_resumen.obtener(clave)
+    if resumen is not None:
+        return resumen
+
+    seccion = str(usuario.seccion_estudiante or '').strip().upper()
+
+    # Materias de su sección más aquellas donde ya tenga asistencias
+    filas = db.session.query(
+        Materia.id, Materia.nombre, Materia.codigo_seccion, Materia.clases_dictadas,
+        ResumenAsistencia.total, ResumenAsistencia.ultima_fecha
+    ).outerjoin(ResumenAsistencia, and_(
+        ResumenAsistencia.materia_id == Materia.id,
+        ResumenAsistencia.estudiante_id == usuario.id
+    )).filter(or_(
+        db.func.upper(db.func.trim(Materia.codigo_seccion)) == seccion,
+        ResumenAsistencia.id.isnot(None)
+    )).order_by(Materia.nombre).all()
+
+    resumen = []
+    for materia_id, nombre, seccion_materia, dictadas, total, ultima in filas:
+        total = total or 0
+        dictadas = dictadas or 0
+        porcentaje = round(min(total, dictadas) * 100 / dictadas, 1) if dictadas else None
+        resumen.append({
+            'materia_id': materia_id,
+            'materia': nombre,
+            'seccion': seccion_materia,
+            'asistencias': total,
+            'clases_dictadas': dictadas,
+            'porcentaje': porcentaje,
+            'ultima_asistencia': ultima.isoformat() if ultima else None,
+        })
+
+    cache_resumen.guardar(clave, resumen)
+    return resumen
+
+def recalcular_contadores():
+    """Reconstruye todos los contadores desde 'asistencias' (carga masiva o reparación)."""
+    db.session.execute(db.text("DELETE FROM resumen_asistencias"))
+    db.session.execute(db.text("""
+        INSERT INTO resumen_asistencias (estudiante_id, materia_id, total, ultima_fecha)
+        SELECT estudiante_id, materia_id, COUNT(*), MAX(fecha)
+        FROM asistencias
+        GROUP BY estudiante_id, materia_id
+    """))
+    db.session.execute(db.text("""
+        UPDATE materias SET
+            clases_dictadas = (
+                SELECT COUNT(*) FROM clase_sesiones s
+                WHERE s.materia_id = materias.id
+            ) + (
+                -- Registros previos a las sesiones: cada día cuenta como una clase
+                SELECT COUNT(DISTINCT DATE(a.fecha)) FROM asistencias a
+                WHERE a.materia_id = materias.id AND a.sesion_id IS NULL
+            ),
+            ultima_clase = (
+                SELECT MAX(DATE(a.fecha)) FROM asistencias a
+                WHERE a.materia_id = materias.id
+            )
+    """))
+    # Todos los resúmenes cacheados quedan viejos, también en los otros workers
+    db.session.execute(db.update(Usuario).values(resumen_version=Usuario.resumen_version + 1))
+    db.session.commit()
+    cache_resumen.limpiar()
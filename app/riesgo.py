@@ -0,0 +1,109 @@
+from datetime import timedelta
+from flask import current_app
+from app.models import db, obtener_hora_vzla
+from app.sedes import en_sede, todas_las_sedes
+
+# --- ESTUDIANTES EN RIESGO (Cálculo nocturno) ---
+# Una sola sentencia INSERT ... SELECT por sede recalcula, para cada
+# estudiante de la nómina de cada materia, cuántas clases del período tuvo,
+# a cuántas asistió y sus rachas de faltas seguidas. El resultado queda en
+# 'riesgo_asistencia' y la vista y el CSV leen de ahí, nunca de 'asistencias'.
+#
+# Una clase es una sesión (clase_sesiones) o, en los registros anteriores a
+# las sesiones, un día con al menos un marcaje, igual que en los contadores.
+# Las rachas salen de la técnica de "islas": dentro de cada estudiante y
+# materia, orden - ROW_NUMBER() por (presente) es constante en cada tramo de
+# clases seguidas con el mismo estado.
+
+SQL_RIESGO = """
+WITH clases AS (
+    SELECT s.materia_id, 's' || s.id AS clase, s.abierta_en AS momento
+    FROM clase_sesiones s
+    WHERE s.abierta_en >= :desde
+    UNION ALL
+    SELECT a.materia_id, 'd' || DATE(a.fecha), MIN(a.fecha)
+    FROM asistencias a
+    WHERE a.sesion_id IS NULL AND a.fecha >= :desde
+    GROUP BY a.materia_id, DATE(a.fecha)
+),
+numeradas AS (
+    SELECT materia_id, clase, momento,
+           ROW_NUMBER() OVER (PARTITION BY materia_id ORDER BY momento, clase) AS orden,
+           COUNT(*) OVER (PARTITION BY materia_id) AS total_clases
+    FROM clases
+),
+presencias AS (
+    SELECT DISTINCT a.materia_id, a.estudiante_id,
+           CASE WHEN a.sesion_id IS NULL THEN 'd' || DATE(a.fecha) ELSE 's' || a.sesion_id END AS clase
+    FROM asistencias a
+    WHERE a.fecha >= :desde
+),
+marcas AS (
+    SELECT m.id AS materia_id, u.id AS estudiante_id, c.orden, c.total_clases, c.momento,
+           CASE WHEN p.estudiante_id IS NULL THEN 0 ELSE 1 END AS presente
+    FROM materias m
+    JOIN usuarios u ON u.rol = 'estudiante' AND u.seccion_estudiante = m.codigo_seccion
+    JOIN numeradas c ON c.materia_id = m.id
+    LEFT JOIN presencias p ON p.materia_id = m.id AND p.estudiante_id = u.id AND p.clase = c.clase
+),
+islas AS (
+    SELECT materia_id, estudiante_id, orden, presente,
+           orden - ROW_NUMBER() OVER (PARTITION BY materia_id, estudiante_id, presente ORDER BY orden) AS isla
+    FROM marcas
+),
+rachas AS (
+    SELECT materia_id, estudiante_id, COUNT(*) AS largo, MAX(orden) AS hasta
+    FROM islas
+    WHERE presente = 0
+    GROUP BY materia_id, estudiante_id, isla
+),
+totales AS (
+    SELECT materia_id, estudiante_id, MAX(total_clases) AS clases, SUM(presente) AS asistencias,
+           MAX(CASE WHEN presente = 1 THEN momento END) AS ultima_asistencia
+    FROM marcas
+    GROUP BY materia_id, estudiante_id
+),
+resultado AS (
+    SELECT t.materia_id, t.estudiante_id, t.clases, t.asistencias, t.ultima_asistencia,
+           COALESCE(MAX(r.largo), 0) AS racha_maxima,
+           -- La racha actual es la que llega hasta la última clase
+           COALESCE(MAX(CASE WHEN r.hasta = t.clases THEN r.largo END), 0) AS racha_actual
+    FROM totales t
+    LEFT JOIN rachas r ON r.materia_id = t.materia_id AND r.estudiante_id = t.estudiante_id
+    GROUP BY t.materia_id, t.estudiante_id, t.clases, t.asistencias, t.ultima_asistencia
+)
+INSERT INTO riesgo_asistencia (
+    estudiante_id, materia_id, clases, asistencias, inasistencias, porcentaje_inasistencia,
+    racha_actual, racha_maxima, ultima_asistencia, en_riesgo, calculado_en
+)
+SELECT estudiante_id, materia_id, clases, asistencias, clases - asistencias,
+       100.0 * (clases - asistencias) / clases,
+       racha_actual, racha_maxima, ultima_asistencia,
+       (100.0 * (clases - asistencias) >= :umbral * clases OR racha_actual >= :racha),
+       :ahora
+FROM resultado
+"""
+
+def calcular_riesgo(desde=None, umbral=None, racha=None):
+    """Reemplaza 'riesgo_asistencia' en cada sede. Devuelve {sede: filas_en_riesgo}."""
+    app = current_app._get_current_object()
+    config = app.config
+    ahora = obtener_hora_vzla()
+    parametros = {
+        'desde': desde or ahora - timedelta(days=config.get('RIESGO_DIAS', 120)),
+        'umbral': config.get('RIESGO_UMBRAL', 25) if umbral is None else umbral,
+        'racha': config.get('RIESGO_RACHA', 3) if racha is None else racha,
+        'ahora': ahora,
+    }
+
+    en_riesgo = {}
+    for sede in todas_las_sedes(app):
+        with en_sede(sede):
+            # Borrado e inserción en la misma transacción: la vista nunca ve la tabla vacía
+            db.session.execute(db.text('DELETE FROM riesgo_asistencia'))
+            db.session.execute(db.text(SQL_RIESGO), parametros)
+            en_riesgo[sede] = db.session.execute(db.text(
+                'SELECT COUNT(*) FROM riesgo_asistencia WHERE en_riesgo'
+            )).scalar()
+            db.session.commit()
+    return en_riesgo
@@ -1,10 +1,22 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response
+from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response, jsonify, abort, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
-from app.models import db, Materia, Asistencia, Usuario, CatalogoMaterias, Configuracion, SolicitudClave, obtener_hora_vzla
+from app.models import db, Materia, Asistencia, Usuario, CatalogoMaterias, Configuracion, SolicitudClave, TrabajoReporte, ClaseSesion, RiesgoAsistencia, obtener_hora_vzla
+from app.pool_stats import estadisticas_pools
+from app.resumen import sumar_asistencia, registrar_clase_dictada
+from app.tablero import conteos_materias, invalidar_tablero, clave_conteo
+from app.sedes import en_sede, sede_actual, sede_de, todas_las_sedes
+from app.lista import aplicar_lista
+from app.sincronizacion import registrar_bajas
+from app.fragmentos import invalidar_fragmentos
+from app.auditoria import auditar, ACCIONES
+from app.reportes import reporte_general, reporte_inasistencias
+from app.trabajos import encolar, csv_por_partes, limpiar_expirados
+from app.consultas import asistencias_del_dia, consulta_historial, sesion_abierta, asistencias_de_sesion, ultima_sesion, estudiantes_de_seccion, consulta_auditoria, consulta_riesgo, docentes_pendientes, solicitudes_de_clave
 import secrets
 import qrcode
 import io
 import base64
+import gzip
 from datetime import datetime, date
 import csv
 import pytz
@@ -14,6 +26,10 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 # Zona horaria global para conversiones de salida (Sincronizada)
 VZLA_TZ = pytz.timezone('America/Caracas')
 
+POR_PAGINA_HISTORIAL = 50
+POR_PAGINA_AUDITORIA = 50
+POR_PAGINA_RIESGO = 50
+
 # --- 1. DASHBOARD (Oficina Principal) ---
 @admin_bp.route('/dashboard')
 @login_required
@@ -37,6 +53,9 @@ def dashboard():
 
     return render_template('admin/dashboard.html', 
                             materias=mis_materias, 
+                            conteos=conteos_materias(current_user),
+                            sede=sede_actual(),
+                            clave_conteo=clave_conteo,
                             pendientes_count=pendientes_count,
                             config=config)
 
@@ -51,8 +70,22 @@ def iniciar_clase(materia_id):
         return redirect(url_for('admin.dashboard'))
 
     token_nuevo = secrets.token_hex(4).upper()
+    ahora = obtener_hora_vzla()
+
+    # Si la clase ya está abierta solo se renueva el token de la misma sesión
+    sesion = sesion_abierta(materia.id).first()
+    renovada = sesion is not None
+    if renovada:
+        sesion.token = token_nuevo
+    else:
+        sesion = ClaseSesion(materia_id=materia.id, token=token_nuevo, abierta_en=ahora)
+        db.session.add(sesion)
+        registrar_clase_dictada(materia, ahora.date())
+
     materia.token_activo = token_nuevo
     db.session.commit()
+    invalidar_tablero(materia.docente_id)
+    auditar('iniciar_clase', 'materia', materia.id, sesion_id=sesion.id, renovada=renovada)
     
     flash(f'¡Clase iniciada! Token: {token_nuevo}', 'success')
     return redirect(url_for('admin.ver_qr', materia_id=materia.id))
@@ -74,16 +107,55 @@ def ver_qr(materia_id):
     img.save(buffer, format="PNG")
     img_str = base64.b64encode(buffer.getvalue()).decode()
 
-    hoy_str = obtener_hora_vzla().strftime('%Y-%m-%d')
-    asistencias = Asistencia.query.filter(
-        Asistencia.materia_id == materia.id,
-        db.func.to_char(Asistencia.fecha, 'YYYY-MM-DD') == hoy_str
-    ).order_by(Asistencia.fecha.desc()).all()
+    sesion = sesion_abierta(materia.id).first()
+    if sesion:
+        asistencias = asistencias_de_sesion(sesion.id).all()
+    else:
+        asistencias = asistencias_del_dia(materia.id, obtener_hora_vzla()).all()
+
+    # Modo pase de lista: nómina con casillas (sin auto-refresco)
+    nomina = None
+    if request.args.get('lista') and sesion and materia.docente_id == current_user.id:
+        nomina = estudiantes_de_seccion(materia.codigo_seccion).order_by(Usuario.nombre).all()
 
     return render_template('admin/qr_view.html', 
                             materia=materia, 
                             qr_image=img_str,
-                            asistencias=asistencias)
+                            asistencias=asistencias,
+                            nomina=nomina,
+                            presentes={a.estudiante_id for a in asistencias})
+
+# --- 3.1 PASE DE LISTA MANUAL (Toda la clase en una transacción) ---
+@admin_bp.route('/pasar_lista/<int:materia_id>', methods=['POST'])
+@login_required
+def pasar_lista(materia_id):
+    materia = Materia.query.get_or_404(materia_id)
+
+    if materia.docente_id != current_user.id:
+        flash('No tienes permiso.', 'danger')
+        return redirect(url_for('admin.dashboard'))
+
+    sesion = sesion_abierta(materia.id).first()
+    if not sesion:
+        flash('La clase no está abierta.', 'warning')
+        return redirect(url_for('admin.dashboard'))
+
+    marcados = {int(i) for i in request.form.getlist('presentes') if i.isdigit()}
+    mostrados = {int(i) for i in request.form.getlist('mostrados') if i.isdigit()}
+    cambios = aplicar_lista(sesion, materia, marcados, mostrados)
+    invalidar_fragmentos('asistencias')
+    db.session.commit()
+    invalidar_tablero(materia.docente_id)
+    auditar('pasar_lista', 'sesion', sesion.id, materia_id=materia.id,
+            agregados=[e['id'] for e in cambios['agregados']],
+            eliminados=[e['id'] for e in cambios['eliminados']])
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(cambios)
+
+    flash(f"📋 Lista guardada: {len(cambios['agregados'])} agregados, "
+          f"{len(cambios['eliminados'])} retirados, {cambios['sin_cambios']} sin cambios.", 'success')
+    return redirect(url_for('admin.ver_qr', materia_id=materia.id))
 
 # --- 4. ELIMINAR ASISTENCIA (Modificado para POST) ---
 @admin_bp.route('/eliminar_asistencia/<int:asistencia_id>', methods=['GET', 'POST'])
@@ -96,8 +168,17 @@ def eliminar_asistencia(asistencia_id):
         flash('No tienes permiso.', 'danger')
         return redirect(url_for('admin.dashboard'))
 
+    # Datos del registro antes de borrarlo
+    detalle = {'estudiante_id': asistencia.estudiante_id, 'materia_id': materia.id,
+               'sesion_id': asistencia.sesion_id, 'fecha': asistencia.fecha, 'metodo': asistencia.metodo}
+    sumar_asistencia(asistencia.estudiante_id, materia.id, -1)
+    registrar_bajas([{'asistencia_id': asistencia.id, 'cedula': asistencia.estudiante.cedula,
+                      'materia': materia.nombre, 'seccion': materia.codigo_seccion,
+                      'fecha': asistencia.fecha}])
     db.session.delete(asistencia)
+    invalidar_fragmentos('asistencias')
     db.session.commit()
+    auditar('eliminar_asistencia', 'asistencia', asistencia_id, **detalle)
     
     flash('Asistencia eliminada.', 'warning')
     return redirect(url_for('admin.ver_qr', materia_id=materia.id))
@@ -113,22 +194,11 @@ def historial():
     materia_id = request.args.get('materia_id')
     fecha_filtro = request.args.get('fecha')
     seccion_filtro = request.args.get('seccion')
+    busqueda = request.args.get('q', '').strip()
+    pagina = request.args.get('pagina', 1, type=int)
 
-    query = Asistencia.query.join(Materia)
-
-    if current_user.rol != 'admin':
-        query = query.filter(Materia.docente_id == current_user.id)
-    
-    if materia_id:
-        query = query.filter(Asistencia.materia_id == materia_id)
-    
-    if fecha_filtro:
-        query = query.filter(db.func.to_char(Asistencia.fecha, 'YYYY-MM-DD') == fecha_filtro)
-        
-    if seccion_filtro:
-        query = query.filter(Materia.codigo_seccion == seccion_filtro)
-
-    asistencias = query.order_by(Asistencia.fecha.desc()).all()
+    paginacion = consulta_historial(current_user, materia_id, fecha_filtro, seccion_filtro, busqueda)\
+                    .paginate(page=pagina, per_page=POR_PAGINA_HISTORIAL, error_out=False)
 
     if current_user.rol == 'admin':
         todas_las_materias = Materia.query.all()
@@ -141,7 +211,15 @@ def historial():
     lista_secciones = [s[0] for s in secciones if s[0]]
 
     return render_template('admin/historial.html', 
-                            asistencias=asistencias, 
+                            # El admin elige la sede con ?sede= (ver app/sedes.py)
+                            sedes=todas_las_sedes(current_app) if current_user.rol == 'admin' else [None],
+                            sede=sede_actual(),
+                            asistencias=paginacion.items, 
+                            paginacion=paginacion,
+                            # Clave del fragmento de filas: cambia con cada asistencia nueva
+                            ultimo_id=db.session.query(db.func.max(Asistencia.id)).scalar(),
+                            # Filtros activos para los enlaces de página
+                            filtros={k: v for k, v in request.args.items() if k != 'pagina'},
                             materias=todas_las_materias,
                             secciones=lista_secciones)
 
@@ -153,8 +231,7 @@ def aprobaciones():
         flash('Acceso denegado.', 'danger')
         return redirect(url_for('admin.dashboard'))
 
-    pendientes = Usuario.query.filter_by(rol='docente', aprobado=False).all()
-    return render_template('admin/aprobaciones.html', pendientes=pendientes)
+    return render_template('admin/aprobaciones.html', pendientes=docentes_pendientes().all())
 
 # --- 7. APROBAR DOCENTE (Modificado para POST) ---
 @admin_bp.route('/aprobar_docente/<int:user_id>', methods=['GET', 'POST'])
@@ -166,6 +243,7 @@ def aprobar_docente(user_id):
     usuario = Usuario.query.get_or_404(user_id)
     usuario.aprobado = True 
     db.session.commit()
+    auditar('aprobar_docente', 'usuario', usuario.id, cedula=usuario.cedula)
     
     flash(f'✅ Docente {usuario.nombre} aprobado.', 'success')
     return redirect(url_for('admin.aprobaciones'))
@@ -178,8 +256,10 @@ def rechazar_docente(user_id):
         return redirect(url_for('admin.dashboard'))
 
     usuario = Usuario.query.get_or_404(user_id)
+    detalle = {'cedula': usuario.cedula, 'nombre': usuario.nombre}
     db.session.delete(usuario)
     db.session.commit()
+    auditar('rechazar_docente', 'usuario', user_id, **detalle)
     
     flash(f'🗑️ Solicitud rechazada.', 'warning')
     return redirect(url_for('admin.aprobaciones'))
@@ -198,13 +278,17 @@ def asignar_materia():
 
         if docente_id and catalogo_id and seccion:
             item_catalogo = CatalogoMaterias.query.get(catalogo_id)
-            nueva_materia = Materia(
-                nombre=item_catalogo.nombre,
-                codigo_seccion=seccion,
-                docente_id=docente_id
-            )
-            db.session.add(nueva_materia)
-            db.session.commit()
+            docente = Usuario.query.get_or_404(docente_id)
+            # La materia va a la sede del docente, no a la del admin
+            with en_sede(sede_de(docente, current_app)):
+                nueva_materia = Materia(
+                    nombre=item_catalogo.nombre,
+                    codigo_seccion=seccion,
+                    docente_id=docente.id
+                )
+                db.session.add(nueva_materia)
+                db.session.commit()
+            invalidar_tablero(docente.id)
             flash('Asignatura asignada correctamente.', 'success')
             return redirect(url_for('admin.dashboard'))
 
@@ -216,28 +300,12 @@ def asignar_materia():
 @admin_bp.route('/descargar_reporte')
 @login_required
 def descargar_reporte():
-    si = io.StringIO()
-    si.write('\ufeff') 
-    cw = csv.writer(si, delimiter=';')
-    cw.writerow(['Fecha', 'Hora', 'Asignatura', 'Sección', 'Docente', 'Estudiante', 'Cédula', 'Sección Alumno', 'Estado'])
-    
-    registros = Asistencia.query.join(Materia).order_by(Asistencia.fecha.desc()).all()
-
-    for reg in registros:
-        cw.writerow([
-            reg.fecha.strftime('%d/%m/%Y'), 
-            reg.fecha.strftime('%H:%M'),
-            reg.materia.nombre, 
-            reg.materia.codigo_seccion, 
-            reg.materia.docente.nombre,
-            reg.estudiante.nombre, 
-            reg.estudiante.cedula,
-            getattr(reg.estudiante, 'seccion_estudiante', 'S/D'), 
-            reg.estado
-        ])
-
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = "attachment; filename=reporte_asistencia.csv"
+    nombre, encabezado, total, filas = reporte_general()
+
+    # En streaming: el CSV sale (y se comprime) a medida que se leen las filas
+    output = Response(stream_with_context(csv_por_partes(encabezado, filas, bom=True)),
+                      mimetype='text/csv')
+    output.headers["Content-Disposition"] = f"attachment; filename={nombre}"
     output.headers["Content-type"] = "text/csv; charset=utf-8-sig"
     return output
 
@@ -276,6 +344,7 @@ def toggle_edicion():
     config.permitir_edicion = not config.permitir_edicion
     db.session.add(config)
     db.session.commit()
+    auditar('toggle_edicion', 'configuracion', config.id, permitir_edicion=config.permitir_edicion)
     estado = "ABIERTAS" if config.permitir_edicion else "CERRADAS"
     flash(f'Inscripciones {estado}', 'success')
     return redirect(url_for('admin.dashboard'))
@@ -286,8 +355,11 @@ def toggle_edicion():
 def cerrar_clase(materia_id):
     materia = Materia.query.get_or_404(materia_id)
     if materia.docente_id == current_user.id:
+        sesion_abierta(materia.id).update({'cerrada_en': obtener_hora_vzla()}, synchronize_session=False)
         materia.token_activo = None
         db.session.commit()
+        invalidar_tablero(materia.docente_id)
+        auditar('cerrar_clase', 'materia', materia.id)
         flash('Clase cerrada.', 'info')
     return redirect(url_for('admin.dashboard')) 
 
@@ -296,8 +368,7 @@ def cerrar_clase(materia_id):
 @login_required
 def solicitudes_clave():
     if current_user.rol != 'admin': return redirect(url_for('admin.dashboard'))
-    solicitudes = SolicitudClave.query.order_by(SolicitudClave.fecha_solicitud.desc()).all()
-    return render_template('admin/solicitudes_clave.html', solicitudes=solicitudes)
+    return render_template('admin/solicitudes_clave.html', solicitudes=solicitudes_de_clave().all())
 
 # --- 16. APROBAR/RECHAZAR CLAVE (Modificado para POST) ---
 @admin_bp.route('/aprobar_clave/<int:id>', methods=['GET', 'POST'])
@@ -306,8 +377,10 @@ def aprobar_clave(id):
     if current_user.rol != 'admin': return redirect(url_for('admin.dashboard'))
     solicitud = SolicitudClave.query.get_or_404(id)
     solicitud.usuario.password_hash = solicitud.nueva_clave_hash
+    usuario_id = solicitud.usuario_id
     db.session.delete(solicitud)
     db.session.commit()
+    auditar('aprobar_clave', 'usuario', usuario_id, solicitud_id=id)
     flash('Contraseña actualizada.', 'success')
     return redirect(url_for('admin.solicitudes_clave'))
 
@@ -316,8 +389,10 @@ def aprobar_clave(id):
 def rechazar_clave(id):
     if current_user.rol != 'admin': return redirect(url_for('admin.dashboard'))
     solicitud = SolicitudClave.query.get_or_404(id)
+    usuario_id = solicitud.usuario_id
     db.session.delete(solicitud)
     db.session.commit()
+    auditar('rechazar_clave', 'usuario', usuario_id, solicitud_id=id)
     flash('Solicitud rechazada.', 'warning')
     return redirect(url_for('admin.solicitudes_clave'))
 
@@ -330,25 +405,233 @@ def exportar_inasistencias(materia_id):
         flash('No autorizado', 'danger')
         return redirect(url_for('admin.dashboard'))
 
-    estudiantes = Usuario.query.filter_by(rol='estudiante', seccion_estudiante=materia.codigo_seccion).all()
-    hoy_str = obtener_hora_vzla().strftime('%Y-%m-%d')
-
-    asistencias_hoy = Asistencia.query.filter(
-        Asistencia.materia_id == materia.id,
-        db.func.to_char(Asistencia.fecha, 'YYYY-MM-DD') == hoy_str
-    ).all()
-    
-    presentes = {a.estudiante_id for a in asistencias_hoy}
-    inasistentes = [e for e in estudiantes if e.id not in presentes]
-
-    si = io.StringIO()
-    cw = csv.writer(si, delimiter=';')
-    cw.writerow(['CEDULA', 'FECHA_FALTA', 'CODIGO_MATERIA', 'SECCION'])
-    for alumno in inasistentes:
-        cw.writerow([alumno.cedula, hoy_str, materia.nombre, materia.codigo_seccion])
+    nombre, encabezado, total, filas = reporte_inasistencias(materia, ultima_sesion(materia.id).first())
 
-    nombre = f"Inasistencias_{materia.nombre}_{hoy_str}.csv"
-    output = make_response(si.getvalue())
+    output = Response(stream_with_context(csv_por_partes(encabezado, filas)), mimetype='text/csv')
     output.headers["Content-Disposition"] = f"attachment; filename={nombre}"
     output.headers["Content-type"] = "text/csv"
-    return output
\ No newline at end of file
+    return output
+
+# --- 18. TELEMETRÍA DEL POOL (Solo Admin) ---
+@admin_bp.route('/pool_stats')
+@login_required
+def pool_stats():
+    if current_user.rol != 'admin':
+        abort(403)
+    return jsonify(estadisticas_pools(db.engines))
+
+# --- 19. REPORTES EN SEGUNDO PLANO ---
+@admin_bp.route('/reportes/encolar/<tipo>', methods=['POST'])
+@login_required
+def encolar_reporte(tipo):
+    if current_user.rol not in ['admin', 'docente']:
+        flash('No autorizado', 'danger')
+        return redirect(url_for('auth.login'))
+
+    if tipo == 'general':
+        parametros = {}
+    elif tipo == 'inasistencias':
+        materia = Materia.query.get_or_404(request.form.get('materia_id', type=int))
+        if current_user.rol != 'admin' and materia.docente_id != current_user.id:
+            flash('No autorizado', 'danger')
+            return redirect(url_for('admin.dashboard'))
+        sesion = ultima_sesion(materia.id).first()
+        parametros = {'materia_id': materia.id, 'sesion_id': sesion.id if sesion else None}
+    else:
+        abort(404)
+
+    encolar(current_app._get_current_object(), tipo, parametros, current_user.id)
+    flash('⏳ Reporte en preparación. Puedes seguir trabajando y descargarlo aquí.', 'info')
+    return redirect(url_for('admin.reportes'))
+
+@admin_bp.route('/reportes')
+@login_required
+def reportes():
+    if current_user.rol not in ['admin', 'docente']:
+        flash('No autorizado', 'danger')
+        return redirect(url_for('auth.login'))
+
+    limpiar_expirados(current_app)
+    trabajos = TrabajoReporte.query.filter_by(solicitado_por=current_user.id)\
+                .order_by(TrabajoReporte.creado.desc()).limit(20).all()
+    en_curso = any(t.estado in ('pendiente', 'en_proceso') for t in trabajos)
+    return render_template('admin/reportes.html', trabajos=trabajos, en_curso=en_curso)
+
+@admin_bp.route('/reportes/<trabajo_id>/estado')
+@login_required
+def estado_reporte(trabajo_id):
+    trabajo = TrabajoReporte.query.get_or_404(trabajo_id)
+    if trabajo.solicitado_por != current_user.id:
+        abort(404)
+    return jsonify({
+        'id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'progreso': trabajo.progreso,
+        'mensaje': trabajo.mensaje,
+        'expira': trabajo.expira.isoformat() if trabajo.expira else None,
+    })
+
+@admin_bp.route('/reportes/<trabajo_id>/descargar')
+@login_required
+def descargar_trabajo(trabajo_id):
+    trabajo = TrabajoReporte.query.get_or_404(trabajo_id)
+    if trabajo.solicitado_por != current_user.id or trabajo.estado != 'listo':
+        abort(404)
+
+    # El archivo ya está en gzip: si el navegador lo acepta (q > 0) se envía tal cual
+    if request.accept_encodings.best_match(['gzip']):
+        output = make_response(trabajo.archivo)
+        output.headers["Content-Encoding"] = "gzip"
+    else:
+        output = make_response(gzip.decompress(trabajo.archivo))
+    output.headers["Content-Disposition"] = f"attachment; filename={trabajo.nombre_archivo}"
+    output.headers["Content-type"] = "text/csv; charset=utf-8"
+    output.headers["Vary"] = "Accept-Encoding"
+    return output
+
+# --- 20. CONTEOS DEL DASHBOARD (JSON para polling) ---
+@admin_bp.route('/api/dashboard')
+@login_required
+def dashboard_json():
+    if current_user.rol not in ['admin', 'docente']:
+        abort(403)
+    # El admin ve todas las materias; el docente solo las suyas
+    return jsonify({
+        'generado': obtener_hora_vzla().isoformat(),
+        'materias': list(conteos_materias(current_user).values())
+    })
+
+# --- 21. PERFILADOR POR MUESTREO (Solo Admin) ---
+@admin_bp.route('/perfilador', methods=['GET', 'POST'])
+@login_required
+def perfilador():
+    if current_user.rol != 'admin':
+        flash('No autorizado', 'danger')
+        return redirect(url_for('admin.dashboard'))
+
+    perfil = current_app.extensions['perfilador']
+
+    if request.method == 'POST':
+        if request.form.get('accion') == 'detener':
+            perfil.detener()
+            flash('Perfilador detenido.', 'info')
+        else:
+            endpoint = request.form.get('endpoint', '').strip()
+            if endpoint and endpoint not in current_app.view_functions:
+                flash(f'El endpoint {endpoint} no existe.', 'danger')
+                return redirect(url_for('admin.perfilador'))
+            try:
+                perfil.iniciar(
+                    endpoint=endpoint,
+                    fraccion=request.form.get('porcentaje', 100, type=float) / 100,
+                    segundos=request.form.get('segundos', 60, type=int)
+                )
+                flash('⏱️ Perfilador activo en este worker.', 'success')
+            except RuntimeError as e:
+                flash(str(e), 'warning')
+        return redirect(url_for('admin.perfilador'))
+
+    endpoints = sorted(e for e in current_app.view_functions if e != 'static')
+    return render_template('admin/perfilador.html', estado=perfil.estado(), endpoints=endpoints)
+
+@admin_bp.route('/perfilador/estado')
+@login_required
+def estado_perfilador():
+    if current_user.rol != 'admin':
+        abort(403)
+    return jsonify(current_app.extensions['perfilador'].estado())
+
+@admin_bp.route('/perfilador/descargar')
+@login_required
+def descargar_perfil():
+    if current_user.rol != 'admin':
+        abort(403)
+
+    # Formato colapsado: flamegraph.pl perfil.folded > perfil.svg, o abrir en speedscope.app
+    output = make_response(current_app.extensions['perfilador'].colapsado())
+    output.headers["Content-Disposition"] = "attachment; filename=perfil.folded"
+    output.headers["Content-type"] = "text/plain; charset=utf-8"
+    return output
+
+# --- 22. BITÁCORA DE AUDITORÍA (Solo Admin) ---
+@admin_bp.route('/auditoria')
+@login_required
+def auditoria():
+    if current_user.rol != 'admin':
+        flash('No autorizado', 'danger')
+        return redirect(url_for('admin.dashboard'))
+
+    # Con AUDITORIA_ARCHIVO la tabla no recibe eventos: solo se avisa dónde están
+    archivo = current_app.config.get('AUDITORIA_ARCHIVO')
+    if archivo:
+        return render_template('admin/auditoria.html', archivo=archivo)
+
+    # Lo que este worker aún tiene en cola también debe verse
+    bitacora = current_app.extensions.get('auditoria')
+    if bitacora is not None:
+        bitacora.vaciar()
+
+    filtros = {k: request.args.get(k, '').strip() for k in ('accion', 'actor', 'fecha')}
+    filtros = {k: v for k, v in filtros.items() if v}
+    antes = request.args.get('antes', type=int)
+
+    # Una fila de más indica si hay página siguiente
+    eventos = consulta_auditoria(antes=antes, **filtros).limit(POR_PAGINA_AUDITORIA + 1).all()
+    hay_mas = len(eventos) > POR_PAGINA_AUDITORIA
+    eventos = eventos[:POR_PAGINA_AUDITORIA]
+
+    ids = {e.actor_id for e in eventos if e.actor_id}
+    actores = {u.id: u for u in Usuario.query.filter(Usuario.id.in_(ids))} if ids else {}
+
+    return render_template('admin/auditoria.html',
+                            eventos=eventos,
+                            actores=actores,
+                            acciones=ACCIONES,
+                            filtros=filtros,
+                            siguiente=eventos[-1].id if hay_mas else None,
+                            primera=antes is None)
+
+# --- 23. ESTUDIANTES EN RIESGO (Resultado del cálculo nocturno) ---
+@admin_bp.route('/riesgo')
+@login_required
+def riesgo():
+    if current_user.rol not in ['admin', 'docente']:
+        flash('No autorizado', 'danger')
+        return redirect(url_for('auth.login'))
+
+    materia_id = request.args.get('materia_id', type=int)
+    pagina = request.args.get('pagina', 1, type=int)
+    paginacion = consulta_riesgo(current_user, materia_id)\
+                    .paginate(page=pagina, per_page=POR_PAGINA_RIESGO, error_out=False)
+
+    materias = Materia.query if current_user.rol == 'admin' else Materia.query.filter_by(docente_id=current_user.id)
+
+    return render_template('admin/riesgo.html',
+                            filas=paginacion.items,
+                            paginacion=paginacion,
+                            materias=materias.order_by(Materia.nombre).all(),
+                            materia_id=materia_id,
+                            calculado_en=db.session.query(db.func.max(RiesgoAsistencia.calculado_en)).scalar(),
+                            umbral=current_app.config.get('RIESGO_UMBRAL', 25),
+                            racha=current_app.config.get('RIESGO_RACHA', 3))
+
+@admin_bp.route('/riesgo/descargar')
+@login_required
+def descargar_riesgo():
+    if current_user.rol not in ['admin', 'docente']:
+        abort(403)
+
+    encabezado = ['CEDULA', 'ESTUDIANTE', 'MATERIA', 'SECCION', 'CLASES', 'INASISTENCIAS',
+                  'PORCENTAJE', 'RACHA_ACTUAL', 'RACHA_MAXIMA', 'ULTIMA_ASISTENCIA']
+    filas = (
+        [f.cedula, f.nombre, f.materia, f.codigo_seccion, f.clases, f.inasistencias,
+         f'{f.porcentaje_inasistencia:.1f}', f.racha_actual, f.racha_maxima,
+         f.ultima_asistencia.strftime('%d/%m/%Y') if f.ultima_asistencia else '']
+        for f in consulta_riesgo(current_user, request.args.get('materia_id', type=int)).yield_per(1000)
+    )
+
+    output = Response(stream_with_context(csv_por_partes(encabezado, filas, bom=True)), mimetype='text/csv')
+    output.headers["Content-Disposition"] = "attachment; filename=estudiantes_en_riesgo.csv"
+    output.headers["Content-type"] = "text/csv; charset=utf-8-sig"
+    return output
@@ -2,11 +2,13 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import db, Usuario, SolicitudClave
 from werkzeug.security import generate_password_hash 
+from app.limiter import limitar
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 # --- 1. LOGIN (Protegido por CSRF) ---
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@limitar('login')
 def login():
     # Si el usuario ya está dentro, lo mandamos a donde le toca
     if current_user.is_authenticated:
@@ -101,6 +103,7 @@ def logout():
 
 # --- 4. RECUPERAR CONTRASEÑA ---
 @auth_bp.route('/recuperar', methods=['GET', 'POST'])
+@limitar('recuperar')
 def recuperar():
     if request.method == 'POST':
         cedula = request.form.get('cedula')
@@ -1,6 +1,11 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import login_required, current_user
 from app.models import db, Asistencia, Materia, Configuracion, obtener_hora_vzla
+from app.resumen import sumar_asistencia, resumen_estudiante
+from app.limiter import limitar
+from app.auditoria import auditar
+from app.consultas import sesion_abierta_por_token, asistencia_en_sesion
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 
 student_bp = Blueprint('student', __name__, url_prefix='/student')
@@ -20,6 +25,7 @@ def escaner():
 
 # --- 2. PROCESAR QR (Sincronizado y normalizado con protección POST) ---
 @student_bp.route('/procesar_qr', methods=['POST'])
+@limitar('procesar_qr')
 @login_required
 def procesar_qr():
     # El token CSRF se valida automáticamente aquí antes de ejecutar el código
@@ -29,7 +35,8 @@ def procesar_qr():
         flash('❌ Error: No se leyó ningún código. Intenta escanear de nuevo.', 'danger')
         return redirect(url_for('student.escaner'))
 
-    materia = Materia.query.filter_by(token_activo=token).first()
+    sesion = sesion_abierta_por_token(token).first()
+    materia = sesion.materia if sesion else None
     
     if not materia:
         flash('⛔ El código QR ya expiró o la clase ha sido cerrada por el profesor.', 'danger')
@@ -49,27 +56,32 @@ def procesar_qr():
 
     # --- LÓGICA DE HORA NORMALIZADA ---
     ahora_vzla = obtener_hora_vzla()
-    hoy_str = ahora_vzla.strftime('%Y-%m-%d')
 
-    # Verificación de duplicados para el mismo día y materia
-    existe = Asistencia.query.filter(
-        Asistencia.estudiante_id == current_user.id,
-        Asistencia.materia_id == materia.id,
-        db.func.to_char(Asistencia.fecha, 'YYYY-MM-DD') == hoy_str
-    ).first()
+    # Verificación de duplicados dentro de la misma sesión de clase
+    existe = asistencia_en_sesion(sesion.id, current_user.id).first()
 
     if existe:
-        flash(f'⚠️ Ya marcaste asistencia en {materia.nombre} hoy.', 'warning')
+        flash(f'⚠️ Ya marcaste asistencia en esta clase de {materia.nombre}.', 'warning')
     else:
         nueva_asistencia = Asistencia(
             estudiante_id=current_user.id,
             materia_id=materia.id,
             fecha=ahora_vzla,
             estado='Presente',
-            metodo='qr'
+            metodo='qr',
+            sesion_id=sesion.id
         )
         db.session.add(nueva_asistencia)
-        db.session.commit()
+        sumar_asistencia(current_user.id, materia.id, 1, ahora_vzla)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Doble envío simultáneo: la restricción única ya registró el primero
+            db.session.rollback()
+            flash(f'⚠️ Ya marcaste asistencia en esta clase de {materia.nombre}.', 'warning')
+            return redirect(url_for('student.escaner'))
+        auditar('asistencia_qr', 'asistencia', nueva_asistencia.id,
+                materia_id=materia.id, sesion_id=sesion.id)
         
         flash(f'✅ ¡Éxito! Asistencia registrada en {materia.nombre} ({ahora_vzla.strftime("%I:%M %p")})', 'success')
 
@@ -108,4 +120,20 @@ def perfil():
             flash('✅ Datos académicos actualizados correctamente.', 'success')
             return redirect(url_for('student.escaner'))
 
-    return render_template('student/perfil.html', permitir=permitir)
\ No newline at end of file
+    return render_template('student/perfil.html', permitir=permitir)
+
+# --- 4. RESUMEN DE ASISTENCIA (Contadores precalculados) ---
+@student_bp.route('/resumen')
+@login_required
+def resumen():
+    if current_user.rol != 'estudiante':
+        return redirect(url_for('admin.dashboard'))
+
+    return render_template('student/resumen.html', resumen=resumen_estudiante(current_user))
+
+@student_bp.route('/api/resumen')
+@login_required
+def resumen_json():
+    if current_user.rol != 'estudiante':
+        abort(403)
+    return jsonify(resumen_estudiante(current_user))
@@ -0,0 +1,121 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from app.texto import normalizar_busqueda
+
+# --- DATOS POR SEDE (Opcional) ---
+# Con SEDES vacío todo vive en la base principal y nada de esto se activa.
+# Con SEDES configurado, las materias, inscripciones, asistencias, contadores,
+# sesiones de clase, estudiantes en riesgo y el estado de la sincronización
+# con Tepuy de cada sede viven en su propio esquema de Postgres, dentro de
+# la misma base. Cada sede tiene un bind 'sede_<id>' cuyo search_path es
+# "sede_<id>, public": las tablas de la sede se leen de su esquema y
+# 'usuarios' y el resto se siguen leyendo de public, así los joins no
+# cambian y todo el request va en una sola transacción. Por eso una sede no
+# puede estar en otra base: SEDE_<ID>_URL solo sirve para entrar a la misma
+# base por otro camino (PgBouncer), y 'flask crear-sedes' lo comprueba.
+#
+# La sede del request sale de Usuario.ciudad; el admin puede consultar otra
+# con ?sede=<id>. Los reportes globales recorren todas las sedes con
+# para_cada_sede(). Las migraciones se repiten en el esquema de cada sede
+# (ver migrations/env.py).
+
+TABLAS_SEDE = ('materias', 'inscripciones', 'clase_sesiones', 'asistencias', 'resumen_asistencias',
+               'riesgo_asistencia', 'asistencias_bajas', 'marcas_sincronizacion')
+
+_sede = ContextVar('sede', default=None)
+
+def sede_actual():
+    return _sede.get()
+
+@contextmanager
+def en_sede(sede):
+    token = _sede.set(sede)
+    try:
+        yield
+    finally:
+        _sede.reset(token)
+
+def clave_bind(sede):
+    return f'sede_{sede}'
+
+def esquema_sede(sede, motor):
+    # En SQLite (desarrollo) cada sede es un archivo aparte: su esquema es 'main'
+    return f'sede_{sede}' if motor.dialect.name == 'postgresql' else 'main'
+
+class SesionSedes(Session):
+    # Todo el request va por el bind de la sede, también las tablas comunes:
+    # su search_path las encuentra en public y queda una sola transacción
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        sede = _sede.get()
+        if bind is None and sede is not None:
+            return self._db.engines[clave_bind(sede)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _sedes_config(app):
+    return app.extensions.get('sedes', {})
+
+def sede_de(usuario, app):
+    """Sede de un usuario según su ciudad; None es la base principal."""
+    return _sedes_config(app).get(normalizar_busqueda(getattr(usuario, 'ciudad', None)))
+
+def todas_las_sedes(app):
+    # None (la base principal) primero: ahí quedan los datos sin sede asignada
+    return [None] + sorted(set(_sedes_config(app).values()))
+
+def para_cada_sede(app, session, generar):
+    """Encadena generar() en cada sede, olvidando entre una y otra las filas de la anterior.
+
+    Los ids de materias y asistencias se repiten entre sedes, así que las
+    instancias de una sede no pueden quedar en el identity map de la siguiente.
+    """
+    for sede in todas_las_sedes(app):
+        with en_sede(sede):
+            yield from generar()
+        olvidar_filas_sede(session)
+
+def olvidar_filas_sede(session):
+    """Saca del identity map las filas de tablas por sede antes de pasar a otra sede."""
+    for objeto in list(session.identity_map.values()):
+        if getattr(objeto, '__tablename__', None) in TABLAS_SEDE:
+            session.expunge(objeto)
+
+def sede_elegida(usuario, app, pedida):
+    """Sede del request: la del usuario, o la pedida con ?sede= si es admin."""
+    if usuario.rol == 'admin' and pedida:
+        if pedida == 'principal':
+            return None
+        if pedida in _sedes_config(app).values():
+            return pedida
+    return sede_de(usuario, app)
+
+def init_sedes(app, db):
+    sedes = {normalizar_busqueda(ciudad): sede for ciudad, sede in app.config.get('SEDES', {}).items()}
+    app.extensions['sedes'] = sedes
+    if not sedes:
+        return
+
+    # En SQLite cada sede es un archivo aparte que adjunta la base principal
+    principal = db.engine.url
+    if principal.get_backend_name() == 'sqlite':
+        for sede in set(sedes.values()):
+            motor = db.engines[clave_bind(sede)]
+            if motor.url.get_backend_name() == 'sqlite':
+                @event.listens_for(motor, 'connect')
+                def _adjuntar(conexion, registro, ruta=principal.database):
+                    conexion.execute('ATTACH DATABASE ? AS comun', (ruta,))
+
+    @app.before_request
+    def _fijar_sede():
+        if current_user.is_authenticated:
+            sede = sede_elegida(current_user, app, request.args.get('sede'))
+            g._token_sede = _sede.set(sede)
+
+    @app.teardown_request
+    def _liberar_sede(error=None):
+        token = g.pop('_token_sede', None)
+        if token is not None:
+            _sede.reset(token)
@@ -0,0 +1,155 @@
+import csv
+import os
+import tempfile
+from datetime import timedelta
+from flask import current_app
+from app.models import db, Asistencia, AsistenciaBaja, MarcaSincronizacion, Materia, Usuario, obtener_hora_vzla
+from app.sedes import en_sede, olvidar_filas_sede, todas_las_sedes
+
+# --- SINCRONIZACIÓN INCREMENTAL CON TEPUY ---
+# Cada destino guarda hasta qué id de 'asistencias' y de 'asistencias_bajas'
+# ya se exportó. Una corrida solo lee lo que está entre esa marca y el
+# máximo actual (por clave primaria), así el costo depende de los cambios y
+# no del historial. Las asistencias no se editan: un cambio es una baja
+# seguida de un alta, y las bajas salen de 'asistencias_bajas'.
+#
+# El rango de la corrida se guarda antes de escribir el archivo; si algo
+# falla, la siguiente corrida repite ese mismo rango y genera el mismo
+# archivo. La marca solo avanza cuando el archivo quedó completo en disco.
+# Tepuy puede recibir un rango dos veces (si el proceso muere justo después
+# de escribir), por eso cada fila lleva un ID: la sede y el id de la
+# asistencia, porque los ids se repiten entre sedes.
+#
+# Formato: el de reporte_inasistencias (CEDULA;FECHA;CODIGO_MATERIA;SECCION,
+# separado por ';', fecha AAAA-MM-DD) con tres columnas al final: HORA,
+# OPERACION (A alta, B baja) e ID. Aquí cada fila es una asistencia y no una
+# falta, por eso la columna es FECHA y no FECHA_FALTA.
+
+ENCABEZADO = ['CEDULA', 'FECHA', 'CODIGO_MATERIA', 'SECCION', 'HORA', 'OPERACION', 'ID']
+
+def registrar_bajas(filas):
+    """Guarda las bajas dentro de la transacción del llamador (no hace commit).
+
+    filas: dicts con asistencia_id, cedula, materia, seccion y fecha.
+    """
+    if filas:
+        db.session.execute(db.insert(AsistenciaBaja), [
+            {**fila, 'eliminada_en': obtener_hora_vzla()} for fila in filas
+        ])
+
+def _maximo(columna_id, columna_fecha, corte):
+    # Margen antes del corte: una fila con un id menor puede estar aún sin
+    # commit y quedaría por debajo de la marca para siempre
+    return db.session.query(db.func.max(columna_id)).filter(columna_fecha <= corte).scalar() or 0
+
+def _marca(destino):
+    marca = MarcaSincronizacion.query.filter_by(destino=destino).with_for_update().first()
+    if marca is None:
+        # Un destino nuevo recibe todas las asistencias actuales; las bajas
+        # anteriores ya no existen para él
+        marca = MarcaSincronizacion(
+            destino=destino, ultimo_id=0,
+            ultima_baja_id=db.session.query(db.func.max(AsistenciaBaja.id)).scalar() or 0
+        )
+        db.session.add(marca)
+        db.session.flush()
+    return marca
+
+def _filas(marca, sede):
+    altas = db.session.query(
+        Asistencia.id, Usuario.cedula, Asistencia.fecha, Materia.nombre, Materia.codigo_seccion
+    ).join(Usuario, Usuario.id == Asistencia.estudiante_id)\
+     .join(Materia, Materia.id == Asistencia.materia_id)\
+     .filter(Asistencia.id > marca.ultimo_id, Asistencia.id <= marca.pendiente_id)\
+     .order_by(Asistencia.id)
+
+    bajas = db.session.query(
+        AsistenciaBaja.asistencia_id, AsistenciaBaja.cedula, AsistenciaBaja.fecha,
+        AsistenciaBaja.materia, AsistenciaBaja.seccion
+    ).filter(AsistenciaBaja.id > marca.ultima_baja_id, AsistenciaBaja.id <= marca.pendiente_baja_id)\
+     .order_by(AsistenciaBaja.id)
+
+    # Primero las bajas: un registro borrado y vuelto a marcar termina como alta
+    prefijo = sede or 'principal'
+    for operacion, consulta in (('B', bajas), ('A', altas)):
+        for id_, cedula, fecha, materia, seccion in consulta.yield_per(1000):
+            yield [cedula, fecha.strftime('%Y-%m-%d'), materia, seccion,
+                   fecha.strftime('%H:%M:%S'), operacion, f'{prefijo}-{id_}']
+
+def _escribir(ruta, filas):
+    # Temporal con nombre propio en el mismo directorio: dos corridas
+    # simultáneas del mismo rango no escriben sobre el mismo archivo, y
+    # os.replace deja el archivo final completo o no lo deja
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta),
+                                            prefix=os.path.basename(ruta) + '.', suffix='.tmp')
+    total = 0
+    try:
+        with os.fdopen(descriptor, 'w', newline='', encoding='utf-8') as salida:
+            cw = csv.writer(salida, delimiter=';')
+            cw.writerow(ENCABEZADO)
+            for fila in filas:
+                cw.writerow(fila)
+                total += 1
+            salida.flush()
+            os.fsync(salida.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+    return total
+
+def _purgar_bajas():
+    # Las bajas que ya recibieron todos los destinos no se vuelven a leer
+    minimo = db.session.query(db.func.min(MarcaSincronizacion.ultima_baja_id)).scalar()
+    if minimo:
+        AsistenciaBaja.query.filter(AsistenciaBaja.id <= minimo).delete(synchronize_session=False)
+
+def exportar_cambios(destino, directorio, reiniciar=False):
+    """Exporta lo nuevo desde la última corrida, un archivo por sede.
+
+    Devuelve [(sede, ruta, filas)]; ruta es None si no hubo cambios.
+    """
+    app = current_app._get_current_object()
+    margen = timedelta(seconds=app.config.get('SINCRONIZACION_MARGEN_SEGUNDOS', 60))
+    os.makedirs(directorio, exist_ok=True)
+
+    resultados = []
+    for sede in todas_las_sedes(app):
+        with en_sede(sede):
+            marca = _marca(destino)
+            if reiniciar:
+                # Todo lo actual como alta; las bajas anteriores sobran
+                marca.ultimo_id = 0
+                marca.ultima_baja_id = db.session.query(db.func.max(AsistenciaBaja.id)).scalar() or 0
+                marca.pendiente_id = marca.pendiente_baja_id = None
+
+            if marca.pendiente_id is None:
+                corte = obtener_hora_vzla() - margen
+                marca.pendiente_id = max(marca.ultimo_id, _maximo(Asistencia.id, Asistencia.fecha, corte))
+                marca.pendiente_baja_id = max(marca.ultima_baja_id,
+                                              _maximo(AsistenciaBaja.id, AsistenciaBaja.eliminada_en, corte))
+            db.session.commit()
+
+            ruta = None
+            total = 0
+            hasta = (marca.pendiente_id, marca.pendiente_baja_id)
+            if hasta != (marca.ultimo_id, marca.ultima_baja_id):
+                nombre = (f"tepuy_{destino}_{sede or 'principal'}_"
+                          f"{marca.ultimo_id}-{marca.pendiente_id}_{marca.ultima_baja_id}-{marca.pendiente_baja_id}.csv")
+                ruta = os.path.join(directorio, nombre)
+                total = _escribir(ruta, _filas(marca, sede))
+
+            marca = _marca(destino)
+            # Otra corrida simultánea del mismo rango pudo haber avanzado ya la marca
+            if (marca.pendiente_id, marca.pendiente_baja_id) == hasta:
+                marca.ultimo_id, marca.ultima_baja_id = hasta
+                marca.pendiente_id = marca.pendiente_baja_id = None
+                marca.ultima_ejecucion = obtener_hora_vzla()
+                if ruta:
+                    marca.ultimo_archivo = os.path.basename(ruta)
+                _purgar_bajas()
+            db.session.commit()
+            resultados.append((sede, ruta, total))
+        # Las marcas de cada sede tienen sus propios ids
+        olvidar_filas_sede(db.session)
+    return resultados
@@ -0,0 +1,92 @@
+from flask import current_app
+from app.models import db, Materia, Asistencia, Usuario, obtener_hora_vzla
+from app.consultas import rango_dia
+from app.cache import CacheTTL
+from app.sedes import en_sede, sede_actual, todas_las_sedes
+
+# --- CONTEOS DEL DASHBOARD ---
+# Inscritos, presentes de hoy y clase activa de todas las materias visibles
+# salen de una sola consulta agrupada, no de una consulta por materia en la
+# plantilla. El admin ve todas las materias: la misma consulta se repite una
+# vez por sede, porque cada sede tiene sus propias materias y asistencias.
+# El resultado se cachea unos segundos por usuario porque la vista se
+# consulta por polling.
+cache_tablero = CacheTTL(maximo=1000, ttl=5)
+
+CLAVE_ADMIN = 'admin'
+
+def clave_conteo(sede, materia_id):
+    # Los ids de materias se repiten entre sedes
+    return f"{sede or 'principal'}-{materia_id}"
+
+def conteos_materias(usuario):
+    """{clave_conteo: conteos} de las materias del docente, o de todas para el admin."""
+    es_admin = usuario.rol == 'admin'
+    clave = CLAVE_ADMIN if es_admin else usuario.id
+    conteos = cache_tablero.obtener(clave)
+    if conteos is not None:
+        return conteos
+
+    conteos = {}
+    if es_admin:
+        for sede in todas_las_sedes(current_app):
+            with en_sede(sede):
+                conteos.update(_conteos_sede(sede))
+    else:
+        conteos = _conteos_sede(sede_actual(), usuario.id)
+
+    cache_tablero.guardar(clave, conteos)
+    return conteos
+
+def _conteos_sede(sede, docente_id=None):
+    materias = db.session.query(Materia.id, Materia.codigo_seccion)
+    if docente_id is not None:
+        materias = materias.filter(Materia.docente_id == docente_id)
+    materias = materias.subquery()
+
+    # Estudiantes por sección, limitado a las secciones de las materias visibles
+    inscritos = db.session.query(
+        Usuario.seccion_estudiante.label('seccion'),
+        db.func.count(Usuario.id).label('total')
+    ).filter(
+        Usuario.rol == 'estudiante',
+        Usuario.seccion_estudiante.in_(db.select(materias.c.codigo_seccion))
+    ).group_by(Usuario.seccion_estudiante).subquery()
+
+    inicio, fin = rango_dia(obtener_hora_vzla())
+    presentes = db.session.query(
+        Asistencia.materia_id.label('materia_id'),
+        db.func.count(db.distinct(Asistencia.estudiante_id)).label('total')
+    ).filter(
+        Asistencia.materia_id.in_(db.select(materias.c.id)),
+        Asistencia.fecha >= inicio,
+        Asistencia.fecha < fin
+    ).group_by(Asistencia.materia_id).subquery()
+
+    filas = db.session.query(
+        Materia.id, Materia.nombre, Materia.codigo_seccion, Materia.token_activo,
+        db.func.coalesce(inscritos.c.total, 0),
+        db.func.coalesce(presentes.c.total, 0)
+    ).join(materias, materias.c.id == Materia.id)\
+     .outerjoin(inscritos, inscritos.c.seccion == Materia.codigo_seccion)\
+     .outerjoin(presentes, presentes.c.materia_id == Materia.id)\
+     .order_by(Materia.nombre, Materia.id).all()
+
+    return {
+        clave_conteo(sede, materia_id): {
+            'clave': clave_conteo(sede, materia_id),
+            'sede': sede,
+            'materia_id': materia_id,
+            'materia': nombre,
+            'seccion': seccion,
+            'inscritos': total_inscritos,
+            'presentes_hoy': total_presentes,
+            'activa': token is not None,
+        }
+        for materia_id, nombre, seccion, token, total_inscritos, total_presentes in filas
+    }
+
+def invalidar_tablero(docente_id):
+    # Abrir o cerrar una clase debe verse enseguida en el dashboard
+    cache_tablero.borrar(docente_id)
+    cache_tablero.borrar(CLAVE_ADMIN)
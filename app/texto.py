@@ -0,0 +1,9 @@
+import unicodedata
+
+# --- NORMALIZACIÓN DE TEXTO ---
+
+def normalizar_busqueda(texto):
+    """Minúsculas, sin acentos y con espacios simples ('José  PÉREZ' -> 'jose perez')."""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.casefold().split())
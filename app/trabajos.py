@@ -0,0 +1,200 @@
+import csv
+import gzip
+import io
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from app.models import db, Materia, ClaseSesion, TrabajoReporte, obtener_hora_vzla
+from app.reportes import reporte_general, reporte_inasistencias
+from app.sedes import en_sede, sede_actual
+
+# --- TRABAJOS DE REPORTE EN SEGUNDO PLANO ---
+# Los reportes grandes se generan en un pool de hilos fuera del request.
+# El estado y el CSV comprimido se guardan en la tabla 'trabajos_reporte',
+# así cualquier worker puede informar el progreso y servir la descarga.
+#
+# Cada proceso renueva el 'latido' de los trabajos que tiene en su cola
+# (pendientes o en curso). Un trabajo sin latido reciente quedó huérfano:
+# el worker que lo tenía se reinició o murió.
+
+_ejecutor = None
+_retenidos = set()
+_retenidos_lock = threading.Lock()
+_latido = None
+
+def _pool(app):
+    global _ejecutor
+    if _ejecutor is None:
+        _ejecutor = ThreadPoolExecutor(
+            max_workers=app.config.get('REPORTES_HILOS', 2),
+            thread_name_prefix='reportes'
+        )
+    return _ejecutor
+
+def _latir(app):
+    intervalo = app.config.get('REPORTES_LATIDO_SEGUNDOS', 30)
+    while True:
+        time.sleep(intervalo)
+        with _retenidos_lock:
+            ids = list(_retenidos)
+        if not ids:
+            continue
+        try:
+            with app.app_context(), db.engine.begin() as conexion:
+                conexion.execute(
+                    db.update(TrabajoReporte)
+                    .where(TrabajoReporte.id.in_(ids))
+                    .values(latido=obtener_hora_vzla())
+                )
+        except Exception:
+            app.logger.exception('No se pudo renovar el latido de los reportes')
+
+def _iniciar_latido(app):
+    global _latido
+    if _latido is None or not _latido.is_alive():
+        _latido = threading.Thread(target=_latir, args=(app,), name='reportes-latido', daemon=True)
+        _latido.start()
+
+def _generar_general(parametros):
+    nombre, encabezado, total, filas = reporte_general()
+    return nombre, encabezado, total, filas, True
+
+def _generar_inasistencias(parametros):
+    materia = db.session.get(Materia, parametros['materia_id'])
+    sesion = db.session.get(ClaseSesion, parametros['sesion_id']) if parametros.get('sesion_id') else None
+    nombre, encabezado, total, filas = reporte_inasistencias(materia, sesion)
+    return nombre, encabezado, total, filas, False
+
+GENERADORES = {
+    'general': _generar_general,
+    'inasistencias': _generar_inasistencias,
+}
+
+def escribir_csv(salida, encabezado, filas, bom=False, avance=None, total=0):
+    if bom:
+        salida.write('\ufeff')
+    cw = csv.writer(salida, delimiter=';')
+    cw.writerow(encabezado)
+    for i, fila in enumerate(filas, 1):
+        cw.writerow(fila)
+        if avance and total and i % 500 == 0:
+            avance(min(99, i * 100 // total))
+
+def csv_por_partes(encabezado, filas, bom=False, tamano=64 * 1024):
+    """Genera el CSV en trozos de ~64 KB para enviarlo en streaming."""
+    buffer = io.StringIO()
+    if bom:
+        buffer.write('\ufeff')
+    cw = csv.writer(buffer, delimiter=';')
+    cw.writerow(encabezado)
+    for fila in filas:
+        cw.writerow(fila)
+        if buffer.tell() >= tamano:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def encolar(app, tipo, parametros, usuario_id):
+    limpiar_expirados(app)
+
+    # El hilo del trabajo no tiene request: la sede viaja en los parámetros
+    parametros = {**parametros, 'sede': sede_actual()}
+    trabajo = TrabajoReporte(
+        id=uuid.uuid4().hex,
+        tipo=tipo,
+        parametros=json.dumps(parametros),
+        solicitado_por=usuario_id,
+        latido=obtener_hora_vzla()
+    )
+    db.session.add(trabajo)
+    db.session.commit()
+
+    with _retenidos_lock:
+        _retenidos.add(trabajo.id)
+    _iniciar_latido(app)
+    _pool(app).submit(_ejecutar, app, trabajo.id)
+    return trabajo
+
+def _ejecutar(app, trabajo_id):
+    try:
+        _ejecutar_trabajo(app, trabajo_id)
+    finally:
+        with _retenidos_lock:
+            _retenidos.discard(trabajo_id)
+
+def _ejecutar_trabajo(app, trabajo_id):
+    with app.app_context():
+        def avance(porcentaje):
+            # Conexión aparte: un commit en la sesión cerraría el cursor que
+            # está recorriendo las filas del reporte
+            with db.engine.begin() as conexion:
+                conexion.execute(
+                    db.update(TrabajoReporte)
+                    .where(TrabajoReporte.id == trabajo_id)
+                    .values(progreso=porcentaje)
+                )
+
+        try:
+            trabajo = db.session.get(TrabajoReporte, trabajo_id)
+            if trabajo is None:
+                # Lo borró limpiar_expirados u otro proceso antes de empezar
+                app.logger.warning('El trabajo de reporte %s ya no existe', trabajo_id)
+                return
+            trabajo.estado = 'en_proceso'
+            trabajo.latido = obtener_hora_vzla()
+            db.session.commit()
+
+            parametros = json.loads(trabajo.parametros)
+            comprimido = io.BytesIO()
+            with en_sede(parametros.get('sede')):
+                nombre, encabezado, total, filas, bom = GENERADORES[trabajo.tipo](parametros)
+                with gzip.GzipFile(fileobj=comprimido, mode='wb') as gz:
+                    with io.TextIOWrapper(gz, encoding='utf-8', newline='') as texto:
+                        escribir_csv(texto, encabezado, filas, bom, avance, total)
+
+            ahora = obtener_hora_vzla()
+            trabajo = db.session.get(TrabajoReporte, trabajo_id)
+            trabajo.nombre_archivo = nombre
+            trabajo.archivo = comprimido.getvalue()
+            trabajo.progreso = 100
+            trabajo.estado = 'listo'
+            trabajo.terminado = ahora
+            trabajo.expira = ahora + timedelta(hours=app.config.get('REPORTES_EXPIRACION_HORAS', 24))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception('Falló el trabajo de reporte %s', trabajo_id)
+            ahora = obtener_hora_vzla()
+            TrabajoReporte.query.filter_by(id=trabajo_id).update({
+                'estado': 'error',
+                'mensaje': str(e)[:250],
+                'terminado': ahora,
+                'expira': ahora + timedelta(hours=app.config.get('REPORTES_EXPIRACION_HORAS', 24))
+            })
+            db.session.commit()
+
+def limpiar_expirados(app):
+    ahora = obtener_hora_vzla()
+    TrabajoReporte.query.filter(TrabajoReporte.expira < ahora).delete(synchronize_session=False)
+
+    # Trabajos huérfanos: ningún proceso renovó su latido a tiempo. Los que
+    # están en la cola de este proceso siguen vivos aunque el latido se atrase
+    limite = ahora - timedelta(minutes=app.config.get('REPORTES_TIMEOUT_MINUTOS', 5))
+    with _retenidos_lock:
+        propios = list(_retenidos)
+    huerfanos = TrabajoReporte.query.filter(
+        TrabajoReporte.estado.in_(['pendiente', 'en_proceso']),
+        db.func.coalesce(TrabajoReporte.latido, TrabajoReporte.creado) < limite
+    )
+    if propios:
+        huerfanos = huerfanos.filter(TrabajoReporte.id.notin_(propios))
+    huerfanos.update({
+        'estado': 'error',
+        'mensaje': 'El trabajo se interrumpió.',
+        'expira': ahora + timedelta(hours=app.config.get('REPORTES_EXPIRACION_HORAS', 24))
+    }, synchronize_session=False)
+    db.session.commit()
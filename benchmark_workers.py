@@ -0,0 +1,215 @@
+"""Compara los modos de servicio de gunicorn (sync vs gevent).
+
+Para cada modo levanta `gunicorn -c gunicorn.conf.py run:app`, verifica que
+CSRF, Talisman y las sesiones de Flask-Login se comporten igual que en modo
+sync, y mide latencia y throughput con muchos clientes simultáneos mientras
+otro grupo de "celulares lentos" mantiene conexiones abiertas a medio enviar.
+
+Uso:
+    python benchmark_workers.py --modos sync gevent --workers 2 --clientes 200
+    python benchmark_workers.py --cedula 12345678 --password secreto   # prueba login concurrente
+"""
+import argparse
+import http.client
+import math
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Talisman fuerza HTTPS; detrás del proxy de Render llega este encabezado
+CABECERAS = {'X-Forwarded-Proto': 'https'}
+RE_NONCE_CSP = re.compile(r"'nonce-([^']+)'")
+RE_CSRF = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+def esperar_puerto(puerto, limite=20):
+    fin = time.time() + limite
+    while time.time() < fin:
+        try:
+            with socket.create_connection(('127.0.0.1', puerto), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def levantar(modo, puerto, workers):
+    entorno = dict(os.environ, SIGAU_WORKER_CLASS=modo, PORT=str(puerto), WEB_CONCURRENCY=str(workers))
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app'],
+        env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    if not esperar_puerto(puerto):
+        proceso.kill()
+        raise RuntimeError(f'gunicorn ({modo}) no arrancó en el puerto {puerto}')
+    return proceso
+
+def pedir(puerto, metodo, ruta, cuerpo=None, cookie=None, timeout=30):
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=timeout)
+    cabeceras = dict(CABECERAS)
+    if cookie:
+        cabeceras['Cookie'] = cookie
+    if cuerpo is not None:
+        cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+    try:
+        conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+        respuesta = conexion.getresponse()
+        return respuesta.status, respuesta.getheaders(), respuesta.read().decode('utf-8', 'replace')
+    finally:
+        conexion.close()
+
+def _cookie_de(cabeceras):
+    # La cookie es Secure, así que se reenvía a mano en lugar de usar un cookiejar
+    valores = [v.split(';', 1)[0] for k, v in cabeceras if k.lower() == 'set-cookie']
+    return '; '.join(valores)
+
+# --- 1. VERIFICACIÓN FUNCIONAL ---
+def verificar(puerto, cedula=None, password=None, concurrencia=50):
+    fallas = []
+
+    def una_pagina(_):
+        estado, cabeceras, cuerpo = pedir(puerto, 'GET', '/auth/login')
+        csp = dict((k.lower(), v) for k, v in cabeceras).get('content-security-policy', '')
+        nonce_cabecera = RE_NONCE_CSP.search(csp)
+        return estado, nonce_cabecera.group(1) if nonce_cabecera else None, cuerpo
+
+    with ThreadPoolExecutor(concurrencia) as ex:
+        resultados = list(ex.map(una_pagina, range(concurrencia)))
+
+    nonces = [n for _, n, _ in resultados]
+    if any(estado != 200 for estado, _, _ in resultados):
+        fallas.append('login GET no devolvió 200 en todas las peticiones')
+    if None in nonces or len(set(nonces)) != len(nonces):
+        fallas.append('Talisman: nonces CSP ausentes o repetidos entre peticiones simultáneas')
+    for _, nonce, cuerpo in resultados:
+        # El nonce del HTML debe ser el de su propia cabecera (sin fuga entre greenlets)
+        if nonce and f'nonce="{nonce}"' not in cuerpo:
+            fallas.append('Talisman: el nonce del HTML no coincide con el de la cabecera')
+            break
+    if not all(RE_CSRF.search(cuerpo) for _, _, cuerpo in resultados):
+        fallas.append('CSRF: el formulario de login no trae token')
+
+    estado, _, _ = pedir(puerto, 'POST', '/auth/login', cuerpo='cedula=0&password=0')
+    if estado != 400:
+        fallas.append(f'CSRF: POST sin token devolvió {estado} (se esperaba 400)')
+
+    if cedula and password:
+        def iniciar_sesion(_):
+            estado, cabeceras, cuerpo = pedir(puerto, 'GET', '/auth/login')
+            cookie = _cookie_de(cabeceras)
+            token = RE_CSRF.search(cuerpo).group(1)
+            datos = f'csrf_token={token}&cedula={cedula}&password={password}'
+            estado, cabeceras, _ = pedir(puerto, 'POST', '/auth/login', cuerpo=datos, cookie=cookie)
+            cookie = _cookie_de(cabeceras) or cookie
+            # Con la sesión recién creada, /auth/login redirige al panel del rol
+            estado_2, cabeceras_2, _ = pedir(puerto, 'GET', '/auth/login', cookie=cookie)
+            destino = dict((k.lower(), v) for k, v in cabeceras_2).get('location', '')
+            return estado == 302 and estado_2 == 302 and '/auth/login' not in destino
+
+        with ThreadPoolExecutor(concurrencia) as ex:
+            if not all(ex.map(iniciar_sesion, range(concurrencia))):
+                fallas.append('Flask-Login: alguna sesión concurrente no quedó autenticada')
+
+    return fallas
+
+# --- 2. CARGA ---
+def _celulares_lentos(puerto, cantidad, detener):
+    # Conexiones que envían la cabecera a cuentagotas, como un celular con mala señal
+    sockets = []
+    for _ in range(cantidad):
+        try:
+            s = socket.create_connection(('127.0.0.1', puerto), timeout=5)
+            s.sendall(b'GET /auth/login HTTP/1.1\r\nHost: localhost\r\n')
+            sockets.append(s)
+        except OSError:
+            break
+    while not detener.is_set():
+        for s in sockets:
+            try:
+                s.sendall(b'X-Espera: 1\r\n')
+            except OSError:
+                pass
+        detener.wait(1)
+    for s in sockets:
+        s.close()
+
+def percentil(valores_ordenados, p):
+    # Método del rango más cercano: el menor valor con al menos p% de la muestra a su izquierda
+    if not valores_ordenados:
+        return 0
+    return valores_ordenados[max(0, math.ceil(len(valores_ordenados) * p / 100) - 1)]
+
+def cargar(puerto, ruta, clientes, total, lentos, limite):
+    detener = threading.Event()
+    hilo_lentos = threading.Thread(target=_celulares_lentos, args=(puerto, lentos, detener), daemon=True)
+    hilo_lentos.start()
+    time.sleep(0.5)
+
+    latencias, errores = [], 0
+    candado = threading.Lock()
+
+    def una(_):
+        nonlocal errores
+        inicio = time.perf_counter()
+        try:
+            estado, _, _ = pedir(puerto, 'GET', ruta, timeout=limite)
+            ok = estado < 500
+        except OSError:
+            ok = False
+        duracion = time.perf_counter() - inicio
+        with candado:
+            if ok:
+                latencias.append(duracion)
+            else:
+                errores += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(clientes) as ex:
+        list(ex.map(una, range(total)))
+    duracion = time.perf_counter() - inicio
+    detener.set()
+    hilo_lentos.join()
+
+    latencias.sort()
+    p95 = percentil(latencias, 95)
+    return {
+        'req_s': round(len(latencias) / duracion, 1),
+        'p50_ms': round(statistics.median(latencias) * 1000, 1) if latencias else 0,
+        'p95_ms': round(p95 * 1000, 1),
+        'errores': errores,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modos', nargs='+', default=['sync', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--clientes', type=int, default=200)
+    parser.add_argument('--peticiones', type=int, default=2000)
+    parser.add_argument('--lentos', type=int, default=50, help='conexiones lentas abiertas durante la carga')
+    parser.add_argument('--ruta', default='/auth/login')
+    parser.add_argument('--timeout', type=float, default=10, help='segundos antes de contar una petición como error')
+    parser.add_argument('--puerto', type=int, default=5100)
+    parser.add_argument('--cedula')
+    parser.add_argument('--password')
+    args = parser.parse_args()
+
+    for i, modo in enumerate(args.modos):
+        puerto = args.puerto + i
+        proceso = levantar(modo, puerto, args.workers)
+        try:
+            fallas = verificar(puerto, args.cedula, args.password)
+            resultado = cargar(puerto, args.ruta, args.clientes, args.peticiones, args.lentos, args.timeout)
+        finally:
+            proceso.terminate()
+            proceso.wait()
+        estado = 'OK' if not fallas else 'FALLAS: ' + '; '.join(fallas)
+        print(f"[{modo}] workers={args.workers} verificación={estado}")
+        print(f"[{modo}] {resultado['req_s']} req/s  p50={resultado['p50_ms']}ms  "
+              f"p95={resultado['p95_ms']}ms  errores={resultado['errores']}")
+
+if __name__ == '__main__':
+    main()
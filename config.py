@@ -1,24 +1,178 @@
 import os
+import tempfile
 from dotenv import load_dotenv
+from sqlalchemy.pool import NullPool
 
 # Carga las claves del archivo .env
 load_dotenv()
 
+def _entero_env(nombre, defecto):
+    # Lee un entero del entorno; si viene vacío o mal escrito usa el valor por defecto
+    try:
+        return int(os.environ.get(nombre, defecto))
+    except (TypeError, ValueError):
+        return defecto
+
+def _bool_env(nombre, defecto=False):
+    valor = os.environ.get(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
+
+def _modo_gevent():
+    return os.environ.get('SIGAU_WORKER_CLASS', 'sync').strip().lower() == 'gevent'
+
+# --- DIMENSIONAMIENTO DEL POOL SEGÚN WORKERS ---
+def calcular_pool(max_conexiones, reservadas, workers, concurrencia):
+    """Reparte el presupuesto de conexiones de Postgres entre los workers.
+
+    Cada proceso de gunicorn tiene su propio pool, así que el total abierto
+    es workers * (pool_size + max_overflow). Ese total nunca debe superar
+    max_connections menos las conexiones reservadas (pgAdmin, migraciones).
+    """
+    workers = max(1, workers)
+    presupuesto = (max_conexiones - reservadas) // workers
+    if presupuesto < 1:
+        # Ni una conexión por worker: mejor no arrancar que pasarse del límite
+        raise ValueError(
+            f'{workers} workers no caben en {max_conexiones - reservadas} conexiones '
+            f'(DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS): baja WEB_CONCURRENCY o sube el límite.'
+        )
+    pool_size = max(1, min(concurrencia, presupuesto))
+    max_overflow = max(0, presupuesto - pool_size)
+    return pool_size, max_overflow
+
+def _sedes_env():
+    # SEDES="Caracas:caracas,Valencia:valencia"  (ciudad del usuario : identificador de la sede)
+    sedes = {}
+    for par in os.environ.get('SEDES', '').split(','):
+        ciudad, _, sede = par.partition(':')
+        if ciudad.strip() and sede.strip():
+            sedes[ciudad.strip()] = sede.strip().lower()
+    return sedes
+
+def opciones_engine(particiones=1):
+    # Modo PgBouncer (pool por transacción): el pooling lo hace PgBouncer,
+    # así que cada checkout abre y cierra su conexión contra el bouncer.
+    # psycopg2 no usa sentencias preparadas del lado del servidor, por lo que
+    # no hace falta desactivarlas explícitamente.
+    if _bool_env('DB_PGBOUNCER'):
+        return {
+            'poolclass': NullPool,
+            'pool_pre_ping': False,
+        }
+
+    # Con sedes, cada bind tiene su pool y el presupuesto se reparte entre ellos
+    pool_size, max_overflow = calcular_pool(
+        max_conexiones=_entero_env('DB_MAX_CONNECTIONS', 100) // particiones,
+        reservadas=_entero_env('DB_RESERVED_CONNECTIONS', 10),
+        # gunicorn lee WEB_CONCURRENCY para su número de workers
+        workers=_entero_env('WEB_CONCURRENCY', 1),
+        # Con gevent cada worker atiende cientos de requests a la vez; los
+        # greenlets que no alcanzan conexión esperan en el pool (DB_POOL_TIMEOUT)
+        concurrencia=_entero_env('DB_POOL_SIZE', 20 if _modo_gevent() else 5),
+    )
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': _entero_env('DB_POOL_TIMEOUT', 30),   # segundos de espera
+        'pool_recycle': 1800,                                 # Reiniciar conexión cada 30min
+        'pool_pre_ping': True,
+    }
+
+def binds_sedes(sedes):
+    """Un bind por sede: la URL principal con search_path, o SEDE_<ID>_URL.
+
+    SEDE_<ID>_URL debe llegar a la misma base (por ejemplo, una base de
+    PgBouncer que fije el search_path): las tablas comunes no se copian.
+    """
+    ids = sorted(set(sedes.values()))
+    binds = {}
+    for sede in ids:
+        opciones = opciones_engine(particiones=len(ids) + 1)
+        url = os.environ.get(f'SEDE_{sede.upper()}_URL')
+        if not url:
+            url = os.environ.get('DATABASE_URL')
+            opciones['connect_args'] = {'options': f'-csearch_path=sede_{sede},public'}
+        binds[f'sede_{sede}'] = {'url': url, **opciones}
+    return binds
+
 class Config:
     # Clave secreta para seguridad de formularios y cookies
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'clave-dev-super-secreta'
-    
+
     # Conexión a Base de Datos
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    
+
     # Configuración de Zona Horaria (Venezuela)
     TIMEZONE = 'America/Caracas'
-    
-    # Optimización: Pool de conexiones para soportar 1500 usuarios
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 20,       # 20 conexiones fijas
-        'max_overflow': 40,    # 40 extra en picos
-        'pool_timeout': 30,    # 30s de espera
-        'pool_recycle': 1800   # Reiniciar conexión cada 30min
-    }
\ No newline at end of file
+
+    # Proxies de confianza delante de la app (Render: 1). Con 0 se ignora
+    # X-Forwarded-For; con más de los reales un cliente podría falsificar su IP
+    PROXY_SALTOS = _entero_env('PROXY_SALTOS', 0)
+
+    # Limitador de peticiones: (clave, máximo, ventana en segundos).
+    # Sin RATELIMIT_STORAGE_URL cada worker lleva su propia cuenta en memoria;
+    # con una URL redis:// la cuenta se comparte entre todos los workers.
+    # Un salón entero puede salir por la misma IP (NAT del campus): el límite
+    # por IP del login es holgado y el marcaje de QR solo cuenta por usuario.
+    RATELIMIT_ENABLED = _bool_env('RATELIMIT_ENABLED', True)
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL')
+    RATELIMITS = {
+        'login': [('ip', 300, 60), ('cedula', 10, 300)],
+        'recuperar': [('ip', 10, 600), ('cedula', 3, 3600)],
+        'procesar_qr': [('usuario', 10, 60)],
+    }
+
+    # Reportes en segundo plano
+    REPORTES_HILOS = _entero_env('REPORTES_HILOS', 2)
+    REPORTES_EXPIRACION_HORAS = _entero_env('REPORTES_EXPIRACION_HORAS', 24)
+    # Un trabajo sin latido durante TIMEOUT minutos se da por interrumpido
+    REPORTES_LATIDO_SEGUNDOS = _entero_env('REPORTES_LATIDO_SEGUNDOS', 30)
+    REPORTES_TIMEOUT_MINUTOS = _entero_env('REPORTES_TIMEOUT_MINUTOS', 5)
+
+    # Caché de plantillas: fragmentos renderizados (en memoria o redis://)
+    # y bytecode de Jinja compartido por los workers de la máquina
+    FRAGMENTOS_ENABLED = _bool_env('FRAGMENTOS_ENABLED', True)
+    FRAGMENTOS_CACHE_URL = os.environ.get('FRAGMENTOS_CACHE_URL')
+    FRAGMENTOS_MAXIMO = _entero_env('FRAGMENTOS_MAXIMO', 2000)
+    FRAGMENTOS_TTL = _entero_env('FRAGMENTOS_TTL', 300)
+    JINJA_BYTECODE_DIR = os.environ.get('JINJA_BYTECODE_DIR',
+                                        os.path.join(tempfile.gettempdir(), 'sigau-jinja'))
+
+    # Compresión de respuestas (gzip; brotli si está instalado el paquete)
+    COMPRESION_ENABLED = _bool_env('COMPRESION_ENABLED', True)
+    COMPRESION_MINIMO = _entero_env('COMPRESION_MINIMO', 1024)
+    COMPRESION_NIVEL = _entero_env('COMPRESION_NIVEL', 6)
+
+    # Bitácora de auditoría: cola en memoria escrita por lotes cada INTERVALO
+    # segundos; con AUDITORIA_ARCHIVO se escribe JSON por línea en vez de la tabla
+    AUDITORIA_ENABLED = _bool_env('AUDITORIA_ENABLED', True)
+    AUDITORIA_INTERVALO = _entero_env('AUDITORIA_INTERVALO', 2)
+    AUDITORIA_LOTE = _entero_env('AUDITORIA_LOTE', 500)
+    AUDITORIA_MAXIMO = _entero_env('AUDITORIA_MAXIMO', 50000)
+    AUDITORIA_ARCHIVO = os.environ.get('AUDITORIA_ARCHIVO')
+
+    # Estudiantes en riesgo (flask calcular-riesgo): período en días hacia
+    # atrás, porcentaje de inasistencia y faltas seguidas que disparan la alerta
+    RIESGO_DIAS = _entero_env('RIESGO_DIAS', 120)
+    RIESGO_UMBRAL = _entero_env('RIESGO_UMBRAL', 25)
+    RIESGO_RACHA = _entero_env('RIESGO_RACHA', 3)
+
+    # Sincronización con Tepuy: no se exportan filas de los últimos N segundos,
+    # que aún pueden tener transacciones sin commit con ids menores
+    SINCRONIZACION_MARGEN_SEGUNDOS = _entero_env('SINCRONIZACION_MARGEN_SEGUNDOS', 60)
+
+    # Perfilador por muestreo (se activa desde /admin/perfilador)
+    PERFILADOR_MAX_SEGUNDOS = _entero_env('PERFILADOR_MAX_SEGUNDOS', 300)
+    PERFILADOR_INTERVALO_MS = _entero_env('PERFILADOR_INTERVALO_MS', 5)
+    PERFILADOR_MAX_PILAS = _entero_env('PERFILADOR_MAX_PILAS', 20000)
+
+    # Sedes con datos separados (vacío = una sola base)
+    SEDES = _sedes_env()
+    SQLALCHEMY_BINDS = binds_sedes(SEDES)
+
+    # Pool de conexiones derivado de WEB_CONCURRENCY y DB_MAX_CONNECTIONS
+    DB_PGBOUNCER = _bool_env('DB_PGBOUNCER')
+    SQLALCHEMY_ENGINE_OPTIONS = opciones_engine(particiones=len(set(SEDES.values())) + 1)
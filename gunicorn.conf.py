@@ -0,0 +1,31 @@
+# --- CONFIGURACIÓN DE GUNICORN (SIGAU) ---
+# Dos modos de servicio, elegidos con la variable SIGAU_WORKER_CLASS:
+#   sync   -> un request por proceso (modo original, por defecto)
+#   gevent -> green threads: cada worker atiende miles de conexiones de
+#             celulares porque la espera de red/DB cede el control.
+# El modo gevent requiere: pip install -r requirements-gevent.txt
+import os
+
+modo = os.environ.get('SIGAU_WORKER_CLASS', 'sync').strip().lower()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# WEB_CONCURRENCY es la misma variable que usa config.py para repartir el pool
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+
+if modo == 'gevent':
+    worker_class = 'gevent'
+    # Conexiones simultáneas por worker (cada una es un greenlet)
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+    def post_worker_init(worker):
+        # Corre dentro de GeventWorker.init_process, después de que gunicorn
+        # aplicó monkey.patch_all() (en post_fork todavía no se ha aplicado).
+        # psycopg2 es una extensión en C y necesita su propio parche para que
+        # las consultas a Postgres no bloqueen a los demás greenlets.
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        worker.log.info('Worker %s en modo gevent (psycopg2 cooperativo)', worker.pid)
+else:
+    worker_class = 'sync'
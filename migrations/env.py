@@ -1,4 +1,5 @@
 import logging
+from contextlib import contextmanager
 from logging.config import fileConfig
 
 from flask import current_app
@@ -106,6 +107,66 @@ def run_migrations_online():
         with context.begin_transaction():
             context.run_migrations()
 
+    # Autogenerate compara solo la base principal
+    if not getattr(config.cmd_opts, 'autogenerate', False):
+        run_migrations_sedes(conf_args)
+
+
+def run_migrations_sedes(conf_args):
+    """Repite el comando en el esquema de cada sede (ver app/sedes.py).
+
+    Cada sede tiene su propia tabla alembic_version, creada por
+    'flask crear-sedes' en la revisión de ese momento. En las sedes se
+    ejecutan upgrade_sede()/downgrade_sede() de cada revisión, con
+    config.attributes['sede'] puesto; una revisión sin ellas solo toca
+    tablas comunes y en las sedes no hace nada.
+    """
+    from sqlalchemy import inspect
+    from app.sedes import clave_bind, esquema_sede
+
+    for sede in sorted(set(current_app.extensions.get('sedes', {}).values())):
+        motor = target_db.engines[clave_bind(sede)]
+        esquema = esquema_sede(sede, motor)
+        # begin(): la revisión de la sede se guarda al salir del bloque
+        with motor.begin() as connection:
+            if not inspect(connection).has_table('alembic_version', schema=esquema):
+                logger.warning('Sede %s sin crear: ejecuta flask crear-sedes', sede)
+                continue
+
+            config.attributes['sede'] = sede
+            try:
+                context.configure(
+                    connection=connection,
+                    target_metadata=get_metadata(),
+                    version_table_schema=esquema,
+                    **conf_args
+                )
+                logger.info('Sede %s (%s)', sede, esquema)
+                with funciones_de_sede(), context.begin_transaction():
+                    context.run_migrations()
+            finally:
+                config.attributes.pop('sede', None)
+
+
+def _sin_cambios():
+    pass
+
+
+@contextmanager
+def funciones_de_sede():
+    # Alembic llama a module.upgrade/downgrade de cada revisión: durante la
+    # pasada de una sede se cambian por sus versiones _sede
+    originales = []
+    for revision in context.script.walk_revisions():
+        for nombre in ('upgrade', 'downgrade'):
+            originales.append((revision.module, nombre, getattr(revision.module, nombre)))
+            setattr(revision.module, nombre, getattr(revision.module, f'{nombre}_sede', _sin_cambios))
+    try:
+        yield
+    finally:
+        for modulo, nombre, funcion in originales:
+            setattr(modulo, nombre, funcion)
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -22,3 +22,8 @@ def upgrade():
 
 def downgrade():
     ${downgrades if downgrades else "pass"}
+
+
+# Si la revisión cambia tablas de app.sedes.TABLAS_SEDE, repite esos cambios
+# en upgrade_sede()/downgrade_sede(): flask db upgrade las ejecuta en el
+# esquema de cada sede (context.config.attributes['sede']).
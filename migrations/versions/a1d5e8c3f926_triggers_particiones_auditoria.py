@@ -0,0 +1,47 @@
+"""Solo insercion tambien en cada particion de la bitacora
+
+Revision ID: a1d5e8c3f926
+Revises: e9b3c5f27a14
+Create Date: 2026-10-19 19:42:16.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d5e8c3f926'
+down_revision = 'e9b3c5f27a14'
+branch_labels = None
+depends_on = None
+
+
+def _particiones(con_trigger):
+    return op.get_bind().execute(sa.text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'eventos_auditoria'::regclass
+          AND EXISTS (SELECT 1 FROM pg_trigger t
+                      WHERE t.tgrelid = c.oid AND t.tgname = 'trg_auditoria_solo_insercion') = :con_trigger
+    """), {'con_trigger': con_trigger}).scalars().all()
+
+
+def upgrade():
+    # Los triggers de sentencia de la tabla padre no corren con un UPDATE,
+    # DELETE o TRUNCATE hecho directo sobre una partición.
+    # 'flask auditoria-particiones' hace lo mismo con las particiones nuevas.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for nombre in _particiones(con_trigger=False):
+        op.execute(f"""
+            CREATE TRIGGER trg_auditoria_solo_insercion
+            BEFORE UPDATE OR DELETE OR TRUNCATE ON "{nombre}"
+            FOR EACH STATEMENT EXECUTE FUNCTION auditoria_solo_insercion()
+        """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for nombre in _particiones(con_trigger=True):
+        op.execute(f'DROP TRIGGER IF EXISTS trg_auditoria_solo_insercion ON "{nombre}"')
@@ -0,0 +1,61 @@
+"""Resumen de asistencias por estudiante y materia
+
+Revision ID: a3c91e5d7b20
+Revises: 4f5645e89dd0
+Create Date: 2026-10-19 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91e5d7b20'
+down_revision = '4f5645e89dd0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('materias', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('clases_dictadas', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('ultima_clase', sa.Date(), nullable=True))
+
+    op.create_table('resumen_asistencias',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('estudiante_id', sa.Integer(), nullable=False),
+        sa.Column('materia_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('ultima_fecha', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['estudiante_id'], ['usuarios.id'], ),
+        sa.ForeignKeyConstraint(['materia_id'], ['materias.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('estudiante_id', 'materia_id', name='uq_resumen_estudiante_materia')
+    )
+
+    # Carga inicial de contadores a partir del histórico
+    op.execute("""
+        INSERT INTO resumen_asistencias (estudiante_id, materia_id, total, ultima_fecha)
+        SELECT estudiante_id, materia_id, COUNT(*), MAX(fecha)
+        FROM asistencias
+        GROUP BY estudiante_id, materia_id
+    """)
+    op.execute("""
+        UPDATE materias SET
+            clases_dictadas = (
+                SELECT COUNT(DISTINCT CAST(a.fecha AS DATE)) FROM asistencias a
+                WHERE a.materia_id = materias.id
+            ),
+            ultima_clase = (
+                SELECT MAX(CAST(a.fecha AS DATE)) FROM asistencias a
+                WHERE a.materia_id = materias.id
+            )
+    """)
+
+
+def downgrade():
+    op.drop_table('resumen_asistencias')
+
+    with op.batch_alter_table('materias', schema=None) as batch_op:
+        batch_op.drop_column('ultima_clase')
+        batch_op.drop_column('clases_dictadas')
@@ -0,0 +1,48 @@
+"""Resultados del calculo de estudiantes en riesgo
+
+Revision ID: a6c3e0b59d14
+Revises: f2a8d61c4e07
+Create Date: 2026-10-19 18:31:12.640271
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c3e0b59d14'
+down_revision = 'f2a8d61c4e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('riesgo_asistencia',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('estudiante_id', sa.Integer(), nullable=False),
+        sa.Column('materia_id', sa.Integer(), nullable=False),
+        sa.Column('clases', sa.Integer(), nullable=False),
+        sa.Column('asistencias', sa.Integer(), nullable=False),
+        sa.Column('inasistencias', sa.Integer(), nullable=False),
+        sa.Column('porcentaje_inasistencia', sa.Float(), nullable=False),
+        sa.Column('racha_actual', sa.Integer(), nullable=False),
+        sa.Column('racha_maxima', sa.Integer(), nullable=False),
+        sa.Column('ultima_asistencia', sa.DateTime(), nullable=True),
+        sa.Column('en_riesgo', sa.Boolean(), nullable=False),
+        sa.Column('calculado_en', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['estudiante_id'], ['usuarios.id'], ),
+        sa.ForeignKeyConstraint(['materia_id'], ['materias.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('estudiante_id', 'materia_id', name='uq_riesgo_estudiante_materia')
+    )
+    with op.batch_alter_table('riesgo_asistencia', schema=None) as batch_op:
+        batch_op.create_index('idx_riesgo_lista', ['en_riesgo', 'porcentaje_inasistencia'], unique=False)
+        batch_op.create_index('idx_riesgo_materia', ['materia_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('riesgo_asistencia', schema=None) as batch_op:
+        batch_op.drop_index('idx_riesgo_materia')
+        batch_op.drop_index('idx_riesgo_lista')
+
+    op.drop_table('riesgo_asistencia')
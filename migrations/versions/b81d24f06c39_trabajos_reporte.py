@@ -0,0 +1,46 @@
+"""Trabajos de reporte en segundo plano
+
+Revision ID: b81d24f06c39
+Revises: a3c91e5d7b20
+Create Date: 2026-10-19 10:40:02.815334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81d24f06c39'
+down_revision = 'a3c91e5d7b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('trabajos_reporte',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('tipo', sa.String(length=30), nullable=False),
+        sa.Column('parametros', sa.Text(), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('progreso', sa.Integer(), nullable=False),
+        sa.Column('mensaje', sa.String(length=255), nullable=True),
+        sa.Column('solicitado_por', sa.Integer(), nullable=False),
+        sa.Column('creado', sa.DateTime(), nullable=True),
+        sa.Column('terminado', sa.DateTime(), nullable=True),
+        sa.Column('expira', sa.DateTime(), nullable=True),
+        sa.Column('nombre_archivo', sa.String(length=150), nullable=True),
+        sa.Column('archivo', sa.LargeBinary(), nullable=True),
+        sa.ForeignKeyConstraint(['solicitado_por'], ['usuarios.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('trabajos_reporte', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_trabajos_reporte_expira'), ['expira'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trabajos_reporte_solicitado_por'), ['solicitado_por'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('trabajos_reporte', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_trabajos_reporte_solicitado_por'))
+        batch_op.drop_index(batch_op.f('ix_trabajos_reporte_expira'))
+
+    op.drop_table('trabajos_reporte')
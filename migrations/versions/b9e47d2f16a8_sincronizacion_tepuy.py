@@ -0,0 +1,46 @@
+"""Bajas de asistencias y marcas de la sincronizacion incremental con Tepuy
+
+Revision ID: b9e47d2f16a8
+Revises: a6c3e0b59d14
+Create Date: 2026-10-19 20:12:37.915804
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e47d2f16a8'
+down_revision = 'a6c3e0b59d14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('asistencias_bajas',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('asistencia_id', sa.Integer(), nullable=False),
+        sa.Column('cedula', sa.String(length=20), nullable=False),
+        sa.Column('materia', sa.String(length=100), nullable=False),
+        sa.Column('seccion', sa.String(length=50), nullable=False),
+        sa.Column('fecha', sa.DateTime(), nullable=False),
+        sa.Column('eliminada_en', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('marcas_sincronizacion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('destino', sa.String(length=50), nullable=False),
+        sa.Column('ultimo_id', sa.Integer(), nullable=False),
+        sa.Column('ultima_baja_id', sa.Integer(), nullable=False),
+        sa.Column('pendiente_id', sa.Integer(), nullable=True),
+        sa.Column('pendiente_baja_id', sa.Integer(), nullable=True),
+        sa.Column('ultima_ejecucion', sa.DateTime(), nullable=True),
+        sa.Column('ultimo_archivo', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('destino')
+    )
+
+
+def downgrade():
+    op.drop_table('marcas_sincronizacion')
+    op.drop_table('asistencias_bajas')
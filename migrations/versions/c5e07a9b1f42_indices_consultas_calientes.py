@@ -0,0 +1,42 @@
+"""Indices para las consultas calientes
+
+Revision ID: c5e07a9b1f42
+Revises: b81d24f06c39
+Create Date: 2026-10-19 11:58:47.220913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e07a9b1f42'
+down_revision = 'b81d24f06c39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('materias', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_materias_token_activo'), ['token_activo'], unique=False)
+        batch_op.create_index(batch_op.f('ix_materias_docente_id'), ['docente_id'], unique=False)
+
+    with op.batch_alter_table('asistencias', schema=None) as batch_op:
+        batch_op.create_index('idx_asistencia_materia_fecha', ['materia_id', 'fecha'], unique=False)
+        batch_op.create_index('idx_asistencia_fecha', ['fecha'], unique=False)
+
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.create_index('idx_usuarios_seccion_rol', ['seccion_estudiante', 'rol'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.drop_index('idx_usuarios_seccion_rol')
+
+    with op.batch_alter_table('asistencias', schema=None) as batch_op:
+        batch_op.drop_index('idx_asistencia_fecha')
+        batch_op.drop_index('idx_asistencia_materia_fecha')
+
+    with op.batch_alter_table('materias', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_materias_docente_id'))
+        batch_op.drop_index(batch_op.f('ix_materias_token_activo'))
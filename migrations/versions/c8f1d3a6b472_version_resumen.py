@@ -0,0 +1,26 @@
+"""Version del resumen de asistencias por usuario
+
+Revision ID: c8f1d3a6b472
+Revises: b9e47d2f16a8
+Create Date: 2026-10-20 09:41:12.530871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f1d3a6b472'
+down_revision = 'b9e47d2f16a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('resumen_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.drop_column('resumen_version')
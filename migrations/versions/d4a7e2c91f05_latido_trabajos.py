@@ -0,0 +1,26 @@
+"""Latido de los trabajos de reporte
+
+Revision ID: d4a7e2c91f05
+Revises: c8f1d3a6b472
+Create Date: 2026-10-20 10:27:48.113904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7e2c91f05'
+down_revision = 'c8f1d3a6b472'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trabajos_reporte', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latido', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('trabajos_reporte', schema=None) as batch_op:
+        batch_op.drop_column('latido')
@@ -0,0 +1,63 @@
+"""Sesiones de clase y asistencia única por sesión
+
+Revision ID: d7a2c4e98b15
+Revises: c5e07a9b1f42
+Create Date: 2026-10-19 14:06:31.508217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+import pytz
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a2c4e98b15'
+down_revision = 'c5e07a9b1f42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('clase_sesiones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('materia_id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(length=10), nullable=False),
+    sa.Column('abierta_en', sa.DateTime(), nullable=False),
+    sa.Column('cerrada_en', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['materia_id'], ['materias.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('clase_sesiones', schema=None) as batch_op:
+        batch_op.create_index('idx_sesion_token_abierta', ['token'], unique=False,
+                              postgresql_where=sa.text('cerrada_en IS NULL'),
+                              sqlite_where=sa.text('cerrada_en IS NULL'))
+        batch_op.create_index('idx_sesion_materia_apertura', ['materia_id', 'abierta_en'], unique=False)
+
+    with op.batch_alter_table('asistencias', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sesion_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_asistencias_sesion_id', 'clase_sesiones', ['sesion_id'], ['id'])
+        batch_op.create_unique_constraint('uq_asistencia_sesion_estudiante', ['sesion_id', 'estudiante_id'])
+
+    # Las clases abiertas al migrar pasan a ser sesiones abiertas con su token actual.
+    # CURRENT_TIMESTAMP es UTC; la app guarda la hora de Venezuela sin zona
+    # (copia de models.obtener_hora_vzla: la migración no depende del código actual)
+    ahora_vzla = datetime.now(pytz.timezone('America/Caracas')).replace(tzinfo=None)
+    op.get_bind().execute(sa.text("""
+        INSERT INTO clase_sesiones (materia_id, token, abierta_en)
+        SELECT id, token_activo, :ahora FROM materias
+        WHERE token_activo IS NOT NULL
+    """), {'ahora': ahora_vzla})
+
+
+def downgrade():
+    with op.batch_alter_table('asistencias', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_asistencia_sesion_estudiante', type_='unique')
+        batch_op.drop_constraint('fk_asistencias_sesion_id', type_='foreignkey')
+        batch_op.drop_column('sesion_id')
+
+    with op.batch_alter_table('clase_sesiones', schema=None) as batch_op:
+        batch_op.drop_index('idx_sesion_materia_apertura')
+        batch_op.drop_index('idx_sesion_token_abierta')
+
+    op.drop_table('clase_sesiones')
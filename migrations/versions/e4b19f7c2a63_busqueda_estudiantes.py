@@ -0,0 +1,60 @@
+"""Busqueda de estudiantes por nombre y prefijo de cedula
+
+Revision ID: e4b19f7c2a63
+Revises: d7a2c4e98b15
+Create Date: 2026-10-19 14:52:10.374615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import unicodedata
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b19f7c2a63'
+down_revision = 'd7a2c4e98b15'
+branch_labels = None
+depends_on = None
+
+
+def _normalizar(texto):
+    # Copia de app.texto.normalizar_busqueda: la migración no debe depender del código actual
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.casefold().split())
+
+
+def upgrade():
+    conexion = op.get_bind()
+    es_postgres = conexion.dialect.name == 'postgresql'
+
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('nombre_busqueda', sa.String(length=100), nullable=True))
+
+    usuarios = sa.table('usuarios', sa.column('id', sa.Integer), sa.column('nombre', sa.String),
+                        sa.column('nombre_busqueda', sa.String))
+    filas = conexion.execute(sa.select(usuarios.c.id, usuarios.c.nombre)).fetchall()
+    if filas:
+        conexion.execute(
+            usuarios.update().where(usuarios.c.id == sa.bindparam('_id'))
+                    .values(nombre_busqueda=sa.bindparam('_nombre')),
+            [{'_id': id_, '_nombre': _normalizar(nombre)} for id_, nombre in filas]
+        )
+
+    if es_postgres:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('idx_usuarios_nombre_busqueda', 'usuarios', ['nombre_busqueda'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'nombre_busqueda': 'gin_trgm_ops'})
+        op.create_index('idx_usuarios_cedula_prefijo', 'usuarios', ['cedula'], unique=False,
+                        postgresql_ops={'cedula': 'varchar_pattern_ops'})
+    else:
+        op.create_index('idx_usuarios_nombre_busqueda', 'usuarios', ['nombre_busqueda'], unique=False)
+        op.create_index('idx_usuarios_cedula_prefijo', 'usuarios', ['cedula'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_usuarios_cedula_prefijo', table_name='usuarios')
+    op.drop_index('idx_usuarios_nombre_busqueda', table_name='usuarios')
+
+    with op.batch_alter_table('usuarios', schema=None) as batch_op:
+        batch_op.drop_column('nombre_busqueda')
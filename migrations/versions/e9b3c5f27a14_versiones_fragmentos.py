@@ -0,0 +1,28 @@
+"""Versiones de los fragmentos de plantilla cacheados
+
+Revision ID: e9b3c5f27a14
+Revises: d4a7e2c91f05
+Create Date: 2026-10-20 11:18:06.742390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b3c5f27a14'
+down_revision = 'd4a7e2c91f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('versiones_fragmentos',
+        sa.Column('grupo', sa.String(length=80), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('grupo')
+    )
+
+
+def downgrade():
+    op.drop_table('versiones_fragmentos')
@@ -0,0 +1,114 @@
+"""Bitacora de auditoria (solo insercion, particionada por mes en Postgres)
+
+Revision ID: f2a8d61c4e07
+Revises: e4b19f7c2a63
+Create Date: 2026-10-19 17:05:41.208530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import date
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8d61c4e07'
+down_revision = 'e4b19f7c2a63'
+branch_labels = None
+depends_on = None
+
+
+def _particion_mensual(anio, mes):
+    # Copia de commands._particion_mensual: la migración no debe depender del código actual
+    inicio = date(anio, mes, 1)
+    fin = date(anio + mes // 12, mes % 12 + 1, 1)
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS eventos_auditoria_{inicio:%Y_%m} "
+        f"PARTITION OF eventos_auditoria FOR VALUES FROM ('{inicio}') TO ('{fin}')"
+    )
+
+
+def upgrade():
+    es_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    if es_postgres:
+        # La clave primaria de una tabla particionada debe incluir la columna de partición
+        op.execute("""
+            CREATE TABLE eventos_auditoria (
+                id SERIAL NOT NULL,
+                fecha TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                actor_id INTEGER,
+                actor_rol VARCHAR(20),
+                accion VARCHAR(40) NOT NULL,
+                objetivo_tipo VARCHAR(30),
+                objetivo_id INTEGER,
+                sede VARCHAR(30),
+                ip VARCHAR(45),
+                detalle TEXT,
+                PRIMARY KEY (id, fecha)
+            ) PARTITION BY RANGE (fecha)
+        """)
+        # Lo que no cae en un mes creado va a la partición por defecto, así
+        # nunca se pierde un evento; 'flask auditoria-particiones' crea los meses
+        op.execute('CREATE TABLE eventos_auditoria_default PARTITION OF eventos_auditoria DEFAULT')
+        hoy = date.today()
+        for desplazamiento in range(3):
+            mes = hoy.month - 1 + desplazamiento
+            _particion_mensual(hoy.year + mes // 12, mes % 12 + 1)
+    else:
+        op.create_table('eventos_auditoria',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('fecha', sa.DateTime(), nullable=False),
+            sa.Column('actor_id', sa.Integer(), nullable=True),
+            sa.Column('actor_rol', sa.String(length=20), nullable=True),
+            sa.Column('accion', sa.String(length=40), nullable=False),
+            sa.Column('objetivo_tipo', sa.String(length=30), nullable=True),
+            sa.Column('objetivo_id', sa.Integer(), nullable=True),
+            sa.Column('sede', sa.String(length=30), nullable=True),
+            sa.Column('ip', sa.String(length=45), nullable=True),
+            sa.Column('detalle', sa.Text(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    op.create_index('idx_auditoria_fecha', 'eventos_auditoria', ['fecha'], unique=False)
+    op.create_index('idx_auditoria_actor', 'eventos_auditoria', ['actor_id', 'id'], unique=False)
+    op.create_index('idx_auditoria_accion', 'eventos_auditoria', ['accion', 'id'], unique=False)
+    op.create_index('idx_auditoria_objetivo', 'eventos_auditoria', ['objetivo_tipo', 'objetivo_id'], unique=False)
+
+    # Solo inserción: se rechaza cualquier UPDATE o DELETE. Para depurar
+    # meses viejos en Postgres se elimina la partición completa.
+    if es_postgres:
+        op.execute("""
+            CREATE FUNCTION auditoria_solo_insercion() RETURNS trigger AS $$
+            BEGIN
+                RAISE EXCEPTION 'eventos_auditoria es de solo inserción';
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER trg_auditoria_solo_insercion
+            BEFORE UPDATE OR DELETE OR TRUNCATE ON eventos_auditoria
+            FOR EACH STATEMENT EXECUTE FUNCTION auditoria_solo_insercion()
+        """)
+    else:
+        for operacion in ('UPDATE', 'DELETE'):
+            op.execute(f"""
+                CREATE TRIGGER trg_auditoria_sin_{operacion.lower()}
+                BEFORE {operacion} ON eventos_auditoria
+                BEGIN
+                    SELECT RAISE(ABORT, 'eventos_auditoria es de solo inserción');
+                END
+            """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # Borra también las particiones y el trigger
+        op.execute('DROP TABLE eventos_auditoria CASCADE')
+        op.execute('DROP FUNCTION auditoria_solo_insercion()')
+        return
+
+    op.drop_index('idx_auditoria_objetivo', table_name='eventos_auditoria')
+    op.drop_index('idx_auditoria_accion', table_name='eventos_auditoria')
+    op.drop_index('idx_auditoria_actor', table_name='eventos_auditoria')
+    op.drop_index('idx_auditoria_fecha', table_name='eventos_auditoria')
+    op.drop_table('eventos_auditoria')
@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# La configuración se lee al importar config.py: el entorno de pruebas va antes
+_directorio = tempfile.mkdtemp(prefix='sigau-pruebas-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_directorio, 'pruebas.db')
+os.environ['AUDITORIA_ENABLED'] = '0'
+os.environ['JINJA_BYTECODE_DIR'] = ''
+os.environ.pop('SEDES', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import g
+
+from app import create_app
+from config import Config
+from app.models import db as _db, Usuario
+
+
+@pytest.fixture
+def ajustes():
+    """Atributos de Config a cambiar antes de crear la app (un módulo lo puede redefinir)."""
+    return {}
+
+
+@pytest.fixture
+def app(ajustes, monkeypatch):
+    for nombre, valor in ajustes.items():
+        monkeypatch.setattr(Config, nombre, valor)
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+
+    # Las peticiones reutilizan el contexto de la prueba: sin esto, Flask-Login
+    # recordaría en g al usuario de la petición anterior, aunque sea otro cliente
+    @app.teardown_request
+    def olvidar_usuario(_error):
+        g.pop('_login_user', None)
+
+    with app.app_context():
+        _db.create_all(bind_key=None)
+        yield app
+        _db.session.remove()
+        _db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def crear_usuario(db):
+    def crear(cedula, rol, **datos):
+        usuario = Usuario(cedula=cedula, nombre=datos.pop('nombre', f'Usuario {cedula}'), rol=rol, **datos)
+        usuario.set_password('clave')
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario
+    return crear
+
+
+@pytest.fixture
+def cliente_de(app):
+    def cliente(usuario, **datos):
+        # Talisman fuerza HTTPS: todas las peticiones van con base_url https
+        c = app.test_client()
+        c.post('/auth/login', base_url='https://localhost',
+               data={'cedula': usuario.cedula, 'password': 'clave'}, **datos)
+        return c
+    return cliente
+
+
+@pytest.fixture
+def clase_abierta(db, crear_usuario):
+    """Materia de la sección A1 con una sesión abierta (token ABC123)."""
+    from app.models import ClaseSesion, Materia
+
+    docente = crear_usuario('900', 'docente')
+    materia = Materia(nombre='Redes', codigo_seccion='A1', docente_id=docente.id,
+                      token_activo='ABC123', clase_iniciada=True, clases_dictadas=1)
+    db.session.add(materia)
+    db.session.flush()
+    sesion = ClaseSesion(materia_id=materia.id, token='ABC123')
+    db.session.add(sesion)
+    db.session.commit()
+    return materia, sesion
@@ -0,0 +1,21 @@
+from app.models import Asistencia, ClaseSesion, obtener_hora_vzla
+
+
+def _marcar(cliente, token='ABC123'):
+    return cliente.post('/student/procesar_qr', base_url='https://localhost',
+                        data={'token': token}, follow_redirects=True)
+
+
+def test_un_marcaje_por_sesion(db, crear_usuario, cliente_de, clase_abierta):
+    materia, sesion = clase_abierta
+    cliente = cliente_de(crear_usuario('100', 'estudiante', seccion_estudiante='A1'))
+
+    assert 'Asistencia registrada' in _marcar(cliente).get_data(as_text=True)
+    assert 'Ya marcaste asistencia en esta clase de Redes' in _marcar(cliente).get_data(as_text=True)
+
+    # Una segunda clase el mismo día es otra sesión: se puede marcar de nuevo
+    sesion.cerrada_en = obtener_hora_vzla()
+    db.session.add(ClaseSesion(materia_id=materia.id, token='XYZ789'))
+    db.session.commit()
+    assert 'Asistencia registrada' in _marcar(cliente, 'XYZ789').get_data(as_text=True)
+    assert Asistencia.query.count() == 2
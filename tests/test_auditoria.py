@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture
+def ajustes(tmp_path):
+    return {'AUDITORIA_ARCHIVO': str(tmp_path / 'eventos.jsonl')}
+
+
+def test_con_archivo_la_vista_indica_el_archivo(crear_usuario, cliente_de, tmp_path):
+    cliente = cliente_de(crear_usuario('1', 'admin'))
+    pagina = cliente.get('/admin/auditoria', base_url='https://localhost').get_data(as_text=True)
+
+    assert str(tmp_path / 'eventos.jsonl') in pagina
+    assert '<table' not in pagina
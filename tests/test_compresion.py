@@ -0,0 +1,103 @@
+import gzip
+import zlib
+
+import pytest
+from flask import Response, stream_with_context
+from flask_wtf.csrf import generate_csrf
+
+TEXTO = 'Asistencia registrada. ' * 100
+TROZOS = ['cedula;nombre\n', '100;Ana\n' * 200, '101;Luis\n' * 200]
+
+
+@pytest.fixture
+def cliente(app):
+    @app.route('/_prueba/texto')
+    def texto():
+        return TEXTO
+
+    @app.route('/_prueba/corto')
+    def corto():
+        return 'ok'
+
+    @app.route('/_prueba/imagen')
+    def imagen():
+        return Response(b'\x89PNG' + b'\x00' * 4000, mimetype='image/png')
+
+    @app.route('/_prueba/estado/<int:codigo>')
+    def estado(codigo):
+        return Response(TEXTO, status=codigo)
+
+    @app.route('/_prueba/sin_transformar')
+    def sin_transformar():
+        return Response(TEXTO, headers={'Cache-Control': 'no-transform'})
+
+    @app.route('/_prueba/formulario')
+    def formulario():
+        return f'<input name="csrf_token" value="{generate_csrf()}">' + TEXTO
+
+    @app.route('/_prueba/csv')
+    def csv():
+        return Response(stream_with_context(iter(TROZOS)), mimetype='text/csv',
+                        headers={'Content-Length': str(sum(len(t) for t in TROZOS))})
+
+    return app.test_client()
+
+
+def _get(cliente, ruta, codificacion='gzip', **datos):
+    return cliente.get(ruta, base_url='https://localhost', headers={'Accept-Encoding': codificacion}, **datos)
+
+
+def test_gzip_segun_accept_encoding(cliente):
+    respuesta = _get(cliente, '/_prueba/texto')
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in respuesta.headers['Vary']
+    assert gzip.decompress(respuesta.get_data()).decode() == TEXTO
+    assert int(respuesta.headers['Content-Length']) == len(respuesta.get_data()) < len(TEXTO)
+
+    # Sin gzip aceptado: el mismo texto plano, pero la caché debe distinguirlo
+    plano = _get(cliente, '/_prueba/texto', codificacion='identity')
+    assert 'Content-Encoding' not in plano.headers
+    assert 'Accept-Encoding' in plano.headers['Vary']
+    assert plano.get_data(as_text=True) == TEXTO
+
+
+def test_respuestas_cortas_no_se_comprimen(cliente):
+    respuesta = _get(cliente, '/_prueba/corto')
+    assert 'Content-Encoding' not in respuesta.headers
+    assert respuesta.get_data(as_text=True) == 'ok'
+
+
+@pytest.mark.parametrize('ruta', ['/_prueba/imagen', '/_prueba/estado/206', '/_prueba/estado/304'])
+def test_otros_tipos_y_estados_quedan_intactos(cliente, ruta):
+    respuesta = _get(cliente, ruta)
+    assert 'Content-Encoding' not in respuesta.headers
+
+
+def test_no_transform_no_se_comprime(cliente):
+    respuesta = _get(cliente, '/_prueba/sin_transformar')
+    assert 'Content-Encoding' not in respuesta.headers
+    # Las cabeceras anti caché globales no borran el no-transform de la vista
+    assert 'no-transform' in respuesta.headers['Cache-Control']
+    assert respuesta.get_data(as_text=True) == TEXTO
+
+
+def test_pagina_con_token_csrf_no_se_comprime(cliente):
+    # BREACH: el token no viaja comprimido junto a texto reflejado
+    respuesta = _get(cliente, '/_prueba/formulario')
+    assert 'Content-Encoding' not in respuesta.headers
+    assert 'csrf_token' in respuesta.get_data(as_text=True)
+
+
+def test_streaming_se_comprime_por_trozos(cliente):
+    respuesta = _get(cliente, '/_prueba/csv', buffered=False)
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    # El largo original ya no vale y el comprimido no se conoce de antemano
+    assert 'Content-Length' not in respuesta.headers
+
+    # Cada trozo se puede descomprimir al llegar, sin esperar al resto
+    descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    recibidos = [descompresor.decompress(parte).decode() for parte in respuesta.response]
+    respuesta.close()
+    assert recibidos[:len(TROZOS)] == TROZOS
+    assert ''.join(recibidos) == ''.join(TROZOS)
+    assert descompresor.eof
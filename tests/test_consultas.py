@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.consultas import consulta_historial
+from app.models import Asistencia, Materia, obtener_hora_vzla
+
+ADMIN = SimpleNamespace(id=0, rol='admin')
+
+
+@pytest.fixture
+def historial(db, crear_usuario):
+    """Una asistencia por estudiante en Redes (A1) y otra de Ana en Bases de Datos (B2)."""
+    docente = crear_usuario('900', 'docente')
+    redes = Materia(nombre='Redes', codigo_seccion='A1', docente_id=docente.id)
+    bases = Materia(nombre='Bases de Datos', codigo_seccion='B2', docente_id=docente.id)
+    db.session.add_all([redes, bases])
+    db.session.flush()
+
+    estudiantes = {
+        '12345678': 'José Pérez Álvarez',
+        '12399999': 'MARÍA JOSÉ Gómez',
+        '87654321': 'Ana 100%_Rara',
+        '87600000': 'Ana Torres',
+    }
+    for cedula, nombre in estudiantes.items():
+        estudiante = crear_usuario(cedula, 'estudiante', nombre=nombre)
+        db.session.add(Asistencia(estudiante_id=estudiante.id, materia_id=redes.id, fecha=obtener_hora_vzla()))
+        if cedula == '87654321':
+            db.session.add(Asistencia(estudiante_id=estudiante.id, materia_id=bases.id, fecha=obtener_hora_vzla()))
+    db.session.commit()
+    return redes, bases
+
+
+def _nombres(**filtros):
+    return sorted({fila.estudiante for fila in consulta_historial(ADMIN, **filtros)})
+
+
+def test_nombre_sin_acentos_ni_mayusculas(historial):
+    assert _nombres(busqueda='jose') == ['José Pérez Álvarez', 'MARÍA JOSÉ Gómez']
+    assert _nombres(busqueda='PEREZ') == ['José Pérez Álvarez']
+    assert _nombres(busqueda='  álvarez ') == ['José Pérez Álvarez']
+
+
+def test_varias_palabras_deben_aparecer_todas(historial):
+    # En cualquier orden, pero todas
+    assert _nombres(busqueda='gomez maria') == ['MARÍA JOSÉ Gómez']
+    assert _nombres(busqueda='jose torres') == []
+
+
+def test_cedula_por_prefijo_con_o_sin_v(historial):
+    assert _nombres(busqueda='123') == ['José Pérez Álvarez', 'MARÍA JOSÉ Gómez']
+    assert _nombres(busqueda='V-1234') == ['José Pérez Álvarez']
+    assert _nombres(busqueda='v876') == ['Ana 100%_Rara', 'Ana Torres']
+    # Prefijo, no subcadena
+    assert _nombres(busqueda='345') == []
+
+
+def test_comodines_de_like_se_buscan_literales(historial):
+    assert _nombres(busqueda='%') == ['Ana 100%_Rara']
+    assert _nombres(busqueda='_') == ['Ana 100%_Rara']
+    assert _nombres(busqueda='ana 0%_r') == ['Ana 100%_Rara']
+
+
+def test_busqueda_se_combina_con_materia_y_seccion(historial):
+    redes, bases = historial
+    assert _nombres(busqueda='ana', materia_id=bases.id) == ['Ana 100%_Rara']
+    assert _nombres(busqueda='ana', seccion='A1') == ['Ana 100%_Rara', 'Ana Torres']
+    assert _nombres(busqueda='jose', seccion='B2') == []
+    assert len(consulta_historial(ADMIN, busqueda='ana', materia_id=redes.id).all()) == 2
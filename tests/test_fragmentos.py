@@ -0,0 +1,38 @@
+from app.fragmentos import MemoriaFragmentos, invalidar_fragmentos, version_fragmentos
+from app.models import Asistencia, obtener_hora_vzla
+
+
+def test_version_sube_con_el_commit(db):
+    assert version_fragmentos('asistencias') == 0
+    invalidar_fragmentos('asistencias')
+    invalidar_fragmentos('asistencias')
+    db.session.commit()
+    assert version_fragmentos('asistencias') == 2
+
+
+def test_borrar_asistencia_no_deja_filas_cacheadas(app, db, crear_usuario, cliente_de, clase_abierta):
+    materia, sesion = clase_abierta
+    estudiante = crear_usuario('100', 'estudiante', nombre='Ana Pérez', seccion_estudiante='A1')
+    asistencia = Asistencia(estudiante_id=estudiante.id, materia_id=materia.id,
+                            sesion_id=sesion.id, fecha=obtener_hora_vzla())
+    # Una asistencia posterior: el id máximo no cambia con el borrado
+    otro = crear_usuario('101', 'estudiante', nombre='Luis Gómez', seccion_estudiante='A1')
+    db.session.add(asistencia)
+    db.session.flush()
+    db.session.add(Asistencia(estudiante_id=otro.id, materia_id=materia.id,
+                              sesion_id=sesion.id, fecha=obtener_hora_vzla()))
+    db.session.commit()
+    cliente = cliente_de(materia.docente)
+
+    def historial():
+        return cliente.get('/admin/historial', base_url='https://localhost').get_data(as_text=True)
+
+    # El worker A cachea el fragmento; el borrado lo atiende el worker B
+    worker_a = app.extensions['fragmentos']
+    assert 'Ana Pérez' in historial()
+    app.extensions['fragmentos'] = MemoriaFragmentos(maximo=100, ttl=300)
+    cliente.post(f'/admin/eliminar_asistencia/{asistencia.id}', base_url='https://localhost')
+
+    app.extensions['fragmentos'] = worker_a
+    pagina = historial()
+    assert 'Ana Pérez' not in pagina and 'Luis Gómez' in pagina
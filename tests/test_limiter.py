@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.limiter import MemoriaLimiter
+from app.models import db as _db
+from config import Config
+
+
+def test_ventana_deslizante_en_memoria(monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr('app.limiter.time.time', lambda: reloj[0])
+    almacen = MemoriaLimiter()
+
+    assert all(almacen.consumir('k', 3, 60)[0] for _ in range(3))
+    permitido, reintentar = almacen.consumir('k', 3, 60)
+    assert not permitido and 0 < reintentar <= 61
+
+    # A mitad de la ventana siguiente la anterior pesa la mitad: 3 * 0.5 + 2 >= 3
+    reloj[0] = 1050.0
+    assert almacen.consumir('k', 3, 60)[0]
+    assert almacen.consumir('k', 3, 60)[0]
+    assert not almacen.consumir('k', 3, 60)[0]
+
+
+def test_qr_responde_429_sin_consultar_la_base(app, crear_usuario, cliente_de):
+    estudiante = crear_usuario('100', 'estudiante', seccion_estudiante='A1')
+    cliente = cliente_de(estudiante)
+    app.config['RATELIMITS'] = {**app.config['RATELIMITS'], 'procesar_qr': [('usuario', 2, 60)]}
+
+    for _ in range(2):
+        cliente.post('/student/procesar_qr', base_url='https://localhost', data={'token': 'X'})
+
+    consultas = []
+    escuchar = lambda *args: consultas.append(args[2])
+    event.listen(_db.engine, 'before_cursor_execute', escuchar)
+    try:
+        respuesta = cliente.post('/student/procesar_qr', base_url='https://localhost', data={'token': 'X'})
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', escuchar)
+
+    assert respuesta.status_code == 429
+    assert consultas == []
+
+
+def test_qr_no_limita_por_ip(app, crear_usuario, cliente_de):
+    app.config['RATELIMITS'] = {**app.config['RATELIMITS'], 'procesar_qr': [('usuario', 1, 60)]}
+    # Todo el salón sale por la misma IP
+    for cedula in ('100', '101', '102'):
+        cliente = cliente_de(crear_usuario(cedula, 'estudiante', seccion_estudiante='A1'))
+        respuesta = cliente.post('/student/procesar_qr', base_url='https://localhost', data={'token': 'X'})
+        assert respuesta.status_code == 302
+
+
+@pytest.fixture
+def app_con_proxy(monkeypatch):
+    monkeypatch.setattr(Config, 'PROXY_SALTOS', 1)
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False,
+                      RATELIMITS={**app.config['RATELIMITS'], 'login': [('ip', 2, 60)]})
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+def test_ip_del_cliente_detras_del_proxy(app_con_proxy):
+    cliente = app_con_proxy.test_client()
+
+    def intentar(ip):
+        return cliente.post('/auth/login', base_url='https://localhost',
+                            headers={'X-Forwarded-For': ip},
+                            data={'cedula': '1', 'password': 'x'}).status_code
+
+    assert [intentar('10.0.0.1') for _ in range(3)] == [200, 200, 429]
+    # Otro celular detrás del mismo proxy tiene su propia cuenta
+    assert intentar('10.0.0.2') == 200
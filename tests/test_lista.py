@@ -0,0 +1,52 @@
+import re
+
+from app.models import Asistencia, AsistenciaBaja, ResumenAsistencia
+
+
+def _formulario(cliente, materia):
+    """Envía el pase de lista tal como se mostró, con los presentes que vio el docente."""
+    pagina = cliente.get(f'/admin/ver_qr/{materia.id}?lista=1', base_url='https://localhost').get_data(as_text=True)
+    mostrados = re.findall(r'name="mostrados" value="(\d+)"', pagina)
+    assert re.findall(r'name="presentes" value="(\d+)"', pagina)
+    return {'mostrados': mostrados, 'presentes': list(mostrados)}
+
+
+def _pasar_lista(cliente, materia, datos):
+    return cliente.post(f'/admin/pasar_lista/{materia.id}', base_url='https://localhost', data=datos)
+
+
+def test_qr_entre_mostrar_y_guardar_la_lista(db, crear_usuario, cliente_de, clase_abierta):
+    materia, sesion = clase_abierta
+    ana = crear_usuario('100', 'estudiante', seccion_estudiante='A1')
+    luis = crear_usuario('101', 'estudiante', seccion_estudiante='A1')
+    docente = cliente_de(materia.docente)
+
+    # El docente abre la lista y marca a Ana; nadie estaba presente todavía
+    datos = _formulario(docente, materia)
+    datos['presentes'].append(str(ana.id))
+
+    # Luis marca por QR antes de que el docente guarde
+    cliente_de(luis).post('/student/procesar_qr', base_url='https://localhost', data={'token': 'ABC123'})
+
+    _pasar_lista(docente, materia, datos)
+
+    presentes = {a.estudiante_id for a in Asistencia.query.filter_by(sesion_id=sesion.id)}
+    assert presentes == {ana.id, luis.id}
+    assert AsistenciaBaja.query.count() == 0
+    total_luis = db.session.query(ResumenAsistencia.total).filter_by(estudiante_id=luis.id).scalar()
+    assert total_luis == 1
+
+
+def test_desmarcar_a_quien_se_mostro_presente(db, crear_usuario, cliente_de, clase_abierta):
+    materia, sesion = clase_abierta
+    ana = crear_usuario('100', 'estudiante', seccion_estudiante='A1')
+    cliente_de(ana).post('/student/procesar_qr', base_url='https://localhost', data={'token': 'ABC123'})
+    docente = cliente_de(materia.docente)
+
+    datos = _formulario(docente, materia)
+    assert datos['mostrados'] == [str(ana.id)]
+    datos['presentes'].remove(str(ana.id))
+    _pasar_lista(docente, materia, datos)
+
+    assert Asistencia.query.filter_by(sesion_id=sesion.id).count() == 0
+    assert AsistenciaBaja.query.count() == 1
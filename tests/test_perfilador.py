@@ -0,0 +1,27 @@
+import pytest
+
+from app import perfilador
+
+
+def test_muestrea_el_endpoint_pedido(app, crear_usuario, cliente_de):
+    cliente = cliente_de(crear_usuario('1', 'admin'))
+    perfil = app.extensions['perfilador']
+    perfil.iniciar(endpoint='auth.login', segundos=5)
+    try:
+        assert perfil.estado()['activo']
+        cliente.get('/auth/login', base_url='https://localhost')
+        assert perfil.estado()['requests_medidos'] == 1
+    finally:
+        perfil.detener()
+    assert not perfil.activo
+
+
+def test_no_arranca_con_gevent(app, monkeypatch):
+    monkeypatch.setattr(perfilador, '_hilos_parcheados', lambda: True)
+    perfil = app.extensions['perfilador']
+    wsgi_original = app.wsgi_app
+
+    with pytest.raises(RuntimeError, match='gevent'):
+        perfil.iniciar()
+    assert app.wsgi_app == wsgi_original
+    assert not perfil.estado()['disponible']
@@ -0,0 +1,78 @@
+import os
+
+import click
+import pytest
+
+from app import create_app
+from app.commands import _consultas_calientes, _escaneos_secuenciales, _explicar
+from app.models import db, Asistencia, ClaseSesion
+from config import Config
+
+# Los planes solo tienen sentido en PostgreSQL: sin una base desechable, se saltan
+URL = os.environ.get('TEST_POSTGRES_URL', '')
+
+requiere_postgres = pytest.mark.skipif(not URL.startswith('postgresql'),
+                                       reason='TEST_POSTGRES_URL no apunta a PostgreSQL')
+
+DATOS = ['generar-datos', '--estudiantes', '300', '--materias', '20', '--asistencias', '5000', '--semestres', '1']
+
+
+@pytest.fixture(scope='module')
+def postgres():
+    with pytest.MonkeyPatch.context() as parche:
+        parche.setattr(Config, 'SQLALCHEMY_DATABASE_URI', URL)
+        app = create_app()
+    app.config.update(TESTING=True)
+
+    with app.app_context():
+        cli = app.test_cli_runner()
+        resultado = cli.invoke(args=['db', 'upgrade'])
+        assert resultado.exit_code == 0, resultado.output
+        try:
+            resultado = cli.invoke(args=DATOS)
+            assert resultado.exit_code == 0, resultado.output
+            yield app
+        finally:
+            db.session.remove()
+            cli.invoke(args=['db', 'downgrade', 'base'])
+
+
+def test_generar_datos_enlaza_asistencias_a_sesiones(app, db):
+    with pytest.raises(click.ClickException):
+        _consultas_calientes()
+
+    resultado = app.test_cli_runner().invoke(args=DATOS)
+    assert resultado.exit_code == 0, resultado.output
+
+    assert Asistencia.query.count() > 0
+    assert Asistencia.query.filter(Asistencia.sesion_id.is_(None)).count() == 0
+    # Cada asistencia cae el mismo día que su sesión
+    assert Asistencia.query.join(ClaseSesion).filter(
+        db.func.date(ClaseSesion.abierta_en) != Asistencia.fecha_solo_dia).count() == 0
+    assert ClaseSesion.query.filter(ClaseSesion.cerrada_en.is_(None)).count() > 0
+    assert len(_consultas_calientes()) > 0
+
+
+@requiere_postgres
+def test_consultas_calientes_corren_en_postgres(postgres):
+    for nombre, consulta, _ in _consultas_calientes():
+        try:
+            consulta.all()
+        except Exception as e:
+            pytest.fail(f'{nombre}: {e}')
+    db.session.rollback()
+
+
+@requiere_postgres
+def test_consultas_calientes_no_necesitan_seq_scan(postgres):
+    # Con pocos datos el planificador prefiere Seq Scan aunque haya índice:
+    # desactivado, un Seq Scan que queda es una consulta sin índice que la cubra
+    conexion = db.session.connection()
+    conexion.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    try:
+        sin_indice = {nombre: _escaneos_secuenciales(_explicar(conexion, consulta))
+                      for nombre, consulta, _ in _consultas_calientes()}
+    finally:
+        db.session.rollback()
+
+    assert {nombre: tablas for nombre, tablas in sin_indice.items() if tablas} == {}
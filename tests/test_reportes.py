@@ -0,0 +1,60 @@
+import csv
+import io
+
+import pytest
+
+from app.models import Asistencia, Materia, SolicitudClave, obtener_hora_vzla
+from app.reportes import reporte_general
+
+
+@pytest.fixture
+def datos(db, crear_usuario):
+    docente = crear_usuario('900', 'docente', nombre='Carla Rojas', aprobado=True)
+    estudiante = crear_usuario('100', 'estudiante', nombre='Ana Pérez', seccion_estudiante='A1')
+    crear_usuario('901', 'docente', nombre='Pedro Díaz', telefono='04141234567', aprobado=False)
+
+    materia = Materia(nombre='Redes', codigo_seccion='B2', docente_id=docente.id)
+    db.session.add(materia)
+    db.session.flush()
+    fecha = obtener_hora_vzla().replace(microsecond=0)
+    db.session.add(Asistencia(estudiante_id=estudiante.id, materia_id=materia.id, fecha=fecha))
+    db.session.add(SolicitudClave(usuario_id=estudiante.id, nueva_clave_hash='x', fecha_solicitud=fecha))
+    db.session.commit()
+    return fecha
+
+
+@pytest.fixture
+def admin(crear_usuario, cliente_de):
+    cliente = cliente_de(crear_usuario('1', 'admin'))
+
+    def pagina(ruta):
+        return cliente.get(ruta, base_url='https://localhost').get_data(as_text=True)
+    return pagina
+
+
+def test_historial_muestra_las_columnas_de_la_proyeccion(datos, admin):
+    pagina = admin('/admin/historial')
+    for texto in (datos.strftime('%d/%m/%Y'), datos.strftime('%H:%M:%S'), 'Ana Pérez', '100',
+                  'Sec: A1', 'Redes', 'Sección: B2', 'Carla Rojas'):
+        assert texto in pagina
+
+
+def test_aprobaciones_y_solicitudes_de_clave(datos, admin):
+    pagina = admin('/admin/aprobaciones')
+    assert all(texto in pagina for texto in ('Pedro Díaz', '901', '04141234567'))
+    assert 'Carla Rojas' not in pagina
+
+    pagina = admin('/admin/solicitudes_clave')
+    assert all(texto in pagina for texto in ('Ana Pérez', '100', datos.strftime('%d/%m %H:%M')))
+
+
+def test_csv_general_y_su_total(datos, admin):
+    filas = list(csv.reader(io.StringIO(admin('/admin/descargar_reporte').lstrip('\ufeff')), delimiter=';'))
+    assert filas == [
+        ['Fecha', 'Hora', 'Asignatura', 'Sección', 'Docente', 'Estudiante', 'Cédula', 'Sección Alumno', 'Estado'],
+        [datos.strftime('%d/%m/%Y'), datos.strftime('%H:%M'), 'Redes', 'B2', 'Carla Rojas', 'Ana Pérez', '100',
+         'A1', 'Presente'],
+    ]
+
+    _, _, total, filas = reporte_general()
+    assert total == len(list(filas)) == 1
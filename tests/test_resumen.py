@@ -0,0 +1,50 @@
+from app.models import Materia, ResumenAsistencia, obtener_hora_vzla
+from app.resumen import cache_resumen, resumen_estudiante, sumar_asistencia, sumar_asistencias
+
+
+def _materia(db, crear_usuario, seccion='A1'):
+    docente = crear_usuario('900', 'docente')
+    materia = Materia(nombre='Redes', codigo_seccion=seccion, docente_id=docente.id, clases_dictadas=4)
+    db.session.add(materia)
+    db.session.commit()
+    return materia
+
+
+def test_marcaje_invalida_el_resumen_en_todos_los_workers(db, crear_usuario):
+    materia = _materia(db, crear_usuario)
+    estudiante = crear_usuario('100', 'estudiante', seccion_estudiante='A1')
+    assert resumen_estudiante(estudiante)[0]['asistencias'] == 0
+
+    # Otro worker registra el marcaje: la caché de este proceso no se toca,
+    # pero la versión del usuario cambia con el commit
+    sumar_asistencia(estudiante.id, materia.id, 1, obtener_hora_vzla())
+    db.session.commit()
+
+    assert resumen_estudiante(estudiante)[0]['asistencias'] == 1
+
+
+def test_lectura_antes_del_commit_no_queda_como_vigente(db, crear_usuario):
+    materia = _materia(db, crear_usuario)
+    estudiante = crear_usuario('100', 'estudiante', seccion_estudiante='A1')
+    version = estudiante.resumen_version
+
+    sumar_asistencia(estudiante.id, materia.id, 1, obtener_hora_vzla())
+    # Un request simultáneo, todavía sin ver el marcaje, llena la caché
+    cache_resumen.guardar((estudiante.id, version), [{'asistencias': 0}])
+    db.session.commit()
+
+    assert resumen_estudiante(estudiante)[0]['asistencias'] == 1
+
+
+def test_contadores_se_insertan_o_suman_en_una_sentencia(db, crear_usuario):
+    materia = _materia(db, crear_usuario)
+    a = crear_usuario('100', 'estudiante', seccion_estudiante='A1')
+    b = crear_usuario('101', 'estudiante', seccion_estudiante='A1')
+
+    sumar_asistencia(a.id, materia.id, 1, obtener_hora_vzla())
+    sumar_asistencias(materia.id, [a.id, b.id], 1, obtener_hora_vzla())
+    sumar_asistencia(b.id, materia.id, -1)
+    db.session.commit()
+
+    totales = dict(db.session.query(ResumenAsistencia.estudiante_id, ResumenAsistencia.total))
+    assert totales == {a.id: 2, b.id: 0}
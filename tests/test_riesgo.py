@@ -0,0 +1,123 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from app.models import Asistencia, ClaseSesion, Materia, RiesgoAsistencia, obtener_hora_vzla
+from app.riesgo import calcular_riesgo
+
+# Una letra por clase, en orden: P presente, A ausente
+PATRONES = {
+    '100': 'PPAAPAAA',   # 3 de 8, termina con 3 faltas seguidas
+    '101': 'AAAPPPPP',   # 5 de 8, la racha quedó atrás
+    '102': 'PPPPPPPP',
+}
+
+
+@pytest.fixture
+def inicio():
+    # Dentro del período por defecto (RIESGO_DIAS)
+    return datetime.combine(obtener_hora_vzla().date() - timedelta(days=20), time(10))
+
+
+@pytest.fixture
+def materia(db, crear_usuario):
+    docente = crear_usuario('900', 'docente')
+    materia = Materia(nombre='Redes', codigo_seccion='A1', docente_id=docente.id)
+    db.session.add(materia)
+    db.session.commit()
+    return materia
+
+
+def _estudiantes(crear_usuario, cedulas):
+    return {c: crear_usuario(c, 'estudiante', seccion_estudiante='A1').id for c in cedulas}
+
+
+@pytest.fixture
+def sesiones(db, crear_usuario, materia, inicio):
+    """Una sesión por día y los marcajes de PATRONES. Devuelve (ids de estudiante, aperturas)."""
+    estudiantes = _estudiantes(crear_usuario, PATRONES)
+    aperturas = [inicio + timedelta(days=i) for i in range(8)]
+    for i, apertura in enumerate(aperturas):
+        sesion = ClaseSesion(materia_id=materia.id, token='T', abierta_en=apertura,
+                             cerrada_en=apertura + timedelta(hours=1))
+        db.session.add(sesion)
+        db.session.flush()
+        for cedula, patron in PATRONES.items():
+            if patron[i] == 'P':
+                db.session.add(Asistencia(estudiante_id=estudiantes[cedula], materia_id=materia.id,
+                                          sesion_id=sesion.id, fecha=apertura + timedelta(minutes=5)))
+    db.session.commit()
+    return estudiantes, aperturas
+
+
+def _riesgo(estudiante_id):
+    return RiesgoAsistencia.query.filter_by(estudiante_id=estudiante_id).one()
+
+
+def test_conteos_y_rachas(sesiones):
+    estudiantes, aperturas = sesiones
+    calcular_riesgo()
+
+    a = _riesgo(estudiantes['100'])
+    assert (a.clases, a.asistencias, a.inasistencias) == (8, 3, 5)
+    assert a.porcentaje_inasistencia == pytest.approx(62.5)
+    assert (a.racha_actual, a.racha_maxima) == (3, 3)
+    # El momento de la clase en que asistió por última vez
+    assert a.ultima_asistencia == aperturas[4]
+
+    b = _riesgo(estudiantes['101'])
+    assert (b.asistencias, b.racha_actual, b.racha_maxima) == (5, 0, 3)
+    assert b.ultima_asistencia == aperturas[7]
+
+    c = _riesgo(estudiantes['102'])
+    assert (c.inasistencias, c.racha_actual, c.racha_maxima, c.en_riesgo) == (0, 0, 0, False)
+
+
+def test_umbral_y_racha_deciden_el_riesgo(sesiones):
+    estudiantes, _ = sesiones
+
+    def en_riesgo(**parametros):
+        calcular_riesgo(**parametros)
+        return {c for c, i in estudiantes.items() if _riesgo(i).en_riesgo}
+
+    # 101 falta el 37,5 %: el umbral incluye el límite
+    assert en_riesgo(umbral=37.5, racha=10) == {'100', '101'}
+    assert en_riesgo(umbral=40, racha=10) == {'100'}
+    # Solo por racha actual: la de 101 ya terminó
+    assert en_riesgo(umbral=100, racha=3) == {'100'}
+    assert en_riesgo(umbral=100, racha=4) == set()
+    assert calcular_riesgo(umbral=100, racha=3) == {None: 1}
+
+
+def test_dias_sin_sesion_cuentan_como_una_clase(db, crear_usuario, materia, inicio):
+    estudiantes = _estudiantes(crear_usuario, ['200', '201'])
+    x, y = estudiantes['200'], estudiantes['201']
+
+    def marcar(estudiante_id, fecha, sesion_id=None):
+        db.session.add(Asistencia(estudiante_id=estudiante_id, materia_id=materia.id,
+                                  sesion_id=sesion_id, fecha=fecha))
+
+    # Dos días anteriores a las sesiones (sesion_id NULL); un día sin marcajes no es clase
+    dia1, dia2 = inicio, inicio + timedelta(days=2)
+    marcar(x, dia1 + timedelta(minutes=3))
+    marcar(y, dia1 + timedelta(minutes=1))
+    marcar(y, dia1 + timedelta(minutes=40))   # doble marcaje: cuenta una vez
+    marcar(y, dia2 + timedelta(minutes=7))
+
+    # Después, dos sesiones; X vuelve en la última
+    aperturas = [inicio + timedelta(days=4), inicio + timedelta(days=5)]
+    for apertura in aperturas:
+        db.session.add(ClaseSesion(materia_id=materia.id, token='T', abierta_en=apertura))
+    db.session.flush()
+    ultima = ClaseSesion.query.filter_by(abierta_en=aperturas[1]).one()
+    marcar(x, aperturas[1] + timedelta(minutes=5), ultima.id)
+    db.session.commit()
+
+    calcular_riesgo()
+
+    rx, ry = _riesgo(x), _riesgo(y)
+    assert (rx.clases, rx.asistencias, rx.racha_actual, rx.racha_maxima) == (4, 2, 0, 2)
+    assert rx.ultima_asistencia == aperturas[1]
+    assert (ry.clases, ry.asistencias, ry.racha_actual, ry.racha_maxima) == (4, 2, 2, 2)
+    # En un día sin sesión, el momento de la clase es el primer marcaje del día
+    assert ry.ultima_asistencia == dia2 + timedelta(minutes=7)
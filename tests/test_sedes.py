@@ -0,0 +1,77 @@
+import pytest
+from alembic.migration import MigrationContext
+
+from app.models import Asistencia, CatalogoMaterias, Materia, obtener_hora_vzla
+from app.sedes import clave_bind, en_sede
+
+
+@pytest.fixture
+def ajustes(tmp_path):
+    # Cada sede es un archivo SQLite aparte que adjunta la base principal
+    return {
+        'SEDES': {'Valencia': 'valencia'},
+        'SQLALCHEMY_BINDS': {'sede_valencia': {'url': 'sqlite:///' + str(tmp_path / 'valencia.db')}},
+    }
+
+
+@pytest.fixture
+def sedes(app, db):
+    cli = app.test_cli_runner()
+    assert cli.invoke(args=['db', 'stamp', 'head']).exit_code == 0
+    resultado = cli.invoke(args=['crear-sedes'])
+    assert resultado.exit_code == 0, resultado.output
+    yield cli
+    db.session.remove()
+    db.session.execute(db.text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+
+
+def _revision(db, sede):
+    with db.engines[clave_bind(sede)].connect() as conexion:
+        return MigrationContext.configure(conexion, opts={'version_table_schema': 'main'}).get_current_revision()
+
+
+def test_asignar_materia_va_a_la_sede_del_docente(db, sedes, crear_usuario, cliente_de):
+    docente = crear_usuario('900', 'docente', ciudad='Valencia', aprobado=True)
+    catalogo = CatalogoMaterias(nombre='Redes')
+    db.session.add(catalogo)
+    db.session.commit()
+
+    cliente_de(crear_usuario('1', 'admin')).post(
+        '/admin/asignar_materia', base_url='https://localhost',
+        data={'docente_id': docente.id, 'catalogo_id': catalogo.id, 'seccion': 'A1'})
+
+    assert Materia.query.count() == 0
+    with en_sede('valencia'):
+        assert [m.nombre for m in Materia.query.filter_by(docente_id=docente.id)] == ['Redes']
+
+
+def test_admin_elige_la_sede_del_historial(db, sedes, crear_usuario, cliente_de):
+    docente = crear_usuario('900', 'docente', ciudad='Valencia')
+    estudiante = crear_usuario('100', 'estudiante', nombre='Ana Valencia', seccion_estudiante='A1', ciudad='Valencia')
+    with en_sede('valencia'):
+        materia = Materia(nombre='Redes', codigo_seccion='A1', docente_id=docente.id)
+        db.session.add(materia)
+        db.session.flush()
+        db.session.add(Asistencia(estudiante_id=estudiante.id, materia_id=materia.id, fecha=obtener_hora_vzla()))
+        db.session.commit()
+
+    cliente = cliente_de(crear_usuario('1', 'admin'))
+    assert 'Ana Valencia' not in cliente.get('/admin/historial', base_url='https://localhost').get_data(as_text=True)
+    pagina = cliente.get('/admin/historial?sede=valencia', base_url='https://localhost').get_data(as_text=True)
+    assert 'Ana Valencia' in pagina
+    assert '<option value="valencia" selected>' in pagina
+
+
+def test_migraciones_recorren_las_sedes(db, sedes):
+    cabeza = _revision(db, 'valencia')
+    assert cabeza is not None
+
+    # La última revisión solo toca tablas comunes: en la sede solo se mueve la versión
+    assert sedes.invoke(args=['db', 'downgrade']).exit_code == 0
+    assert _revision(db, 'valencia') != cabeza
+    with db.engines[clave_bind('valencia')].connect() as conexion:
+        assert conexion.exec_driver_sql('SELECT count(*) FROM main.asistencias').scalar() == 0
+
+    assert sedes.invoke(args=['db', 'upgrade']).exit_code == 0
+    assert _revision(db, 'valencia') == cabeza
@@ -0,0 +1,132 @@
+import csv
+import os
+from datetime import timedelta
+
+import pytest
+
+from app import sincronizacion
+from app.models import Asistencia, AsistenciaBaja, obtener_hora_vzla
+from app.sincronizacion import ENCABEZADO, exportar_cambios
+
+
+def _leer(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return list(csv.reader(archivo, delimiter=';'))
+
+
+def test_exporta_solo_lo_nuevo_con_id_por_sede(app, db, crear_usuario, clase_abierta, tmp_path):
+    materia, sesion = clase_abierta
+    estudiante = crear_usuario('100', 'estudiante', seccion_estudiante='A1')
+    # Fuera del margen de la corrida
+    fecha = obtener_hora_vzla() - timedelta(minutes=5)
+    asistencia = Asistencia(estudiante_id=estudiante.id, materia_id=materia.id, sesion_id=sesion.id, fecha=fecha)
+    db.session.add(asistencia)
+    db.session.commit()
+    asistencia_id = asistencia.id
+
+    [(sede, ruta, total)] = exportar_cambios('tepuy', str(tmp_path))
+    assert (sede, total) == (None, 1)
+    assert _leer(ruta) == [ENCABEZADO, [
+        '100', fecha.strftime('%Y-%m-%d'), 'Redes', 'A1', fecha.strftime('%H:%M:%S'), 'A', f'principal-{asistencia_id}',
+    ]]
+    # Sin temporales olvidados junto al archivo
+    assert os.listdir(tmp_path) == [os.path.basename(ruta)]
+
+    # Sin cambios, la siguiente corrida no escribe nada
+    assert exportar_cambios('tepuy', str(tmp_path)) == [(None, None, 0)]
+
+
+@pytest.fixture
+def marcar(app, db, crear_usuario, clase_abierta):
+    """Registra la asistencia de un estudiante nuevo de A1 y devuelve su id."""
+    # Ids y no filas: exportar_cambios saca de la sesión las filas de cada sede
+    materia_id, sesion_id = clase_abierta[0].id, clase_abierta[1].id
+    # Sin margen: las bajas recién hechas entran en la corrida siguiente
+    app.config['SINCRONIZACION_MARGEN_SEGUNDOS'] = 0
+
+    def registrar(cedula, estudiante_id=None):
+        if estudiante_id is None:
+            estudiante_id = crear_usuario(cedula, 'estudiante', seccion_estudiante='A1').id
+        asistencia = Asistencia(estudiante_id=estudiante_id, materia_id=materia_id, sesion_id=sesion_id,
+                                fecha=obtener_hora_vzla() - timedelta(minutes=5))
+        db.session.add(asistencia)
+        db.session.commit()
+        return asistencia.id
+    return registrar
+
+
+def _operaciones(ruta):
+    return [(fila[0], fila[5], fila[6]) for fila in _leer(ruta)[1:]]
+
+
+def test_baja_sale_antes_que_el_alta_que_la_reemplaza(db, marcar, cliente_de, clase_abierta, tmp_path):
+    docente = cliente_de(clase_abierta[0].docente)
+    primera = marcar('100')
+    estudiante_id = db.session.get(Asistencia, primera).estudiante_id
+    # SQLite reutiliza el rowid más alto si se borra; en Postgres la secuencia no retrocede
+    marcar('101')
+    exportar_cambios('tepuy', str(tmp_path))
+
+    # El docente corrige el registro: lo borra y el estudiante vuelve a marcar
+    docente.post(f'/admin/eliminar_asistencia/{primera}', base_url='https://localhost')
+    assert db.session.get(Asistencia, primera) is None
+    segunda = marcar('100', estudiante_id)
+
+    [(_, ruta, total)] = exportar_cambios('tepuy', str(tmp_path))
+    assert total == 2
+    assert _operaciones(ruta) == [('100', 'B', f'principal-{primera}'), ('100', 'A', f'principal-{segunda}')]
+
+
+def test_bajas_se_purgan_cuando_todos_los_destinos_las_recibieron(db, marcar, cliente_de, clase_abierta, tmp_path):
+    docente = cliente_de(clase_abierta[0].docente)
+    asistencia_id = marcar('100')
+    exportar_cambios('tepuy', str(tmp_path / 'tepuy'))
+    exportar_cambios('respaldo', str(tmp_path / 'respaldo'))
+    docente.post(f'/admin/eliminar_asistencia/{asistencia_id}', base_url='https://localhost')
+    assert AsistenciaBaja.query.count() == 1
+
+    # 'respaldo' todavía no la leyó
+    [(_, ruta, _)] = exportar_cambios('tepuy', str(tmp_path / 'tepuy'))
+    assert _operaciones(ruta) == [('100', 'B', f'principal-{asistencia_id}')]
+    assert AsistenciaBaja.query.count() == 1
+
+    [(_, ruta, _)] = exportar_cambios('respaldo', str(tmp_path / 'respaldo'))
+    assert _operaciones(ruta) == [('100', 'B', f'principal-{asistencia_id}')]
+    assert AsistenciaBaja.query.count() == 0
+
+
+def test_corrida_fallida_se_repite_con_el_mismo_rango(db, marcar, monkeypatch, tmp_path):
+    primera = marcar('100')
+    intentos = []
+
+    def escribir_fallando(ruta, filas):
+        intentos.append(os.path.basename(ruta))
+        raise OSError('disco lleno')
+
+    monkeypatch.setattr(sincronizacion, '_escribir', escribir_fallando)
+    with pytest.raises(OSError):
+        exportar_cambios('tepuy', str(tmp_path))
+    db.session.rollback()
+    monkeypatch.undo()
+
+    # Lo que llegó después del fallo espera a la corrida siguiente
+    segunda = marcar('101')
+    [(_, ruta, total)] = exportar_cambios('tepuy', str(tmp_path))
+    assert os.path.basename(ruta) == intentos[0]
+    assert (total, _operaciones(ruta)) == (1, [('100', 'A', f'principal-{primera}')])
+
+    [(_, ruta, _)] = exportar_cambios('tepuy', str(tmp_path))
+    assert _operaciones(ruta) == [('101', 'A', f'principal-{segunda}')]
+
+
+def test_reiniciar_exporta_todo_como_alta(db, marcar, cliente_de, clase_abierta, tmp_path):
+    docente = cliente_de(clase_abierta[0].docente)
+    borrada, queda = marcar('100'), marcar('101')
+    exportar_cambios('tepuy', str(tmp_path))
+    docente.post(f'/admin/eliminar_asistencia/{borrada}', base_url='https://localhost')
+
+    # Las bajas previas sobran: el destino recibe el estado actual completo
+    [(_, ruta, _)] = exportar_cambios('tepuy', str(tmp_path), reiniciar=True)
+    assert os.path.basename(ruta).startswith('tepuy_tepuy_principal_0-')
+    assert _operaciones(ruta) == [('101', 'A', f'principal-{queda}')]
+    assert exportar_cambios('tepuy', str(tmp_path)) == [(None, None, 0)]
@@ -0,0 +1,21 @@
+from app.models import Asistencia, Materia, obtener_hora_vzla
+
+
+def test_admin_ve_los_conteos_de_todas_las_materias(db, crear_usuario, cliente_de, clase_abierta):
+    materia, sesion = clase_abierta
+    otro_docente = crear_usuario('901', 'docente')
+    db.session.add(Materia(nombre='Cálculo', codigo_seccion='B2', docente_id=otro_docente.id))
+    estudiante = crear_usuario('100', 'estudiante', seccion_estudiante='A1')
+    crear_usuario('101', 'estudiante', seccion_estudiante='A1')
+    db.session.add(Asistencia(estudiante_id=estudiante.id, materia_id=materia.id,
+                              sesion_id=sesion.id, fecha=obtener_hora_vzla()))
+    db.session.commit()
+
+    cliente = cliente_de(crear_usuario('1', 'admin'))
+    datos = cliente.get('/admin/api/dashboard', base_url='https://localhost').get_json()
+    conteos = {m['materia']: (m['presentes_hoy'], m['inscritos'], m['activa']) for m in datos['materias']}
+    assert conteos == {'Redes': (1, 2, True), 'Cálculo': (0, 0, False)}
+
+    pagina = cliente.get('/admin/dashboard', base_url='https://localhost').get_data(as_text=True)
+    assert 'data-conteo="principal-%d"' % materia.id in pagina
+    assert 'Todas las Asignaturas' in pagina
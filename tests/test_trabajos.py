@@ -0,0 +1,73 @@
+import gzip
+from datetime import timedelta
+
+from app import trabajos
+from app.models import TrabajoReporte, obtener_hora_vzla
+
+
+def _trabajo(db, usuario, id, latido_hace=None, estado='en_proceso', **datos):
+    ahora = obtener_hora_vzla()
+    trabajo = TrabajoReporte(
+        id=id, tipo='general', parametros='{}', estado=estado, solicitado_por=usuario.id,
+        creado=ahora - timedelta(hours=3),
+        latido=ahora - latido_hace if latido_hace is not None else None, **datos
+    )
+    db.session.add(trabajo)
+    db.session.commit()
+    return trabajo
+
+
+def test_solo_se_marcan_los_trabajos_sin_latido(app, db, crear_usuario, monkeypatch):
+    admin = crear_usuario('1', 'admin')
+    _trabajo(db, admin, 'huerfano', latido_hace=timedelta(minutes=30))
+    _trabajo(db, admin, 'otro_worker', latido_hace=timedelta(seconds=20))
+    _trabajo(db, admin, 'propio', latido_hace=timedelta(minutes=30))
+    monkeypatch.setattr(trabajos, '_retenidos', {'propio'})
+
+    trabajos.limpiar_expirados(app)
+
+    estados = dict(db.session.query(TrabajoReporte.id, TrabajoReporte.estado))
+    assert estados == {'huerfano': 'error', 'otro_worker': 'en_proceso', 'propio': 'en_proceso'}
+
+
+def test_descarga_respeta_gzip_con_q_cero(db, crear_usuario, cliente_de):
+    admin = crear_usuario('1', 'admin')
+    _trabajo(db, admin, 'listo', estado='listo', nombre_archivo='r.csv',
+             archivo=gzip.compress(b'CEDULA;NOMBRE\n'))
+    cliente = cliente_de(admin)
+
+    def descargar(codificaciones):
+        return cliente.get('/admin/reportes/listo/descargar', base_url='https://localhost',
+                           headers={'Accept-Encoding': codificaciones})
+
+    respuesta = descargar('gzip;q=0, identity')
+    assert 'Content-Encoding' not in respuesta.headers
+    assert respuesta.data == b'CEDULA;NOMBRE\n'
+
+    assert descargar('gzip, deflate').headers['Content-Encoding'] == 'gzip'
+
+
+def test_trabajo_borrado_antes_de_empezar(app):
+    # No debe lanzar: la excepción se perdería en el futuro del pool
+    trabajos._ejecutar_trabajo(app, 'no_existe')
+
+
+def test_falla_al_empezar_deja_el_trabajo_en_error(app, db, crear_usuario, monkeypatch):
+    admin = crear_usuario('1', 'admin')
+    _trabajo(db, admin, 't1', estado='pendiente')
+    commit = db.session.commit
+    llamadas = []
+
+    def commit_que_falla_una_vez():
+        llamadas.append(1)
+        if len(llamadas) == 1:
+            raise RuntimeError('base caída')
+        commit()
+
+    monkeypatch.setattr(db.session, 'commit', commit_que_falla_una_vez)
+    trabajos._ejecutar_trabajo(app, 't1')
+    monkeypatch.undo()
+
+    trabajo = db.session.get(TrabajoReporte, 't1')
+    db.session.refresh(trabajo)
+    assert (trabajo.estado, trabajo.mensaje) == ('error', 'base caída')